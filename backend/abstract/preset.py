@@ -11,6 +11,8 @@ class ProcessorPreset(BasicProcessor):
 	"""
 	Processor preset
 	"""
+	cacheable = False  # presets only queue other processors
+
 	def process(self):
 		"""
 		This queues a series of post-processors to run in sequence, with an
@@ -34,7 +36,7 @@ class ProcessorPreset(BasicProcessor):
 								 parent=self.dataset.key_parent)
 
 		# this starts the pipeline
-		self.queue.add_job(pipeline[0]["type"], remote_id=analysis_pipeline.key)
+		self.queue.add_job(pipeline[0]["type"], remote_id=analysis_pipeline.key, owner=self.job.data.get("owner", ""))
 
 	def after_process(self):
 		"""
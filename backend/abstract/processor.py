@@ -10,8 +10,13 @@ import os
 
 from backend.abstract.worker import BasicWorker
 from backend.lib.dataset import DataSet
+from backend.lib.columnar import SidecarWriter, get_sidecar_path, has_sidecar, iterate_sidecar
+from backend.lib.compression import find_stored_file, open_stored_file
+from backend.lib.store import link_file
+from backend.lib.job import Job
 from backend.lib.helpers import get_software_version
-from backend.lib.exceptions import WorkerInterruptedException, ProcessorInterruptedException, ProcessorException
+from backend.lib.exceptions import WorkerInterruptedException, ProcessorInterruptedException, ProcessorException, \
+	JobNotFoundException
 
 
 class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
@@ -34,6 +39,7 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 	category = "Other"  # processor category, for sorting in web front-end
 	extension = "csv"  # extension of files created by this processor
 	options = {}  # configurable options for this processor
+	cacheable = True  # whether results may be re-used for identical input, parameters and code
 	parameters = {}  # values for the processor's configurable options
 
 	# Tumblr posts can overflow the regular limit, so double this.
@@ -59,7 +65,7 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 			# search workers never have parents (for now), so we don't need to
 			# find out what the parent dataset is if it's a search worker
 			try:
-				self.parent = DataSet(key=self.dataset.data["key_parent"], db=self.db)
+				self.parent = DataSet.get_by_key(self.dataset.data["key_parent"], db=self.db)
 			except TypeError:
 				# we need to know what the parent dataset was to properly handle the
 				# analysis
@@ -69,16 +75,25 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 				return
 
 			if not self.parent.is_finished():
-				# not finished yet - retry after a while
-				self.job.release(delay=30)
+				# not finished yet - wait for the job creating the parent to
+				# finish, or if there is no such job, retry after a while
+				try:
+					parent_job = Job.get_by_remote_ID(self.parent.key, self.db, jobtype=self.parent.type)
+					self.job.release(depends_on=parent_job)
+				except JobNotFoundException:
+					self.job.release(delay=30)
 				return
 
-			self.parent = DataSet(key=self.dataset.data["key_parent"], db=self.db)
-
 			self.source_file = self.parent.get_results_path()
-			if not self.source_file.exists():
+			if not find_stored_file(self.source_file).exists():
 				self.dataset.update_status("Finished, no input data found.")
 
+			# an identical analysis may have finished since this one was
+			# queued, in which case its results can be used instead
+			if self.dataset.use_cached_results():
+				self.job.finish()
+				return
+
 		self.log.info("Running post-processor %s on query %s" % (self.type, self.job.data["remote_id"]))
 
 		self.parameters = self.dataset.parameters
@@ -122,40 +137,51 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 		if not self.dataset.is_finished():
 			self.dataset.finish()
 
-		# see if we have anything else lined up to run next
-		for next in self.parameters.get("next", []):
-			next_parameters = next.get("parameters", {})
-			next_type = next.get("type", "")
-			available_processors = self.dataset.get_available_processors()
-
-			# run it only if the post-processor is actually available for this query
-			if next_type in available_processors:
-				next_analysis = DataSet(parameters=next_parameters, type=next_type, db=self.db, parent=self.dataset.key,
-										extension=available_processors[next_type]["extension"])
-				self.queue.add_job(next_type, remote_id=next_analysis.key)
-
 		# see if we need to register the result somewhere
 		if "copy_to" in self.parameters:
 			# copy the results to an arbitrary place that was passed
 			if self.dataset.get_results_path().exists():
-				shutil.copyfile(str(self.dataset.get_results_path()), self.parameters["copy_to"])
+				link_file(self.dataset.get_results_path(), self.parameters["copy_to"])
 			else:
 				# if copy_to was passed, that means it's important that this
 				# file exists somewhere, so we create it as an empty file
 				with open(self.parameters["copy_to"], "w") as empty_file:
 					empty_file.write("")
 
+		# nothing will be written to the results file anymore, so it can be
+		# compressed and stored. this is done before finishing the job, so
+		# processors that depend on it can only start afterwards
+		if self.dataset.is_finished():
+			self.dataset.compress_results()
+			self.dataset.store_results()
+
+			# identical analyses can re-use these results from now on
+			if "cache_key" in self.dataset.data:
+				self.dataset.cache_key = self.dataset.get_cache_key()
+
+		# see if we have anything else lined up to run next - this is done
+		# after storing the results, so these may re-use earlier results
+		for next in self.parameters.get("next", []):
+			next_parameters = next.get("parameters", {})
+			next_type = next.get("type", "")
+			available_processors = self.dataset.get_available_processors()
+
+			# run it only if the post-processor is actually available for this query
+			if next_type in available_processors:
+				next_analysis = DataSet(parameters=next_parameters, type=next_type, db=self.db, parent=self.dataset.key,
+										extension=available_processors[next_type]["extension"])
+				if not next_analysis.use_cached_results():
+					self.queue.add_job(next_type, remote_id=next_analysis.key, owner=self.job.data.get("owner", ""), depends_on=self.job)
+
 		# see if this query chain is to be attached to another query
 		# if so, the full genealogy of this query (minus the original dataset)
 		# is attached to the given query - this is mostly useful for presets,
 		# where a chain of processors can be marked as 'underlying' a preset
 		if "attach_to" in self.parameters:
 			try:
-				# copy metadata and results to the surrogate
-				surrogate = DataSet(key=self.parameters["attach_to"], db=self.db)
-
-				if self.dataset.get_results_path().exists():
-					shutil.copyfile(str(self.dataset.get_results_path()), str(surrogate.get_results_path()))
+				# link metadata and results to the surrogate
+				surrogate = DataSet.get_by_key(self.parameters["attach_to"], db=self.db)
+				self.dataset.link_results(surrogate)
 
 				top_parent = self.dataset.get_genealogy()[1]
 				top_parent.link_parent(surrogate.key)
@@ -186,11 +212,17 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 		if self.dataset.get_temporary_path().exists():
 			shutil.rmtree(str(self.dataset.get_temporary_path()))
 
+		sidecar = get_sidecar_path(self.dataset.get_results_path())
+		for path in (sidecar, sidecar.with_name(sidecar.name + ".tmp")):
+			if path.exists():
+				path.unlink()
+
 		# we release instead of finish, since interrupting is just that - the
 		# job should resume at a later point. Delay resuming by 10 seconds to
 		# give 4CAT the time to do whatever it wants (though usually this isn't
 		# needed since restarting also stops the spawning of new workers)
 		self.dataset.update_status("Dataset processing interrupted. Retrying later.")
+		self.dataset.flush_status()
 
 		if self.interrupted == self.INTERRUPT_RETRY:
 			# retry later - wait at least 10 seconds to give the backend time to shut down
@@ -199,7 +231,7 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 			# cancel job
 			self.job.finish()
 
-	def iterate_csv_items(self, path):
+	def iterate_csv_items(self, path, columns=None):
 		"""
 		A generator that iterates through a CSV file
 
@@ -207,15 +239,43 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 		and if set a ProcessorInterruptedException is raised, which by default
 		is caught and subsequently stops execution gracefully.
 
+		Processors that only need some of the columns should pass these as
+		`columns`. If a columnar copy of the file is available, only those
+		columns are then read from it, which is a lot faster than parsing the
+		full CSV file.
+
 		:param Path path:  Path to csv file to read
+		:param columns:  Columns to include in the items; `None` for all.
+		Columns the file does not have are left out.
 		:return:
 		"""
-		with open(path, encoding="utf-8") as input:
+		if has_sidecar(path):
+			items = iterate_sidecar(path, columns)
+		else:
+			items = self.read_csv_items(path, columns)
+
+		for item in items:
+			if self.interrupted:
+				raise ProcessorInterruptedException("Processor interrupted while iterating through CSV file")
+
+			yield item
+
+	def read_csv_items(self, path, columns=None):
+		"""
+		Read items from a CSV file
+
+		See `iterate_csv_items()`.
+
+		:param Path path:  Path to csv file to read
+		:param columns:  Columns to include in the items; `None` for all
+		:return:
+		"""
+		with open_stored_file(path) as input:
 			reader = csv.DictReader(input)
 
 			for item in reader:
-				if self.interrupted:
-					raise ProcessorInterruptedException("Processor interrupted while iterating through CSV file")
+				if columns is not None:
+					item = {column: item[column] for column in columns if column in item}
 
 				yield item
 
@@ -240,14 +300,19 @@ class BasicProcessor(BasicWorker, metaclass=abc.ABCMeta):
 			raise TypeError("write_csv_items requires a list or tuple of dictionaries as argument")
 
 		self.dataset.update_status("Writing results file")
+		sidecar = SidecarWriter(self.dataset.get_results_path(), data[0].keys())
 		with self.dataset.get_results_path().open("w", encoding="utf-8", newline='') as results:
 			writer = csv.DictWriter(results, fieldnames=data[0].keys())
 			writer.writeheader()
 
 			for row in data:
 				if self.interrupted:
+					sidecar.discard()
 					raise ProcessorInterruptedException("Interrupted while writing results file")
 				writer.writerow(row)
+				sidecar.write(row)
+
+		sidecar.close()
 
 		self.dataset.update_status("Finished")
 		self.dataset.finish(len(data))
@@ -1,5 +1,4 @@
 import hashlib
-import shutil
 import random
 import math
 import csv
@@ -10,6 +9,8 @@ from abc import ABC, abstractmethod
 import config
 
 from backend.lib.dataset import DataSet
+from backend.lib.columnar import SidecarWriter, get_sidecar_path
+from backend.lib.store import link_file
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import strip_tags
 from backend.lib.exceptions import WorkerInterruptedException, ProcessorInterruptedException
@@ -56,16 +57,27 @@ class Search(BasicProcessor, ABC):
 		except WorkerInterruptedException:
 			raise ProcessorInterruptedException("Interrupted while collecting data, trying again later.")
 
-		# Write posts to csv and update the DataBase status to finished
+		# Write posts to csv and update the DataBase status to finished. posts
+		# may be a generator, in which case they are only actually retrieved
+		# while writing them to the file
 		num_posts = 0
-		if posts:
+		if posts is not None:
 			self.dataset.update_status("Writing posts to result file")
-			num_posts = self.posts_to_csv(posts, results_file)
-			self.dataset.update_status("Query finished, results are available.")
-		elif posts is not None:
-			self.dataset.update_status("Query finished, no results found.")
+			try:
+				num_posts = self.posts_to_csv(posts, results_file)
+			except WorkerInterruptedException:
+				raise ProcessorInterruptedException("Interrupted while collecting data, trying again later.")
+
+			if num_posts > 0:
+				self.dataset.update_status("Query finished, results are available.")
+			else:
+				for path in (results_file, get_sidecar_path(results_file)):
+					if path.exists():
+						path.unlink()
+				self.dataset.update_status("Query finished, no results found.")
 
-		# queue predefined post-processors
+		# queue predefined post-processors - they will not be claimed before
+		# this job has finished
 		if num_posts > 0 and query_parameters.get("next", []):
 			for next in query_parameters.get("next"):
 				next_parameters = next.get("parameters", {})
@@ -77,14 +89,14 @@ class Search(BasicProcessor, ABC):
 					next_analysis = DataSet(parameters=next_parameters, type=next_type, db=self.db,
 											parent=self.dataset.key,
 											extension=available_processors[next_type]["extension"])
-					self.queue.add_job(next_type, remote_id=next_analysis.key)
+					self.queue.add_job(next_type, remote_id=next_analysis.key, owner=self.job.data.get("owner", ""), depends_on=self.job)
 
 		# see if we need to register the result somewhere
 		if query_parameters.get("copy_to", None):
 			# copy the results to an arbitrary place that was passed
 			if self.dataset.get_results_path().exists():
 				# but only if we actually have something to copy
-				shutil.copyfile(str(self.dataset.get_results_path()), query_parameters.get("copy_to"))
+				link_file(self.dataset.get_results_path(), query_parameters.get("copy_to"))
 			else:
 				# if copy_to was passed, that means it's important that this
 				# file exists somewhere, so we create it as an empty file
@@ -94,6 +106,16 @@ class Search(BasicProcessor, ABC):
 		self.dataset.finish(num_rows=num_posts)
 
 	def search(self, query):
+		"""
+		Search for posts matching the query
+
+		Posts are returned as a list, or as a generator (e.g. via
+		`Database.fetch_iter()`), so they do not have to be kept in memory all
+		at once. Either way, they should only be iterated through once.
+
+		:param dict query:  Query parameters
+		:return:  Iterable of posts, or `None` if no posts could be retrieved
+		"""
 		mode = self.get_search_mode(query)
 
 		if query.get("body_match", None) or query.get("subject_match", None):
@@ -103,7 +125,7 @@ class Search(BasicProcessor, ABC):
 			mode = "simple"
 			posts = self.get_posts_simple(query)
 
-		if not posts:
+		if posts is None:
 			return None
 
 		# handle the various search scope options after retrieving initial post
@@ -111,9 +133,21 @@ class Search(BasicProcessor, ABC):
 		if query.get("search_scope", None) == "dense-threads":
 			# dense threads - all posts in all threads in which the requested
 			# proportion of posts matches
-			# first, get amount of posts for all threads in which matching
-			# posts occur and that are long enough
-			thread_ids = tuple([post["thread_id"] for post in posts])
+			# first, determine how many matching posts occur per thread in the
+			# initial data set
+			posts_per_thread = {}
+			for post in posts:
+				if post["thread_id"] not in posts_per_thread:
+					posts_per_thread[post["thread_id"]] = 0
+
+				posts_per_thread[post["thread_id"]] += 1
+
+			if not posts_per_thread:
+				return None
+
+			# then get amount of posts for all threads in which matching posts
+			# occur and that are long enough
+			thread_ids = tuple(posts_per_thread.keys())
 			self.dataset.update_status("Retrieving thread metadata for %i threads" % len(thread_ids))
 			try:
 				min_length = int(query.get("scope_length", 30))
@@ -122,15 +156,6 @@ class Search(BasicProcessor, ABC):
 
 			thread_sizes = self.get_thread_sizes(thread_ids, min_length)
 
-			# determine how many matching posts occur per thread in the initial
-			# data set
-			posts_per_thread = {}
-			for post in posts:
-				if post["thread_id"] not in posts_per_thread:
-					posts_per_thread[post["thread_id"]] = 0
-
-				posts_per_thread[post["thread_id"]] += 1
-
 			# keep all thread IDs where that amount is more than the requested
 			# density
 			qualifying_thread_ids = set()
@@ -165,6 +190,9 @@ class Search(BasicProcessor, ABC):
 		elif query.get("search_scope", None) == "full-threads":
 			# get all post in threads containing at least one matching post
 			thread_ids = tuple(set([post["thread_id"] for post in posts]))
+			if not thread_ids:
+				return None
+
 			if len(thread_ids) > 25000:
 				self.dataset.update_status(
 					"Too many matching threads (%i) to get full thread data for, aborting. Please try again with a narrower query." % len(
@@ -182,11 +210,22 @@ class Search(BasicProcessor, ABC):
 				try:
 					self.dataset.update_status("Creating random sample")
 					sample_size = int(query.get("sample_size", 5000))
-					posts = list(posts)
-					random.shuffle(posts)
-					return posts[0:sample_size]
 				except ValueError:
-					pass
+					sample_size = None
+
+				if sample_size is not None:
+					# reservoir sampling, so only the sample is kept in memory
+					sample = []
+					for index, post in enumerate(posts):
+						if index < sample_size:
+							sample.append(post)
+						else:
+							replace = random.randint(0, index)
+							if replace < sample_size:
+								sample[replace] = post
+
+					random.shuffle(sample)
+					return sample
 
 		# search workers may define an 'after_search' hook that is called after
 		# the query is first completed
@@ -215,7 +254,8 @@ class Search(BasicProcessor, ABC):
 		some specific processing is done on the "body" key to strip HTML from it,
 		and a human-readable timestamp is provided next to the UNIX timestamp.
 
-		:param sql_results:		List with results derived with db.fetchall()
+		:param sql_results:		Iterable with results, e.g. from db.fetchall() or
+								db.fetch_iter()
 		:param filepath:    	Filepath for the resulting csv
 
 		:return int:  Amount of posts that were processed
@@ -242,11 +282,16 @@ class Search(BasicProcessor, ABC):
 
 		processed = 0
 		header_written = False
+		sidecar = None
 		with filepath.open("w", encoding="utf-8") as csvfile:
+			# results are written as they come in, so only one row is kept in
+			# memory at a time
 			# Parsing: remove the HTML tags, but keep the <br> as a newline
 			# Takes around 1.5 times longer
 			for row in sql_results:
 				if self.interrupted:
+					if sidecar:
+						sidecar.discard()
 					raise ProcessorInterruptedException("Interrupted while writing results to file")
 
 				if not header_written:
@@ -256,6 +301,9 @@ class Search(BasicProcessor, ABC):
 					writer.writeheader()
 					header_written = True
 
+					# columnar copy, for processors that only need some columns
+					sidecar = SidecarWriter(filepath, fieldnames)
+
 				processed += 1
 				# Create human dates from timestamp
 				from datetime import datetime
@@ -282,6 +330,10 @@ class Search(BasicProcessor, ABC):
 						row[author_field] = hash_cache[row[author_field]]
 
 				writer.writerow(row)
+				sidecar.write(row)
+
+		if sidecar:
+			sidecar.close()
 
 		return processed
 
@@ -8,6 +8,7 @@ import abc
 
 from backend.lib.queue import JobQueue
 from backend.lib.database import Database
+from backend.lib.dataset import DataSet
 from backend.lib.exceptions import WorkerInterruptedException, ProcessorException
 
 
@@ -24,6 +25,13 @@ class BasicWorker(threading.Thread, metaclass=abc.ABCMeta):
 	type = "misc"  # this should match the job type as saved in the database
 	pause = 1  # time to wait between scrapes
 	max_workers = 1  # max amount of workers of this type
+	execution = "thread"  # "thread", or "process" to run the worker in a separate process (e.g. if CPU-bound)
+
+	# estimated resource use, so the manager does not start more workers than
+	# the machine can handle. see estimate_resources()
+	memory_cost = 0  # memory in MB
+	memory_cost_per_row = 0  # additional memory in MB, per row of input data
+	cpu_cost = 0  # CPU cores
 
 	# flag values to indicate what to do when an interruption is requested
 	INTERRUPT_NONE = False
@@ -35,6 +43,7 @@ class BasicWorker(threading.Thread, metaclass=abc.ABCMeta):
 	log = None  # Logger
 	manager = None  # WorkerManager that manages this worker
 	interrupted = False  # interrupt flag, to request halting
+	is_done = False  # set when the work method has returned, right before the thread ends
 	modules = None
 	init_time = 0  # Time this worker was started
 
@@ -65,8 +74,11 @@ class BasicWorker(threading.Thread, metaclass=abc.ABCMeta):
 		"""
 		Loop the worker
 
-		This simply calls the work method
+		This simply calls the work method. Datasets are only loaded from the
+		database once while it runs, and buffered dataset status updates are
+		written when it is done.
 		"""
+		DataSet.start_identity_scope()
 		try:
 			self.work()
 		except WorkerInterruptedException:
@@ -88,6 +100,32 @@ class BasicWorker(threading.Thread, metaclass=abc.ABCMeta):
 			location = "->".join(frames)
 			self.log.error("Worker %s raised exception %s and will abort: %s at %s" % (self.type, e.__class__.__name__, str(e), location))
 			self.job.add_status("Crash during execution")
+		finally:
+			DataSet.flush_pending_statuses()
+			DataSet.end_identity_scope()
+
+			# a worker slot is now available, so let the manager know it can
+			# start another worker
+			self.is_done = True
+			if self.manager:
+				self.manager.wake()
+
+	@classmethod
+	def estimate_resources(cls, num_rows=0):
+		"""
+		Estimate resources needed to run this worker
+
+		By default, this is based on the `memory_cost`, `memory_cost_per_row`
+		and `cpu_cost` attributes. Workers may override this for more precise
+		estimates.
+
+		:param int num_rows:  Amount of rows in the input data, if known
+		:return dict:  Estimated `memory` (in MB) and `cpu` (in cores)
+		"""
+		return {
+			"memory": cls.memory_cost + (cls.memory_cost_per_row * num_rows),
+			"cpu": cls.cpu_cost
+		}
 
 	def abort(self):
 		"""
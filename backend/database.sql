@@ -15,7 +15,12 @@ CREATE TABLE IF NOT EXISTS jobs (
   timestamp_claimed      integer DEFAULT 0,
   status                 text,
   attempts               integer DEFAULT 0,
-  interval               integer DEFAULT 0
+  interval               integer DEFAULT 0,
+  claimed_by             text    DEFAULT '',
+  timestamp_lease        integer DEFAULT 0,
+  priority               integer DEFAULT 0,
+  owner                  text    DEFAULT '',
+  depends_on             integer DEFAULT 0
 );
 
 -- enforce
@@ -25,6 +30,13 @@ CREATE UNIQUE INDEX IF NOT EXISTS unique_job
     remote_id
   );
 
+CREATE INDEX IF NOT EXISTS job_queue
+  ON jobs (
+    jobtype,
+    timestamp_claimed,
+    timestamp
+  );
+
 
 -- queries
 CREATE TABLE IF NOT EXISTS datasets (
@@ -35,15 +47,61 @@ CREATE TABLE IF NOT EXISTS datasets (
   query            text,
   job              integer DEFAULT 0,
   parameters       text,
+  datasource       text DEFAULT '',
+  owner            text DEFAULT '',
   result_file      text DEFAULT '',
+  result_hash      text DEFAULT '',
+  cache_key        text DEFAULT '',
   timestamp        integer,
   status           text,
+  progress         text DEFAULT '',
   num_rows         integer DEFAULT 0,
   is_finished      boolean DEFAULT FALSE,
   software_version text,
   software_file    text DEFAULT ''
 );
 
+CREATE INDEX IF NOT EXISTS dataset_key
+  ON datasets (
+    key
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_parent
+  ON datasets (
+    key_parent
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_timestamp
+  ON datasets (
+    timestamp
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_datasource
+  ON datasets (
+    datasource,
+    timestamp
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_owner
+  ON datasets (
+    owner
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_job
+  ON datasets (
+    job
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_result_hash
+  ON datasets (
+    result_hash
+  );
+
+CREATE INDEX IF NOT EXISTS dataset_cache_key
+  ON datasets (
+    cache_key
+  );
+
 -- users
 CREATE TABLE IF NOT EXISTS users (
   name               TEXT UNIQUE PRIMARY KEY,
@@ -0,0 +1,160 @@
+"""
+Columnar (Parquet) copies of CSV result files
+"""
+from pathlib import Path
+
+import config
+
+from backend.lib.compression import find_stored_file
+
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	# columnar copies are an optimisation; without pyarrow, only CSV files
+	# are written and read
+	pyarrow = None
+
+
+def get_sidecar_path(path):
+	"""
+	Get path to the columnar copy of a CSV file
+
+	:param Path path:  Path to CSV file
+	:return Path:  Path to columnar copy, which may or may not exist
+	"""
+	path = Path(path)
+	return path.with_name(path.name + ".parquet")
+
+
+def has_sidecar(path):
+	"""
+	Check if an up-to-date columnar copy of a CSV file is available
+
+	:param Path path:  Path to CSV file
+	:return bool:
+	"""
+	if not pyarrow:
+		return False
+
+	sidecar = get_sidecar_path(path)
+	try:
+		return sidecar.stat().st_mtime >= find_stored_file(path).stat().st_mtime
+	except FileNotFoundError:
+		return False
+
+
+def iterate_sidecar(path, columns=None):
+	"""
+	Iterate through the rows of the columnar copy of a CSV file
+
+	Rows are yielded like `csv.DictReader` would, i.e. as dictionaries with
+	string values.
+
+	:param Path path:  Path to CSV file
+	:param columns:  Columns to read; `None` for all. Columns that the file
+	does not have are left out.
+	:return:  Generator yielding rows, as dictionaries
+	"""
+	parquet = pyarrow.parquet.ParquetFile(str(get_sidecar_path(path)))
+	if columns is not None:
+		available = set(parquet.schema.to_arrow_schema().names)
+		columns = [column for column in columns if column in available]
+
+	for group in range(parquet.num_row_groups):
+		if columns == []:
+			# none of the columns are available; like csv.DictReader would,
+			# still yield a (now empty) item for each row
+			for row in range(parquet.metadata.row_group(group).num_rows):
+				yield {}
+			continue
+
+		batch = parquet.read_row_group(group, columns=columns).to_pydict()
+		names = list(batch.keys())
+		for values in zip(*batch.values()):
+			yield dict(zip(names, values))
+
+
+class SidecarWriter:
+	"""
+	Write a columnar copy of a CSV file alongside it
+
+	All values are stored as strings, exactly as they end up in the CSV file,
+	so reading either file yields the same data. Rows are buffered and written
+	in row groups of `batch_size` rows. The copy only becomes available once
+	the writer is closed; if it is discarded instead, or if pyarrow is not
+	available or columnar copies are disabled via `DATASET_SIDECARS`, nothing
+	is written.
+	"""
+	batch_size = 10000
+	enabled = (config.DATASET_SIDECARS if hasattr(config, "DATASET_SIDECARS") else True) and pyarrow is not None
+
+	def __init__(self, path, fieldnames):
+		"""
+		:param Path path:  Path to the CSV file to write a copy of
+		:param list fieldnames:  CSV columns
+		"""
+		self.path = get_sidecar_path(path)
+		self.staging_path = self.path.with_name(self.path.name + ".tmp")
+		self.fieldnames = list(fieldnames)
+		self.buffer = {field: [] for field in self.fieldnames}
+		self.buffered = 0
+		self.writer = None
+
+		if self.enabled:
+			self.schema = pyarrow.schema([(field, pyarrow.string()) for field in self.fieldnames])
+			self.writer = pyarrow.parquet.ParquetWriter(str(self.staging_path), self.schema)
+
+	def write(self, row):
+		"""
+		Add a row
+
+		:param dict row:  Row, as passed to `csv.DictWriter.writerow()`
+		"""
+		if not self.writer:
+			return
+
+		for field in self.fieldnames:
+			value = row.get(field, "")
+			self.buffer[field].append("" if value is None else str(value))
+
+		self.buffered += 1
+		if self.buffered >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		"""
+		Write buffered rows as a row group
+		"""
+		if not self.writer or not self.buffered:
+			return
+
+		self.writer.write_table(pyarrow.Table.from_pydict(self.buffer, schema=self.schema))
+		self.buffer = {field: [] for field in self.fieldnames}
+		self.buffered = 0
+
+	def close(self):
+		"""
+		Finish writing and make the copy available
+
+		This should be called after the CSV file itself has been closed, as
+		the copy is only used if it is at least as new as the CSV file.
+		"""
+		if not self.writer:
+			return
+
+		self.flush()
+		self.writer.close()
+		self.writer = None
+		self.staging_path.replace(self.path)
+
+	def discard(self):
+		"""
+		Stop writing and remove what was written so far
+		"""
+		if self.writer:
+			self.writer.close()
+			self.writer = None
+
+		if self.staging_path.exists():
+			self.staging_path.unlink()
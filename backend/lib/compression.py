@@ -0,0 +1,147 @@
+"""
+Compressed storage of result files
+"""
+import shutil
+import gzip
+import io
+
+from pathlib import Path
+
+import config
+
+try:
+	import zstandard
+except ImportError:
+	# zstd is faster, but gzip does the job too
+	zstandard = None
+
+# suffix of compressed files => content encoding, in order of preference
+ENCODINGS = {
+	".zst": "zstd",
+	".gz": "gzip"
+}
+
+
+def get_compression():
+	"""
+	Get compression to use for new result files
+
+	Configured via `DATASET_COMPRESSION`. If zstd is configured but not
+	available, gzip is used instead.
+
+	:return str:  "zstd", "gzip", or an empty string if files should not be
+	compressed
+	"""
+	compression = config.DATASET_COMPRESSION if hasattr(config, "DATASET_COMPRESSION") else "gzip"
+	if compression == "zstd" and not zstandard:
+		compression = "gzip"
+
+	return compression if compression in ENCODINGS.values() else ""
+
+
+def find_stored_file(path):
+	"""
+	Find where a result file is stored
+
+	Result files may have been compressed, in which case the file on disk has
+	an extra suffix.
+
+	:param Path path:  Path to result file, as e.g. returned by
+	`DataSet.get_results_path()`
+	:return Path:  Path to the file on disk; if it does not exist in any form,
+	the path that was passed
+	"""
+	path = Path(path)
+	for suffix in ("", *ENCODINGS):
+		stored = path.with_name(path.name + suffix)
+		if stored.exists():
+			return stored
+
+	return path
+
+
+def get_stored_paths(path):
+	"""
+	Get all paths a result file may be stored at
+
+	:param Path path:  Path to result file
+	:return list:  Paths, compressed or not
+	"""
+	path = Path(path)
+	return [path.with_name(path.name + suffix) for suffix in ("", *ENCODINGS)]
+
+
+def get_content_encoding(stored_path):
+	"""
+	Get HTTP content encoding for a stored file
+
+	:param Path stored_path:  Path to file on disk, as returned by
+	`find_stored_file()`
+	:return str:  Content encoding, or `None` if the file is not compressed
+	"""
+	return ENCODINGS.get(Path(stored_path).suffix)
+
+
+def open_stored_file(path, mode="r", encoding="utf-8", newline=None):
+	"""
+	Open a result file for reading, decompressing it if needed
+
+	The file is decompressed as it is read, so this can be used to stream
+	through large files.
+
+	:param Path path:  Path to result file, compressed or not
+	:param str mode:  "r" to read text, "rb" to read bytes
+	:param str encoding:  Text encoding
+	:param newline:  As for `open()`
+	:return:  File object
+	"""
+	if mode not in ("r", "rb"):
+		raise ValueError("Stored result files can only be opened for reading")
+
+	stored = find_stored_file(path)
+	encoding_type = get_content_encoding(stored)
+
+	if encoding_type == "gzip":
+		stream = gzip.open(str(stored), "rb")
+	elif encoding_type == "zstd":
+		if not zstandard:
+			raise RuntimeError("Cannot read zstd-compressed file %s; zstandard is not installed" % stored)
+		stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stored.open("rb"), closefd=True))
+	else:
+		stream = stored.open("rb")
+
+	if mode == "rb":
+		return stream
+
+	return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+
+
+def compress_file(path, compression):
+	"""
+	Compress a file
+
+	The compressed file replaces the original and keeps its modification
+	time. Readers that use `open_stored_file()` will not notice the
+	difference.
+
+	:param Path path:  File to compress
+	:param str compression:  "zstd" or "gzip"
+	:return Path:  Path to compressed file
+	"""
+	suffix = {encoding: suffix for suffix, encoding in ENCODINGS.items()}[compression]
+	target = path.with_name(path.name + suffix)
+	staging = target.with_name(target.name + ".tmp")
+
+	with path.open("rb") as source:
+		if compression == "zstd":
+			with staging.open("wb") as output:
+				zstandard.ZstdCompressor().copy_stream(source, output)
+		else:
+			with gzip.open(str(staging), "wb") as output:
+				shutil.copyfileobj(source, output, 1024 * 1024)
+
+	shutil.copystat(str(path), str(staging))
+	staging.replace(target)
+	path.unlink()
+
+	return target
@@ -2,13 +2,20 @@
 Database wrapper
 """
 import psycopg2.extras
+import contextlib
+import threading
 import psycopg2
+import logging
 import select
 import time
+import uuid
+import os
 
 from psycopg2 import sql
 from psycopg2.extras import execute_values
 
+from backend.lib.database_pool import ConnectionPool, Checkout
+from backend.lib.query_profiler import QueryProfiler
 from backend.lib.exceptions import DatabaseQueryInterruptedException
 
 
@@ -22,16 +29,37 @@ class Database:
 	Offers a number of abstraction methods that limit how much SQL one is
 	required to write. Also makes the database connection mostly multithreading
 	proof by instantiating a new cursor for each query (and closing it afterwards)
+
+	Connections are drawn from a pool. Each thread that uses a Database object
+	gets its own connection, which it keeps until the thread ends, the object
+	is discarded or `close()` is called.
 	"""
-	cursor = None
 	log = None
+	pool = None
+	appname = None
 	is_async = False
 
 	interrupted = False
-	interruptable_timeout = 86400  # if a query takes this long, it should be cancelled. see also fetchall_interruptable()
-	interruptable_job = None
-
-	def __init__(self, logger, dbname=None, user=None, password=None, host=None, port=None, appname=None):
+	interruptable_timeout = config.DB_QUERY_TIMEOUT if hasattr(config, "DB_QUERY_TIMEOUT") else 86400  # if a query takes this long, it should be cancelled. see also fetchall_interruptable()
+	itersize = config.DB_ITERSIZE if hasattr(config, "DB_ITERSIZE") else 2000  # rows to fetch at a time with fetch_iter()
+
+	# queries run this many times on a connection are turned into prepared
+	# statements, of which at most `prepared_max` are kept per connection. see
+	# prepare()
+	prepare_threshold = config.DB_PREPARE_AFTER if hasattr(config, "DB_PREPARE_AFTER") else 3
+	prepared_max = config.DB_PREPARED_MAX if hasattr(config, "DB_PREPARED_MAX") else 100
+
+	# read-only queries may be run on a replica, if its replication lag (in
+	# seconds) is no more than this. see get_replica_pool()
+	replicas = []
+	replica_max_lag = config.DB_REPLICA_MAX_LAG if hasattr(config, "DB_REPLICA_MAX_LAG") else 30
+
+	# connections in this process that are currently running an interruptable
+	# query, and the Database objects running them, shared by all instances
+	interruptable_queries = {}
+	interruptable_lock = threading.Lock()
+
+	def __init__(self, logger, dbname=None, user=None, password=None, host=None, port=None, appname=None, replicas=None):
 		"""
 		Set up database connection
 
@@ -42,6 +70,8 @@ class Database:
 		:param host:  Database server address
 		:param port:  Database port
 		:param appname:  App name, mostly useful to trace connections in pg_stat_activity
+		:param list replicas:  Connection strings (DSNs) of read replicas, on
+		which read-only queries may be run. Defaults to `DB_REPLICAS`.
 		"""
 		dbname = config.DB_NAME if not dbname else dbname
 		user = config.DB_USER if not user else user
@@ -49,17 +79,63 @@ class Database:
 		host = config.DB_HOST if not host else host
 		port = config.DB_PORT if not port else port
 
-		appname = "4CAT" if not appname else "4CAT-%s" % appname
-
-		self.connection = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port, application_name=appname)
-		self.cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+		self.appname = "4CAT" if not appname else "4CAT-%s" % appname
+		self.pool = ConnectionPool.get(dbname=dbname, user=user, password=password, host=host, port=port)
+		if replicas is not None:
+			self.replicas = replicas
+		elif hasattr(config, "DB_REPLICAS"):
+			self.replicas = config.DB_REPLICAS
+		self.local = threading.local()
 		self.log = logger
 
-
 		if self.log is None:
 			raise NotImplementedError
 
-		self.commit()
+	@property
+	def connection(self):
+		"""
+		The connection for the current thread
+
+		A connection is checked out from the pool when a thread first needs
+		one.
+
+		:return:  psycopg2 connection
+		"""
+		return self.get_checkout().connection
+
+	@property
+	def cursor(self):
+		"""
+		A cursor for the current thread's connection
+
+		Only used for building queries with `mogrify()`; queries are run with
+		their own cursor, see `get_cursor()`.
+
+		:return:  psycopg2 cursor
+		"""
+		return self.get_checkout().cursor
+
+	@property
+	def backend_pid(self):
+		"""
+		PID of the Postgres backend serving the current thread's connection
+
+		:return int:
+		"""
+		return self.connection.get_backend_pid()
+
+	def get_checkout(self):
+		"""
+		Get the connection checked out for the current thread
+
+		:return Checkout:
+		"""
+		checkout = getattr(self.local, "checkout", None)
+		if checkout is None:
+			checkout = Checkout(self.pool, self.pool.checkout(self.appname))
+			self.local.checkout = checkout
+
+		return checkout
 
 	def query(self, query, replacements=None, cursor=None):
 		"""
@@ -73,9 +149,172 @@ class Database:
 		if not cursor:
 			cursor = self.get_cursor()
 
-		self.log.debug("Executing query %s" % self.cursor.mogrify(query, replacements))
+		self.log_query(cursor, query, replacements)
+		statement, statement_replacements = self.prepare(cursor, query, replacements)
+		if not QueryProfiler.is_active():
+			return cursor.execute(statement, statement_replacements)
+
+		start = time.perf_counter()
+		result = cursor.execute(statement, statement_replacements)
+		self.profile_query(cursor, query, replacements, time.perf_counter() - start, cursor.rowcount)
+
+		return result
+
+	def prepare(self, cursor, query, replacements=None):
+		"""
+		Use a prepared statement for a query, if it is run often
+
+		Queries that are run often on a connection, with only the parameters
+		changing, are PREPAREd the `prepare_threshold`th time they are run, and
+		EXECUTEd from then on, so Postgres does not need to parse and plan
+		them each time. Prepared statements are tracked per connection, and
+		the least recently used ones are deallocated if there are more than
+		`prepared_max`.
+
+		Only plain SELECT/INSERT/UPDATE/DELETE queries with positional
+		parameters are prepared, and not if any of the parameters is a tuple,
+		since those are expanded into a variable amount of values.
+
+		:param cursor:  Cursor the query will be run with
+		:param query:  Query
+		:param replacements:  Replacement values
+		:return tuple:  The query and replacements to run instead
+		"""
+		connection = cursor.connection
+		if not self.prepare_threshold or not hasattr(connection, "prepared") or connection.autocommit:
+			return query, replacements
+
+		if replacements is None:
+			replacements = ()
+		elif isinstance(replacements, dict) or any([isinstance(value, (tuple, dict)) for value in replacements]):
+			return query, replacements
+
+		text = query.as_string(cursor) if isinstance(query, sql.Composable) else query
+		name = connection.prepared.get(text)
+
+		if name is None:
+			uses = connection.query_uses.pop(text, 0)
+			if uses >= 0:
+				uses += 1
+			connection.query_uses[text] = uses
+			if len(connection.query_uses) > self.prepared_max * 10:
+				connection.query_uses.popitem(last=False)
+
+			if uses < self.prepare_threshold:
+				return query, replacements
+
+			statement = self.get_positional_query(text, len(replacements))
+			if not statement:
+				connection.query_uses[text] = -1
+				return query, replacements
+
+			# preparing may fail, e.g. if the type of a parameter cannot be
+			# determined, which would abort the transaction. so use a
+			# savepoint to be able to recover from that
+			connection.statement_index += 1
+			name = "statement_%i" % connection.statement_index
+			try:
+				cursor.execute("SAVEPOINT prepare_statement")
+				cursor.execute("PREPARE %s AS %s" % (name, statement))
+				cursor.execute("RELEASE SAVEPOINT prepare_statement")
+			except psycopg2.Error as e:
+				cursor.execute("ROLLBACK TO SAVEPOINT prepare_statement")
+				self.log.debug("Could not prepare statement for query %s: %s" % (text, e))
+				connection.query_uses[text] = -1
+				return query, replacements
+
+			del connection.query_uses[text]
+			connection.prepared[text] = name
+			if len(connection.prepared) > self.prepared_max:
+				evicted_query, evicted_name = connection.prepared.popitem(last=False)
+				cursor.execute("DEALLOCATE %s" % evicted_name)
+		else:
+			connection.prepared.move_to_end(text)
+
+		if not replacements:
+			return "EXECUTE %s" % name, None
+
+		return "EXECUTE %s (%s)" % (name, ", ".join(["%s"] * len(replacements))), replacements
+
+	@staticmethod
+	def get_positional_query(query, num_parameters):
+		"""
+		Convert a query with psycopg2 placeholders to one that can be prepared
+
+		`%s` placeholders are replaced with `$1`, `$2`, etc, and `%%` with a
+		literal `%`.
+
+		:param str query:  Query
+		:param int num_parameters:  Amount of parameters the query is run with
+		:return str:  Converted query, or `None` if the query cannot be
+		prepared
+		"""
+		if query.lstrip().split(None, 1)[0].upper() not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+			return None
+
+		parameter = 0
+		statement = ""
+		position = 0
+		while True:
+			index = query.find("%", position)
+			if index < 0:
+				statement += query[position:]
+				break
+
+			statement += query[position:index]
+			placeholder = query[index:index + 2]
+			if placeholder == "%s":
+				parameter += 1
+				statement += "$%i" % parameter
+			elif placeholder == "%%":
+				statement += "%"
+			else:
+				# named parameters, which are not supported
+				return None
+
+			position = index + 2
+
+		return statement if parameter == num_parameters else None
+
+	def log_query(self, cursor, query, replacements=None, description="Executing query"):
+		"""
+		Log a query at debug level
+
+		The query with its parameters filled in is only built if debug
+		messages are actually logged.
+
+		:param cursor:  Cursor the query is run with
+		:param query:  Query
+		:param replacements:  Replacement values
+		:param str description:  Log message prefix
+		"""
+		if self.log.is_enabled_for(logging.DEBUG):
+			self.log.debug("%s: %s" % (description, cursor.mogrify(query, replacements)))
+
+	def profile_query(self, cursor, query, replacements, duration, rows):
+		"""
+		Record statistics for a query, and log it if it was slow
+
+		See `QueryProfiler`.
 
-		return cursor.execute(query, replacements)
+		:param cursor:  Cursor the query was run with
+		:param query:  Query, without parameters
+		:param replacements:  Replacement values
+		:param float duration:  How long the query took, in seconds
+		:param int rows:  Rows returned or affected; negative if unknown
+		"""
+		if QueryProfiler.is_slow(duration):
+			try:
+				full_query = cursor.mogrify(query, replacements)
+			except psycopg2.Error:
+				# e.g. if the cursor is closed; named cursors are closed once
+				# exhausted
+				full_query = query
+			self.log.warning("Slow query (%.2f seconds, %s): %s" % (duration, self.appname, full_query))
+
+		if QueryProfiler.enabled:
+			template = query.as_string(cursor) if isinstance(query, sql.Composable) else str(query)
+			QueryProfiler.record(template, self.appname, duration, rows)
 
 	def execute(self, query, replacements=None):
 		"""
@@ -86,14 +325,12 @@ class Database:
 		:param replacements: Replacement values
 		"""
 		cursor = self.get_cursor()
-
-		self.log.debug("Executing query %s" % self.cursor.mogrify(query, replacements))
-		cursor.execute(query, replacements)
+		self.query(query, replacements, cursor=cursor)
 		self.commit()
 
 		cursor.close()
 
-	def execute_many(self, query, replacements=None):
+	def execute_many(self, query, replacements=None, fetch=False):
 		"""
 		Execute a query multiple times, each time with different values
 
@@ -102,11 +339,80 @@ class Database:
 
 		:param string query:  Query
 		:param replacements: A list of replacement values
+		:param bool fetch:  Whether to fetch and return the result rows, e.g.
+		for queries with a RETURNING clause
+		:return list:  Result rows, if `fetch` is `True`
 		"""
 		cursor = self.get_cursor()
-		execute_values(cursor, query, replacements)
+		if not QueryProfiler.is_active():
+			result = execute_values(cursor, query, replacements, fetch=fetch)
+		else:
+			start = time.perf_counter()
+			result = execute_values(cursor, query, replacements, fetch=fetch)
+			rows = len(result) if fetch else len(replacements)
+			self.profile_query(cursor, query, None, time.perf_counter() - start, rows)
 		cursor.close()
 
+		return result
+
+	def copy_rows(self, table, columns, rows, merge=False, constraints=None, commit=True):
+		"""
+		Bulk-load rows into a table
+
+		Rows are streamed to the database with `COPY ... FROM STDIN`, which is
+		a lot faster than INSERTing them, even in batches. Since the rows are
+		encoded as they are read, `rows` may be a generator of any size.
+
+		COPY fails if a row violates a constraint, e.g. if it already exists.
+		With `merge`, rows are instead first copied into a temporary staging
+		table, and then inserted from there, skipping rows that would cause a
+		conflict.
+
+		:param str table:  Table to load rows into
+		:param columns:  Column names, in the order the values occur in rows
+		:param rows:  Iterable of rows; each row a tuple or list of values.
+		`None` is stored as NULL.
+		:param bool merge:  Whether to skip rows that conflict with existing
+		rows instead of failing
+		:param tuple constraints:  If `merge` is `True`, this tuple may contain
+		the columns to check for conflicts, as with `insert()`
+		:param bool commit:  Whether to commit afterwards
+		:return int:  Number of rows added to the table
+		"""
+		cursor = self.get_cursor()
+		column_list = sql.SQL(", ").join([sql.Identifier(column) for column in columns])
+
+		if merge:
+			target = sql.Identifier("staging_%s" % uuid.uuid4().hex)
+			self.query(sql.SQL("CREATE TEMPORARY TABLE {} (LIKE {} INCLUDING DEFAULTS)").format(target, sql.Identifier(table)), cursor=cursor)
+		else:
+			target = sql.Identifier(table)
+
+		stream = CopyStream(rows)
+		query = sql.SQL("COPY {} ({}) FROM STDIN").format(target, column_list).as_string(cursor)
+		self.log_query(cursor, query, description="Copying rows")
+		start = time.perf_counter()
+		cursor.copy_expert(query, stream, size=CopyStream.buffer_size)
+		if QueryProfiler.is_active():
+			self.profile_query(cursor, query, None, time.perf_counter() - start, stream.num_rows)
+
+		result = stream.num_rows
+		if merge:
+			conflict = sql.SQL("")
+			if constraints:
+				conflict = sql.SQL("({})").format(sql.SQL(", ").join([sql.Identifier(column) for column in constraints]))
+
+			self.query(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT {} DO NOTHING").format(
+				sql.Identifier(table), column_list, column_list, target, conflict), cursor=cursor)
+			result = cursor.rowcount
+			self.query(sql.SQL("DROP TABLE {}").format(target), cursor=cursor)
+
+		if commit:
+			self.commit()
+
+		cursor.close()
+		return result
+
 	def update(self, table, data, where=None, commit=True):
 		"""
 		Update a database record
@@ -136,8 +442,7 @@ class Database:
 		query = sql.SQL(query).format(*identifiers)
 
 		cursor = self.get_cursor()
-		self.log.debug("Executing query: %s" % cursor.mogrify(query, replacements))
-		cursor.execute(query, replacements)
+		self.query(query, replacements, cursor=cursor)
 
 		if commit:
 			self.commit()
@@ -165,8 +470,7 @@ class Database:
 		query = sql.SQL("DELETE FROM {} WHERE " + " AND ".join(where_sql)).format(*identifiers)
 
 		cursor = self.get_cursor()
-		self.log.debug("Executing query: %s" % cursor.mogrify(query, replacements))
-		cursor.execute(query, replacements)
+		self.query(query, replacements, cursor=cursor)
 
 		if commit:
 			self.commit()
@@ -212,8 +516,7 @@ class Database:
 		replacements = (tuple(data.values()),)
 
 		cursor = self.get_cursor()
-		self.log.debug("Executing query: %s" % cursor.mogrify(query, replacements))
-		cursor.execute(query, replacements)
+		self.query(query, replacements, cursor=cursor)
 
 		if commit:
 			self.commit()
@@ -222,16 +525,21 @@ class Database:
 		cursor.close()
 		return result
 
-	def fetchall(self, query, *args):
+	def fetchall(self, query, *args, readonly=False):
 		"""
 		Fetch all rows for a query
 
 		:param string query:  Query
 		:param args: Replacement values
+		:param bool readonly:  Whether the query only reads data, in which
+		case it may be run on a replica. See `get_replica_pool()`.
 		:return list: The result rows, as a list
 		"""
+		replica = self.get_replica_pool() if readonly else None
+		if replica:
+			return self.fetchall_from(replica, query, *args)
+
 		cursor = self.get_cursor()
-		self.log.debug("Executing query: %s" % cursor.mogrify(query, *args))
 		self.query(query, cursor=cursor, *args)
 
 		try:
@@ -264,51 +572,324 @@ class Database:
 		cursor.close()
 		return result
 
-	def fetchall_interruptable(self, queue, query, *args):
+	def fetchall_interruptable(self, query, *args, readonly=False):
 		"""
 		Fetch all rows for a query, allowing for interruption
 
-		Requires the database connection to be asynchronous (instantiate with
-		`is_async` = `True`). Before running the query, a job is queued to
-		cancel the query after a set amount of time. Usually the query
-		completes before this timeout. If the backend is interrupted, however,
-		the job can be executed immediately, to cancel the database query.
+		While the query runs, the connection is registered as running an
+		interruptable query. If the backend is interrupted, it can then cancel
+		the query with `cancel_queries()`. Queries that take longer than
+		`interruptable_timeout` seconds are cancelled by the database itself.
 
-		:param JobQueue queue:  A job queue object, required to schedule the
-		query cancellation job
 		:param str query:  SQL query
 		:param list args:  Replacement variables
+		:param bool readonly:  Whether the query only reads data, in which
+		case it may be run on a replica. See `get_replica_pool()`.
 		:return list:  A list of rows, as dictionaries
 		"""
-		# schedule a job that will cancel the query we're about to make
-		pid = self.connection.get_backend_pid()
-		self.interruptable_job = queue.add_job("cancel-pg-query", details={}, remote_id=pid, claim_after=time.time() + self.interruptable_timeout)
+		replica = self.get_replica_pool() if readonly else None
+		if replica:
+			return self.fetchall_from(replica, query, *args, interruptable=True)
 
-		# make the query
 		cursor = self.get_cursor()
-		self.log.debug("Executing interruptable query: %s" % cursor.mogrify(query, *args))
-
 		try:
-			self.query(query, cursor=cursor, *args)
-		except psycopg2.extensions.QueryCanceledError:
-			# interrupted with cancellation worker (or manually)
+			with self.interruptable(cursor.connection):
+				self.query(query, cursor=cursor, *args)
+
+				# collect results
+				try:
+					result = cursor.fetchall()
+				except (AttributeError, psycopg2.ProgrammingError) as e:
+					result = []
+
+				cursor.execute("SET LOCAL statement_timeout = DEFAULT")
+		except DatabaseQueryInterruptedException:
 			self.rollback()
 			cursor.close()
-			raise DatabaseQueryInterruptedException("Interrupted while querying database")
+			raise
 
-		# collect results
+		cursor.close()
+		return result
+
+	def fetchall_from(self, pool, query, *args, interruptable=False):
+		"""
+		Fetch all rows for a query, using a connection from a given pool
+
+		The connection is only used for this query and returned to the pool
+		afterwards.
+
+		:param ConnectionPool pool:  Pool to take a connection from, e.g. a
+		replica's
+		:param str query:  SQL query
+		:param list args:  Replacement variables
+		:param bool interruptable:  Allow cancelling the query, and have it
+		time out, like `fetchall_interruptable()`
+		:return list:  A list of rows, as dictionaries
+		"""
+		connection = pool.checkout(self.appname)
 		try:
-			result = cursor.fetchall()
-		except (AttributeError, psycopg2.ProgrammingError) as e:
-			result = []
+			cursor = connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+			if interruptable:
+				with self.interruptable(connection):
+					self.query(query, cursor=cursor, *args)
+					return cursor.fetchall()
+			else:
+				self.query(query, cursor=cursor, *args)
+				return cursor.fetchall()
+		finally:
+			try:
+				connection.rollback()
+			except psycopg2.Error:
+				pass
+
+			pool.release(connection)
+
+	def fetch_iter(self, query, *args, itersize=None, interruptable=False, readonly=False):
+		"""
+		Iterate through the rows for a query without fetching them all at once
+
+		Uses a server-side cursor, from which rows are fetched in batches of
+		`itersize` rows as the generator is iterated through, so memory use
+		does not depend on the amount of rows the query returns.
+
+		The cursor runs on its own connection, so the current thread's
+		connection can be used (and committed) while iterating.
+
+		:param str query:  SQL query
+		:param list args:  Replacement variables
+		:param int itersize:  Rows to fetch at a time; defaults to the
+		`itersize` attribute
+		:param bool interruptable:  Allow cancelling the query, and have it
+		time out, like `fetchall_interruptable()`
+		:param bool readonly:  Whether the query only reads data, in which
+		case it may be run on a replica. See `get_replica_pool()`.
+		:return:  Generator yielding rows, as dictionaries
+		"""
+		replacements = args[0] if args else None
+		pool = self.get_replica_pool() if readonly else None
+		if not pool:
+			pool = self.pool
+
+		connection = pool.checkout(self.appname)
+		try:
+			with self.interruptable(connection, enabled=interruptable):
+				cursor = connection.cursor(name="stream_%s" % uuid.uuid4().hex, cursor_factory=psycopg2.extras.RealDictCursor)
+				cursor.itersize = itersize if itersize else self.itersize
+				self.log_query(cursor, query, replacements, description="Executing streaming query")
+
+				start = time.perf_counter()
+				rows = 0
+				cursor.execute(query, replacements)
+				for row in cursor:
+					rows += 1
+					yield row
+
+				# the time spent on this includes the time spent by whatever
+				# consumes the rows
+				if QueryProfiler.is_active():
+					self.profile_query(cursor, query, replacements, time.perf_counter() - start, rows)
+		finally:
+			# ending the transaction also closes the cursor
+			try:
+				connection.rollback()
+			except psycopg2.Error:
+				pass
+
+			pool.release(connection)
+
+	def fetch_iter_interruptable(self, query, *args, itersize=None, readonly=False):
+		"""
+		Iterate through the rows for a query, allowing for interruption
+
+		See `fetch_iter()` and `fetchall_interruptable()`.
+
+		:param str query:  SQL query
+		:param list args:  Replacement variables
+		:param int itersize:  Rows to fetch at a time
+		:param bool readonly:  Whether the query only reads data, in which
+		case it may be run on a replica
+		:return:  Generator yielding rows, as dictionaries
+		"""
+		return self.fetch_iter(query, *args, itersize=itersize, interruptable=True, readonly=readonly)
+
+	@contextlib.contextmanager
+	def interruptable(self, connection, enabled=True):
+		"""
+		Context manager for running interruptable queries on a connection
+
+		Registers the connection as running an interruptable query, so it may
+		be cancelled with `cancel_queries()`, and sets a statement timeout for
+		the current transaction. Query cancellations are raised as a
+		`DatabaseQueryInterruptedException`.
+
+		:param connection:  Connection the query is run on
+		:param bool enabled:  If `False`, do nothing, for convenience
+		"""
+		if not enabled:
+			yield
+			return
+
+		with Database.interruptable_lock:
+			Database.interruptable_queries[connection] = self
+
+		try:
+			# only applies until the end of the transaction
+			with connection.cursor() as cursor:
+				cursor.execute("SET LOCAL statement_timeout = %s", (int(self.interruptable_timeout * 1000),))
+
+			yield
+		except psycopg2.extensions.QueryCanceledError as e:
+			# interrupted by the backend (or manually), or timed out
+			if "statement timeout" in str(e):
+				raise DatabaseQueryInterruptedException("Database query took longer than %i seconds" % self.interruptable_timeout)
+			else:
+				raise DatabaseQueryInterruptedException("Interrupted while querying database")
+		finally:
+			with Database.interruptable_lock:
+				Database.interruptable_queries.pop(connection, None)
+
+	def get_replica_pool(self):
+		"""
+		Get the connection pool of a replica to run read-only queries on
+
+		Replicas are configured with `DB_REPLICAS`. Of the replicas that can
+		be reached and lag behind the primary by no more than
+		`replica_max_lag` seconds, the one with the least lag is used.
+
+		:return ConnectionPool:  Replica's pool, or `None` if no replica is
+		available, in which case the primary should be used
+		"""
+		best_pool = None
+		best_lag = None
+		for dsn in self.replicas:
+			pool = ConnectionPool.get(replica=True, dsn=dsn)
+			lag = pool.get_lag(self.appname)
+			if lag is None or lag > self.replica_max_lag:
+				continue
+
+			if best_pool is None or lag < best_lag:
+				best_pool = pool
+				best_lag = lag
+
+		if self.replicas and not best_pool:
+			self.log.debug("No replica available (unreachable or lagging), using primary for read-only query")
+
+		return best_pool
+
+	@staticmethod
+	def get_interruptable_queries(database=None):
+		"""
+		Get connections running interruptable queries in this process
+
+		:param Database database:  Only return queries run via this Database
+		object
+		:return set:  Connections, which may be passed to `cancel_queries()`
+		"""
+		with Database.interruptable_lock:
+			return {connection for connection, owner in Database.interruptable_queries.items() if database is None or owner is database}
+
+	@staticmethod
+	def after_fork():
+		"""
+		Reset query registry in a forked child process
+
+		Queries running in the parent are not the child's to cancel.
+		"""
+		Database.interruptable_queries = {}
+		Database.interruptable_lock = threading.Lock()
+
+	def cancel_queries(self, connections):
+		"""
+		Cancel running queries
+
+		Queries on the primary are cancelled with `pg_cancel_backend()`. Since
+		a connection cannot run a query while it is waiting for another, this
+		should be called on a different connection than the ones whose queries
+		are cancelled. Queries on replicas are cancelled via their own
+		connection's cancellation request.
+
+		:param connections:  Connections running the queries
+		:return int:  Number of queries that were signalled to cancel
+		"""
+		if not connections:
+			return 0
+
+		self.log.info("Cancelling %i interruptable Postgres queries" % len(connections))
+		cancelled = 0
+		pids = []
+		for connection in connections:
+			if not connection.is_replica:
+				pids.append(connection.backend_pid)
+				continue
+
+			try:
+				connection.cancel()
+				cancelled += 1
+			except psycopg2.Error:
+				# query ended in the meantime
+				pass
+
+		if pids:
+			result = self.fetchone("SELECT COUNT(*) AS num FROM unnest(%s) AS pid WHERE pg_cancel_backend(pid)", (pids,))
+			self.commit()
+			cancelled += result["num"] if result else 0
+
+		return cancelled
+
+	def listen(self, channel):
+		"""
+		Subscribe to a notification channel
 
-		# clean up cancelling job when we have the data
-		self.interruptable_job.finish()
-		self.interruptable_job = None
+		Puts the connection in autocommit mode, since notifications are only
+		delivered outside of transactions. A connection used for listening
+		should therefore not be used for anything else.
 
+		:param str channel:  Channel to listen on
+		"""
+		connection = self.connection
+		connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+
+		# the connection would keep listening after being returned to the
+		# pool, so it should be closed instead
+		connection.reusable = False
+		cursor = self.get_cursor()
+		cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
 		cursor.close()
-		return result
 
+	def notify(self, channel, payload="", commit=True):
+		"""
+		Send a notification to all connections listening on a channel
+
+		Notifications are only delivered once the transaction they were sent
+		in is committed.
+
+		:param str channel:  Channel to notify
+		:param str payload:  Notification payload
+		:param bool commit:  Whether to commit after sending the notification
+		"""
+		cursor = self.get_cursor()
+		cursor.execute("SELECT pg_notify(%s, %s)", (channel, str(payload)))
+		cursor.close()
+
+		if commit:
+			self.commit()
+
+	def get_notifications(self):
+		"""
+		Collect notifications received on this connection
+
+		Reads any pending data from the connection socket, and returns all
+		notifications received so far. This does not block; use `select()` on
+		the connection to wait for notifications to arrive.
+
+		:return list:  List of `psycopg2.extensions.Notify` objects
+		"""
+		connection = self.connection
+		connection.poll()
+		notifications = list(connection.notifies)
+		connection.notifies.clear()
+
+		return notifications
 
 	def commit(self):
 		"""
@@ -326,11 +907,17 @@ class Database:
 
 	def close(self):
 		"""
-		Close connection
+		Return the current thread's connection to the pool
 
-		Running queries after this is probably a bad idea!
+		Any uncommitted changes are rolled back. If the Database object is
+		used again afterwards, a new connection is checked out.
 		"""
-		self.connection.close()
+		checkout = getattr(self.local, "checkout", None)
+		if checkout is not None:
+			self.local.checkout = None
+			checkout.release()
+
+		self.pool.put_returned()
 
 	def get_cursor(self):
 		"""
@@ -342,3 +929,66 @@ class Database:
 		:return: Cursor
 		"""
 		return self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+
+class CopyStream:
+	"""
+	File-like object that reads rows as COPY data
+
+	Encodes rows in PostgreSQL's text COPY format, as they are requested by
+	`cursor.copy_expert()`, so only a buffer's worth of rows is kept in memory
+	at a time. See `Database.copy_rows()`.
+	"""
+	buffer_size = 65536  # characters to read at a time
+
+	# backslashes and characters that would otherwise be read as column or
+	# row separators need to be escaped. NUL characters cannot be stored in
+	# text columns at all, so they are removed
+	escapes = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": ""})
+
+	def __init__(self, rows):
+		"""
+		:param rows:  Iterable of rows, each row a tuple or list of values
+		"""
+		self.rows = iter(rows)
+		self.num_rows = 0
+
+	def read(self, size=-1):
+		"""
+		Read COPY data
+
+		:param int size:  Characters to read, at least; the last row added
+		may make the result longer. If negative, all rows are read.
+		:return str:  COPY data, or an empty string once all rows have been
+		read
+		"""
+		chunks = []
+		length = 0
+		for row in self.rows:
+			line = "\t".join([self.encode(value) for value in row]) + "\n"
+			chunks.append(line)
+			length += len(line)
+			self.num_rows += 1
+
+			if 0 <= size <= length:
+				break
+
+		return "".join(chunks)
+
+	def encode(self, value):
+		"""
+		Encode a value for the COPY text format
+
+		:param value:  Value
+		:return str:  Encoded value
+		"""
+		if value is None:
+			return "\\N"
+		elif isinstance(value, bool):
+			return "t" if value else "f"
+		else:
+			return str(value).translate(self.escapes)
+
+
+if hasattr(os, "register_at_fork"):
+	os.register_at_fork(after_in_child=Database.after_fork)
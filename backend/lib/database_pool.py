@@ -0,0 +1,263 @@
+"""
+Connection pool for the Postgres database wrapper
+"""
+import psycopg2.extras
+import collections
+import threading
+import psycopg2
+import time
+import os
+
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+import config
+
+
+class PooledConnection(psycopg2.extensions.connection):
+	"""
+	Postgres connection with some bookkeeping for the pool
+	"""
+	appname = None  # application name currently set for the connection
+	last_used = 0  # when the connection was last checked out or returned
+	reusable = True  # whether the connection may be handed out again after returning it
+	is_replica = False  # whether the connection is to a read replica
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+		# kept so queries can be cancelled without asking the connection
+		self.backend_pid = self.get_backend_pid()
+
+		# prepared statements live as long as the connection, so they are
+		# tracked here. see Database.prepare()
+		self.prepared = collections.OrderedDict()  # query => statement name
+		self.query_uses = collections.OrderedDict()  # query => times used, or -1 if it cannot be prepared
+		self.statement_index = 0
+
+
+class ConnectionPool:
+	"""
+	Pool of Postgres connections
+
+	There is one pool per set of connection details per process, shared by all
+	Database objects using those details. Connections are checked out by a
+	Database for a thread, and returned when that thread no longer needs it.
+	Returned connections are kept open (up to `min_connections` of them) and
+	re-used, so connecting to the database is mostly done only once.
+
+	Connections that have been idle for a while are checked before being
+	handed out again, and replaced if they turn out to be broken.
+	"""
+	pools = {}
+	pools_lock = threading.Lock()
+
+	# pools inherited from a parent process via fork(). Their connections
+	# belong to the parent, so they should not be used or closed; they are
+	# referenced here so they are not garbage-collected (and thereby closed)
+	abandoned = []
+
+	min_connections = config.DB_POOL_MIN if hasattr(config, "DB_POOL_MIN") else 4  # idle connections to keep open
+	max_connections = config.DB_POOL_MAX if hasattr(config, "DB_POOL_MAX") else 64  # connections open at most
+	timeout = config.DB_POOL_TIMEOUT if hasattr(config, "DB_POOL_TIMEOUT") else 30  # seconds to wait for a free connection
+	check_after = 60  # seconds a connection may be idle before it is checked on checkout
+	lag_check_after = config.DB_REPLICA_LAG_INTERVAL if hasattr(config, "DB_REPLICA_LAG_INTERVAL") else 10  # seconds to cache a replica's lag for
+
+	def __init__(self, replica=False, **connect_args):
+		"""
+		Set up pool
+
+		:param bool replica:  Whether the pool is for a read replica
+		:param connect_args:  Connection details, passed to `psycopg2.connect()`
+		"""
+		self.returned = collections.deque()
+		self.replica = replica
+
+		# replication lag, and when it was last measured; see get_lag()
+		self.lag = None
+		self.lag_checked = 0
+		self.lag_lock = threading.Lock()
+
+		# connections are opened when they are first needed, rather than all
+		# at once here
+		self.pool = ThreadedConnectionPool(0, self.max_connections, connection_factory=PooledConnection, **connect_args)
+		self.pool.minconn = self.min_connections
+
+	@classmethod
+	def get(cls, **connect_args):
+		"""
+		Get the pool for a set of connection details
+
+		:param connect_args:  Connection details
+		:return ConnectionPool:
+		"""
+		key = tuple(sorted(connect_args.items()))
+		with cls.pools_lock:
+			if key not in cls.pools:
+				cls.pools[key] = cls(**connect_args)
+
+			return cls.pools[key]
+
+	@classmethod
+	def after_fork(cls):
+		"""
+		Forget about the parent process's pools in a forked child process
+
+		The child gets its own pools once it connects to the database.
+		"""
+		cls.abandoned.extend(cls.pools.values())
+		cls.pools = {}
+		cls.pools_lock = threading.Lock()
+
+	def checkout(self, appname):
+		"""
+		Get a connection from the pool
+
+		If all connections are in use, this waits for one to be returned, for
+		up to `timeout` seconds.
+
+		:param str appname:  Application name to use for the connection, to
+		trace it in pg_stat_activity
+		:return PooledConnection:
+		"""
+		deadline = time.time() + self.timeout
+		while True:
+			self.put_returned()
+			try:
+				connection = self.pool.getconn()
+			except PoolError:
+				if time.time() > deadline:
+					raise
+				time.sleep(0.1)
+				continue
+
+			if self.is_healthy(connection):
+				break
+
+			self.pool.putconn(connection, close=True)
+
+		if connection.appname != appname:
+			with connection.cursor() as cursor:
+				cursor.execute("SET application_name = %s", (appname,))
+			connection.commit()
+			connection.appname = appname
+
+		connection.last_used = time.time()
+		connection.is_replica = self.replica
+		return connection
+
+	def get_lag(self, appname):
+		"""
+		Get replication lag for a replica
+
+		This is the time since the last transaction replayed on the replica, or
+		0 if it has replayed everything it received from the primary. It is
+		measured at most once every `lag_check_after` seconds.
+
+		:param str appname:  Application name to use for the connection
+		:return float:  Lag in seconds, or `None` if the replica cannot be
+		reached or is not a replica at all
+		"""
+		with self.lag_lock:
+			if time.time() - self.lag_checked < self.lag_check_after:
+				return self.lag
+
+			self.lag_checked = time.time()
+			try:
+				connection = self.checkout(appname)
+			except (psycopg2.Error, PoolError):
+				self.lag = None
+				return self.lag
+
+			try:
+				with connection.cursor() as cursor:
+					cursor.execute("SELECT pg_is_in_recovery(), CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END")
+					in_recovery, lag = cursor.fetchone()
+				connection.rollback()
+				self.lag = float(lag) if in_recovery and lag is not None else None
+			except psycopg2.Error:
+				self.lag = None
+			finally:
+				self.release(connection)
+
+			return self.lag
+
+	def release(self, connection):
+		"""
+		Return a connection to the pool
+
+		This may be called from any thread, including from finalizers, so the
+		connection is only actually put back into the pool with the next
+		checkout.
+
+		:param PooledConnection connection:
+		"""
+		self.returned.append(connection)
+
+	def put_returned(self):
+		"""
+		Put returned connections back into the pool
+
+		Connections still in a transaction are rolled back by the pool;
+		connections that should not be re-used are closed.
+		"""
+		while self.returned:
+			connection = self.returned.popleft()
+			connection.last_used = time.time()
+			self.pool.putconn(connection, close=not connection.reusable)
+
+	def is_healthy(self, connection):
+		"""
+		Check if a connection can still be used
+
+		Connections that were recently used are assumed to be fine; others
+		are checked with a trivial query.
+
+		:param PooledConnection connection:
+		:return bool:
+		"""
+		if connection.closed or connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+			return False
+
+		if time.time() - connection.last_used < self.check_after:
+			return True
+
+		try:
+			with connection.cursor() as cursor:
+				cursor.execute("SELECT 1")
+			connection.rollback()
+			return True
+		except psycopg2.Error:
+			return False
+
+
+class Checkout:
+	"""
+	A connection checked out from the pool for a thread
+
+	Database objects keep these in thread-local storage. When the thread ends
+	or the Database is discarded, the checkout is garbage-collected and the
+	connection is returned to the pool.
+	"""
+	def __init__(self, pool, connection):
+		"""
+		:param ConnectionPool pool:  Pool the connection came from
+		:param PooledConnection connection:  Connection
+		"""
+		self.pool = pool
+		self.connection = connection
+		self.cursor = connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+
+	def release(self):
+		"""
+		Return the connection to the pool
+		"""
+		if self.connection is not None:
+			self.pool.release(self.connection)
+			self.connection = None
+
+	def __del__(self):
+		self.release()
+
+
+if hasattr(os, "register_at_fork"):
+	os.register_at_fork(after_in_child=ConnectionPool.after_fork)
@@ -1,4 +1,5 @@
 import collections
+import threading
 import hashlib
 import random
 import shutil
@@ -11,6 +12,9 @@ from pathlib import Path
 import config
 import backend
 from backend.lib.job import Job, JobNotFoundException
+from backend.lib.columnar import get_sidecar_path
+from backend.lib.compression import get_compression, compress_file, find_stored_file, get_stored_paths
+from backend.lib.store import is_enabled as store_enabled, store_file, link_file, get_object_paths
 from backend.lib.helpers import get_software_version
 
 
@@ -31,11 +35,28 @@ class DataSet:
 	data = {}
 	key = ""
 
-	children = []
-	processors = {}
-	genealogy = []
 	parameters = {}
 
+	# loaded when first needed; see the children, processors and genealogy
+	# properties
+	_children = None
+	_processors = None
+	_genealogy = None
+
+	# datasets loaded in the current scope (e.g. a web request or a job), by
+	# key, per thread. see start_identity_scope()
+	identity_map = threading.local()
+
+	# status updates are written at most once per this many seconds; see
+	# update_status(). datasets with updates yet to be written are kept per
+	# thread, and written by a timer once the interval has passed
+	status_interval = config.STATUS_UPDATE_INTERVAL if hasattr(config, "STATUS_UPDATE_INTERVAL") else 2
+	status_buffer = threading.local()
+	status_lock = threading.Lock()
+	_status_written = 0
+	_status_timer = None
+	_progress_start = None
+
 	db = None
 	folder = None
 	is_new = True
@@ -62,7 +83,7 @@ class DataSet:
 
 			query = current["query"]
 		elif job is not None:
-			current = self.db.fetchone("SELECT * FROM datasets WHERE parameters::json->>'job' = %s", (job,))
+			current = self.db.fetchone("SELECT * FROM datasets WHERE job = %s", (job,))
 			if not current:
 				raise TypeError("DataSet() requires a valid job ID for its 'job' argument")
 
@@ -95,8 +116,12 @@ class DataSet:
 				"key": self.key,
 				"query": self.get_label(parameters, default=type),
 				"parameters": json.dumps(parameters),
+				**DataSet.get_parameter_columns(parameters),
 				"result_file": "",
+				"result_hash": "",
+				"cache_key": "",
 				"status": "",
+				"progress": "",
 				"type": type,
 				"timestamp": int(time.time()),
 				"is_finished": False,
@@ -112,11 +137,218 @@ class DataSet:
 			self.db.insert("datasets", data=self.data)
 			self.reserve_result_file(parameters, extension)
 
-		# retrieve analyses and processors that may be run for this dataset
-		analyses = self.db.fetchall("SELECT * FROM datasets WHERE key_parent = %s ORDER BY timestamp ASC", (self.key,))
-		self.children = sorted([DataSet(data=analysis, db=self.db) for analysis in analyses],
-							   key=lambda dataset: dataset.is_finished(), reverse=True)
-		self.processors = self.get_available_processors()
+		DataSet.remember(self)
+
+	@property
+	def children(self):
+		"""
+		Datasets that have this dataset as their parent
+
+		Loaded from the database when first requested. Finished datasets come
+		first, otherwise they are ordered by creation time.
+
+		:return list:  Child datasets
+		"""
+		if self._children is None:
+			analyses = self.db.fetchall("SELECT * FROM datasets WHERE key_parent = %s ORDER BY timestamp ASC", (self.key,))
+			self._children = self.sort_children([DataSet(data=analysis, db=self.db) for analysis in analyses])
+
+		return self._children
+
+	@property
+	def processors(self):
+		"""
+		Processors that may be run for this dataset
+
+		Determined when first requested; see `get_available_processors()`.
+
+		:return dict:  Available processors, `name => properties` mapping
+		"""
+		if self._processors is None:
+			self._processors = self.get_available_processors()
+
+		return self._processors
+
+	@property
+	def genealogy(self):
+		"""
+		Genealogy of this dataset
+
+		Determined when first requested; see `get_genealogy()`.
+
+		:return list:  Dataset genealogy, oldest dataset first
+		"""
+		return self.get_genealogy()
+
+	@staticmethod
+	def get_parameter_columns(parameters):
+		"""
+		Get values for the columns that mirror dataset parameters
+
+		The data source and user a dataset was created for are part of its
+		parameters, but are also stored in separate columns so datasets can be
+		looked up by them efficiently.
+
+		:param dict parameters:  Dataset parameters
+		:return dict:  Column values, `column => value` mapping
+		"""
+		return {
+			"datasource": str(parameters.get("datasource", "")),
+			"owner": str(parameters.get("user", ""))
+		}
+
+	@staticmethod
+	def sort_children(children):
+		"""
+		Sort child datasets, finished datasets first
+
+		The sort is stable, so otherwise the original order is kept.
+
+		:param list children:  Datasets
+		:return list:  Sorted datasets
+		"""
+		return sorted(children, key=lambda dataset: dataset.is_finished(), reverse=True)
+
+	@staticmethod
+	def start_identity_scope():
+		"""
+		Start keeping track of loaded datasets for the current thread
+
+		Until `end_identity_scope()` is called, datasets retrieved with
+		`get_by_key()` are only loaded from the database once; afterwards, the
+		same object is returned. Genealogies also re-use these objects. Nested
+		scopes are part of the outermost scope.
+
+		:return bool:  Whether a new scope was started
+		"""
+		if getattr(DataSet.identity_map, "datasets", None) is not None:
+			return False
+
+		DataSet.identity_map.datasets = {}
+		return True
+
+	@staticmethod
+	def end_identity_scope():
+		"""
+		Stop keeping track of loaded datasets for the current thread
+		"""
+		DataSet.identity_map.datasets = None
+
+	@staticmethod
+	def remember(dataset):
+		"""
+		Add a dataset to the current thread's identity scope, if there is one
+
+		If a dataset with the same key was loaded earlier, that one is kept.
+
+		:param DataSet dataset:
+		"""
+		datasets = getattr(DataSet.identity_map, "datasets", None)
+		if datasets is not None:
+			datasets.setdefault(dataset.key, dataset)
+
+	@staticmethod
+	def get_by_key(key, db):
+		"""
+		Get a dataset by its key
+
+		Like `DataSet(key=key, db=db)`, but if an identity scope is active and
+		the dataset was loaded before within it, that object is returned
+		instead of loading it again.
+
+		:param str key:  Dataset key
+		:param db:  Database connection
+		:return DataSet:
+		"""
+		datasets = getattr(DataSet.identity_map, "datasets", None)
+		if datasets is not None and key in datasets:
+			return datasets[key]
+
+		return DataSet(key=key, db=db)
+
+	@staticmethod
+	def from_record(record, db):
+		"""
+		Get a dataset from its database record
+
+		Like `DataSet(data=record, db=db)`, but re-uses a dataset with the
+		same key from the current identity scope, if available.
+
+		:param dict record:  Dataset record
+		:param db:  Database connection
+		:return DataSet:
+		"""
+		datasets = getattr(DataSet.identity_map, "datasets", None)
+		if datasets is not None and record["key"] in datasets:
+			return datasets[record["key"]]
+
+		return DataSet(data=record, db=db)
+
+	@staticmethod
+	def get_trees(keys, db):
+		"""
+		Load datasets along with all their descendants
+
+		All datasets in the trees below the given datasets are fetched with a
+		single query, and the `children` of each dataset (and, where the
+		dataset at the root of the tree has no parent, its `genealogy`) are
+		filled in, so no further queries are needed to traverse the trees.
+
+		:param list keys:  Keys of the datasets to load
+		:param db:  Database connection
+		:return list:  Datasets, in the same order as the given keys. Keys
+		for which no dataset exists are left out.
+		"""
+		if not keys:
+			return []
+
+		rows = db.fetchall("""
+			WITH RECURSIVE tree AS (
+				SELECT * FROM datasets WHERE key IN %s
+			  UNION
+				SELECT datasets.* FROM datasets, tree WHERE datasets.key_parent = tree.key
+			)
+			SELECT * FROM tree ORDER BY timestamp ASC
+		""", (tuple(keys),))
+
+		datasets = {row["key"]: DataSet.from_record(row, db=db) for row in rows}
+		children = {key: [] for key in datasets}
+		for dataset in datasets.values():
+			if dataset.key_parent in children:
+				children[dataset.key_parent].append(dataset)
+
+		for key, dataset in datasets.items():
+			dataset._children = DataSet.sort_children(children[key])
+
+		# genealogies can be derived from the tree, but only for datasets
+		# whose whole ancestry is part of it
+		def set_genealogy(dataset, ancestors):
+			dataset._genealogy = [*ancestors, dataset]
+			for child in dataset.children:
+				set_genealogy(child, dataset._genealogy)
+
+		for key in keys:
+			if key in datasets and not datasets[key].key_parent:
+				set_genealogy(datasets[key], [])
+
+		return [datasets[key] for key in keys if key in datasets]
+
+	@staticmethod
+	def get_tree(key, db):
+		"""
+		Load a dataset along with all its descendants
+
+		See `get_trees()`.
+
+		:param str key:  Dataset key
+		:param db:  Database connection
+		:return DataSet:  Dataset
+		"""
+		tree = DataSet.get_trees([key], db)
+		if not tree:
+			raise TypeError("DataSet.get_tree() requires a valid dataset key, \"%s\" given" % key)
+
+		return tree[0]
 
 	def check_dataset_finished(self):
 		"""
@@ -144,10 +376,147 @@ class DataSet:
 		data, but may not do so yet. Use this to get the location to write
 		generated results to.
 
+		Once a dataset is done, its results file may be compressed (see
+		`compress_results()`), in which case it is stored under a different
+		name. Use `open_stored_file()` to read it regardless.
+
 		:return Path:  A path to the results file
 		"""
 		return self.folder.joinpath(self.data["result_file"])
 
+	def compress_results(self):
+		"""
+		Compress the results file
+
+		Only CSV files are compressed, and only if `DATASET_COMPRESSION` is
+		set. This should only be done once nothing will be written to the file
+		anymore.
+
+		:return Path:  Path to the stored results file
+		"""
+		path = self.get_results_path()
+		compression = get_compression()
+		if compression and path.suffix == ".csv" and path.exists():
+			return compress_file(path, compression)
+
+		return find_stored_file(path)
+
+	def store_results(self):
+		"""
+		Put the results file in the content-addressed store
+
+		Datasets with identical results then share one file on disk. The hash
+		of the file's contents is saved as the dataset's `result_hash`; stored
+		files are kept as long as any dataset refers to them by that hash.
+		This should only be done once nothing will be written to the file
+		anymore, i.e. after `compress_results()`.
+
+		:return str:  Hash of the results file, or an empty string if it was
+		not stored
+		"""
+		if not store_enabled() or "result_hash" not in self.data:
+			return ""
+
+		content_hash = store_file(self.get_results_path())
+		if content_hash != self.data["result_hash"]:
+			self.result_hash = content_hash
+
+		return content_hash
+
+	def link_results(self, target):
+		"""
+		Make the results of this dataset the results of another dataset
+
+		The results file is linked rather than copied where possible, so this
+		is cheap even for large files. Any results the target dataset already
+		had are replaced.
+
+		:param DataSet target:  Dataset to link results to
+		"""
+		for path in [*get_stored_paths(target.get_results_path()), get_sidecar_path(target.get_results_path())]:
+			if path.exists():
+				path.unlink()
+
+		stored = find_stored_file(self.get_results_path())
+		if stored.exists():
+			link_file(stored, target.get_results_path().with_name(target.get_results_path().name + stored.name[len(self.get_results_path().name):]))
+
+		sidecar = get_sidecar_path(self.get_results_path())
+		if sidecar.exists():
+			link_file(sidecar, get_sidecar_path(target.get_results_path()))
+
+		if "result_hash" in self.data and target.data.get("result_hash") != self.data["result_hash"]:
+			target.result_hash = self.data["result_hash"]
+
+	def get_cache_key(self):
+		"""
+		Get key by which the results of this dataset may be re-used
+
+		Results can be re-used by a later dataset if that was created by the
+		same processor, running the same code, with the same options, on a
+		parent dataset with the same contents. Options are normalised:
+		defaults are filled in, and parameters that are not options of the
+		processor (such as the user that queued it) are ignored.
+
+		:return str:  Cache key, or an empty string if the results of this
+		dataset cannot be re-used
+		"""
+		if not (config.DATASET_CACHE if hasattr(config, "DATASET_CACHE") else True):
+			return ""
+
+		processor = backend.all_modules.processors.get(self.type)
+		if not processor or not processor.get("cacheable") or not self.data.get("key_parent"):
+			return ""
+
+		# datasets that queue or attach to other datasets do more than
+		# produce results, so those are always processed
+		if any([parameter in self.parameters for parameter in ("next", "attach_to", "copy_to")]):
+			return ""
+
+		try:
+			parent = DataSet.get_by_key(self.data["key_parent"], db=self.db)
+		except TypeError:
+			return ""
+
+		if not parent.is_finished() or not parent.data.get("result_hash"):
+			return ""
+
+		options = {option: self.parameters.get(option, settings.get("default")) for option, settings in
+				   processor["options"].items()}
+		plain_key = json.dumps([self.type, options, parent.data["result_hash"], processor["version"],
+								get_software_version()], sort_keys=True, default=str)
+
+		return hashlib.sha256(plain_key.encode("utf-8")).hexdigest()
+
+	def use_cached_results(self):
+		"""
+		Finish this dataset with the results of an identical earlier dataset
+
+		If a finished dataset with the same cache key (see `get_cache_key()`)
+		exists, its results are linked to this dataset, and this dataset is
+		finished, so it need not be processed anymore.
+
+		:return bool:  Whether earlier results were used
+		"""
+		cache_key = self.get_cache_key()
+		if not cache_key or "cache_key" not in self.data or self.is_finished():
+			return False
+
+		cached = self.db.fetchone("SELECT * FROM datasets WHERE cache_key = %s AND key != %s AND is_finished = TRUE AND result_hash != '' ORDER BY timestamp DESC LIMIT 1", (cache_key, self.key))
+		if not cached:
+			return False
+
+		cached = DataSet.from_record(cached, self.db)
+		if not find_stored_file(cached.get_results_path()).exists():
+			return False
+
+		cached.link_results(self)
+		self.cache_key = cache_key
+		self.update_status("Dataset saved (re-used results of an identical earlier analysis).", is_final=True)
+		self.finish(cached.num_rows)
+
+		return True
+
 	def get_temporary_path(self):
 		"""
 		Get path to a temporary folder
@@ -190,8 +559,11 @@ class DataSet:
 		if self.data["is_finished"]:
 			raise RuntimeError("Cannot finish a finished dataset again")
 
+		# pending status updates are written along with this
+		DataSet.get_pending_statuses().discard(self)
 		self.db.update("datasets", where={"key": self.data["key"]},
-					   data={"is_finished": True, "num_rows": num_rows})
+					   data={"is_finished": True, "num_rows": num_rows, "status": self.data["status"],
+							 "progress": self.data.get("progress", "")})
 		self.data["is_finished"] = True
 		self.data["num_rows"] = num_rows
 
@@ -202,21 +574,31 @@ class DataSet:
 		if not self.is_finished():
 			raise RuntimeError("Cannot unfinish an unfinished dataset")
 
-		try:
-			self.get_results_path().unlink()
-		except FileNotFoundError:
-			pass
+		for path in [*get_stored_paths(self.get_results_path()), get_sidecar_path(self.get_results_path())]:
+			try:
+				path.unlink()
+			except FileNotFoundError:
+				pass
+
+		content_hash = self.data.get("result_hash")
+		if content_hash:
+			self.result_hash = ""
+			self.cache_key = ""
+			DataSet.remove_files(DataSet.get_unused_objects([content_hash], self.db))
 
 		self.data["timestamp"] = int(time.time())
 		self.data["is_finished"] = False
 		self.data["num_rows"] = 0
 		self.data["status"] = "Dataset is queued."
+		self.data["progress"] = ""
+		DataSet.get_pending_statuses().discard(self)
 
 		self.db.update("datasets", data={
 			"timestamp": self.data["timestamp"],
 			"is_finished": self.data["is_finished"],
 			"num_rows": self.data["num_rows"],
-			"status": self.data["status"]
+			"status": self.data["status"],
+			"progress": self.data["progress"]
 		}, where={"key": self.key})
 
 	def copy(self, shallow=True):
@@ -250,8 +632,9 @@ class DataSet:
 			# use the same result file
 			copy.result_file = self.result_file
 		else:
-			# copy to new file with new key
-			shutil.copy(self.get_results_path(), copy.get_results_path())
+			# link to new file with new key - this is a copy, but without
+			# duplicating the data on disk
+			self.link_results(copy)
 
 		if self.is_finished():
 			copy.finish(self.num_rows)
@@ -265,21 +648,103 @@ class DataSet:
 		Deletes both database records and result files. Note that manipulating
 		a dataset object after it has been deleted is undefined behaviour.
 		"""
-		# first, recursively delete children
-		children = self.db.fetchall("SELECT * FROM datasets WHERE key_parent = %s", (self.key,))
-		for child in children:
-			child = DataSet(key=child["key"], db=self.db)
-			child.delete()
+		DataSet.remove_files(DataSet.delete_trees([self.key], db=self.db))
+
+	@staticmethod
+	def delete_trees(keys, db):
+		"""
+		Delete datasets and all their descendants from the database
 
-		# delete from database
-		self.db.execute("DELETE FROM datasets WHERE key = %s", (self.key,))
+		The datasets in the trees below the given datasets are collected and
+		deleted with a single query. Files are left alone; pass the returned
+		paths to `remove_files()` to delete those as well.
 
-		# delete from drive
-		try:
-			self.get_results_path().unlink()
-		except FileNotFoundError:
-			# already deleted, apparently
-			pass
+		:param list keys:  Keys of the datasets to delete
+		:param db:  Database connection
+		:return list:  Paths of the result files and staging folders of the
+		deleted datasets, and of stored result files no longer in use
+		"""
+		if not keys:
+			return []
+
+		deleted = db.fetchall("""
+			WITH RECURSIVE tree AS (
+				SELECT key FROM datasets WHERE key IN %s
+			  UNION
+				SELECT datasets.key FROM datasets, tree WHERE datasets.key_parent = tree.key
+			)
+			DELETE FROM datasets USING tree WHERE datasets.key = tree.key RETURNING datasets.result_file, datasets.result_hash
+		""", (tuple(keys),))
+		db.commit()
+
+		# shallow copies share the result file of the dataset they were
+		# copied from, so keep files that are still in use
+		result_files = {row["result_file"] for row in deleted if row["result_file"]}
+		if result_files:
+			in_use = db.fetchall("SELECT DISTINCT result_file FROM datasets WHERE result_file IN %s", (tuple(result_files),))
+			result_files -= {row["result_file"] for row in in_use}
+
+		folder = Path(config.PATH_ROOT, config.PATH_DATA)
+		paths = []
+		for result_file in sorted(result_files):
+			paths.extend(get_stored_paths(folder.joinpath(result_file)))
+			paths.append(get_sidecar_path(folder.joinpath(result_file)))
+			# see get_temporary_path()
+			paths.extend(folder.glob(result_file.replace(".", "") + "-staging*"))
+
+		return paths + DataSet.get_unused_objects([row["result_hash"] for row in deleted], db)
+
+	@staticmethod
+	def get_unused_objects(hashes, db):
+		"""
+		Get stored result files that no dataset refers to anymore
+
+		:param list hashes:  Hashes of stored files that may be unused
+		:param db:  Database connection
+		:return list:  Paths of stored files that can be removed
+		"""
+		hashes = {content_hash for content_hash in hashes if content_hash}
+		if not hashes:
+			return []
+
+		in_use = db.fetchall("SELECT DISTINCT result_hash FROM datasets WHERE result_hash IN %s", (tuple(hashes),))
+		hashes -= {row["result_hash"] for row in in_use}
+
+		return [path for content_hash in sorted(hashes) for path in get_object_paths(content_hash)]
+
+	@staticmethod
+	def remove_files(paths, callback=None, interval=250):
+		"""
+		Remove dataset files and folders from disk
+
+		:param list paths:  Paths of files and folders to remove, e.g. as
+		returned by `delete_trees()`
+		:param callback:  Called every `interval` paths, and once all are
+		removed, with the amount of paths handled so far, the total amount of
+		paths, and the amount of bytes freed so far
+		:param int interval:  How often to call the callback
+		:return int:  Bytes freed
+		"""
+		freed = 0
+		for index, path in enumerate(paths):
+			try:
+				if path.is_dir():
+					freed += sum([file.stat().st_size for file in path.rglob("*") if file.is_file()])
+					shutil.rmtree(path)
+				else:
+					# files that are linked elsewhere only free up space
+					# once the last link is removed
+					stats = path.stat()
+					freed += stats.st_size if stats.st_nlink <= 1 else 0
+					path.unlink()
+			except FileNotFoundError:
+				# already deleted, apparently
+				pass
+
+			if callback and ((index + 1) % interval == 0 or index + 1 == len(paths)):
+				callback(index + 1, len(paths), freed)
+
+		return freed
 
 	def is_finished(self):
 		"""
@@ -415,23 +880,161 @@ class DataSet:
 		of earlier dataset statuses; the current status is overwritten when
 		updated.
 
+		Status updates are written to the database at most once every
+		`status_interval` seconds; in between, only the latest status is kept
+		and written later, see `flush_status()`.
+
 		:param string status:  Dataset status
 		:param bool is_final:  If this is `True`, subsequent calls to this
 		method while the object is instantiated will not update the dataset
-		status.
+		status. The status is written to the database immediately.
 		:return bool:  Status update successful?
 		"""
 		if self.no_status_updates:
 			return
 
 		self.data["status"] = status
-		updated = self.db.update("datasets", where={"key": self.data["key"]}, data={"status": status})
 
 		if is_final:
 			self.no_status_updates = True
 
+		return self.buffer_status(force=is_final)
+
+	def update_progress(self, done, total=None, status=None):
+		"""
+		Update dataset progress
+
+		Progress is stored alongside the status, as the amount of items done
+		and (if known) the total amount of items, the rate at which items are
+		processed and the estimated amount of seconds until all are done. Like
+		status updates, progress updates are buffered.
+
+		:param int done:  Items done so far
+		:param int total:  Total items to do, if known
+		:param str status:  Status to set as well, optionally
+		:return bool:  Update successful?
+		"""
+		now = time.time()
+		if self._progress_start is None or done < self._progress_start[1]:
+			self._progress_start = (now, done)
+
+		elapsed = now - self._progress_start[0]
+		rate = (done - self._progress_start[1]) / elapsed if elapsed > 0 else 0
+
+		self.data["progress"] = json.dumps({
+			"done": done,
+			"total": total,
+			"rate": round(rate, 2),
+			"eta": int((total - done) / rate) if total and rate > 0 else None,
+			"timestamp": int(now)
+		})
+
+		if status is not None and not self.no_status_updates:
+			self.data["status"] = status
+
+		return self.buffer_status()
+
+	def get_progress(self):
+		"""
+		Get dataset progress
+
+		:return dict:  Progress, with `done`, `total`, `rate` and `eta` keys
+		(see `update_progress()`), or `None` if no progress is known
+		"""
+		if not self.data.get("progress"):
+			return None
+
+		return json.loads(self.data["progress"])
+
+	def buffer_status(self, force=False):
+		"""
+		Write status and progress, unless they were written very recently
+
+		If they were, the dataset is added to the current thread's list of
+		datasets with pending updates, and a timer is started that writes
+		the pending update once `status_interval` seconds have passed since
+		the last write. Pending updates are also written by another update
+		coming in after that time, and by `flush_pending_statuses()`.
+
+		:param bool force:  Write regardless of when the status was last
+		written
+		:return bool:  Update successful (or buffered)?
+		"""
+		with DataSet.status_lock:
+			wait = self._status_written + self.status_interval - time.time()
+			if not force and wait > 0:
+				pending = DataSet.get_pending_statuses()
+				pending.add(self)
+				if not self._status_timer:
+					self._status_timer = threading.Timer(wait, self.flush_deferred_status, args=(pending,))
+					self._status_timer.daemon = True
+					self._status_timer.start()
+
+				return True
+
+		return self.flush_status()
+
+	def flush_deferred_status(self, pending):
+		"""
+		Write a pending status update from a timer
+
+		Runs in the timer's own thread, so the database connection used for
+		the update is returned to the pool afterwards.
+
+		:param set pending:  Pending updates of the thread that buffered the
+		update; nothing is written if the update is no longer pending
+		"""
+		with DataSet.status_lock:
+			self._status_timer = None
+			if self not in pending:
+				return
+			pending.discard(self)
+
+		try:
+			self.flush_status()
+		finally:
+			self.db.close()
+
+	def flush_status(self):
+		"""
+		Write the current status and progress to the database
+
+		:return bool:  Update successful?
+		"""
+		with DataSet.status_lock:
+			DataSet.get_pending_statuses().discard(self)
+			if self._status_timer:
+				self._status_timer.cancel()
+				self._status_timer = None
+
+			self._status_written = time.time()
+
+		updated = self.db.update("datasets", where={"key": self.data["key"]},
+								 data={"status": self.data["status"], "progress": self.data.get("progress", "")})
 		return updated > 0
 
+	@staticmethod
+	def get_pending_statuses():
+		"""
+		Get datasets with status updates that have not been written yet
+
+		:return set:  Datasets with pending updates, for the current thread
+		"""
+		if getattr(DataSet.status_buffer, "datasets", None) is None:
+			DataSet.status_buffer.datasets = set()
+
+		return DataSet.status_buffer.datasets
+
+	@staticmethod
+	def flush_pending_statuses():
+		"""
+		Write all pending status updates for the current thread
+
+		Called when a job or web request ends, so no updates are lost.
+		"""
+		for dataset in list(DataSet.get_pending_statuses()):
+			dataset.flush_status()
+
 	def update_version(self, version):
 		"""
 		Update software version used for this dataset
@@ -462,8 +1065,9 @@ class DataSet:
 		else:
 			return False
 
-		updated = self.db.update("datasets", where={"key": self.data["key"]},
-								 data={"parameters": json.dumps(parameters)})
+		data = {"parameters": json.dumps(parameters), **DataSet.get_parameter_columns(parameters)}
+		updated = self.db.update("datasets", where={"key": self.data["key"]}, data=data)
+		self.data.update(data)
 		self.parameters = parameters
 
 		return updated > 0
@@ -504,29 +1108,27 @@ class DataSet:
 
 		:return list:  Dataset genealogy, oldest dataset first
 		"""
-		if self.genealogy:
-			return self.genealogy
-
-		key_parent = self.key_parent
-		genealogy = []
-
-		while True:
-			try:
-				parent = DataSet(key=key_parent, db=self.db)
-			except TypeError:
-				break
-
-			genealogy.append(parent)
-			if parent.key_parent:
-				key_parent = parent.key_parent
-			else:
-				break
-
-		genealogy.reverse()
+		if self._genealogy is not None:
+			return self._genealogy
+
+		# all ancestors are fetched at once, oldest first
+		ancestors = []
+		if self.data.get("key_parent"):
+			ancestors = self.db.fetchall("""
+				WITH RECURSIVE ancestors AS (
+					SELECT key, key_parent, 1 AS depth FROM datasets WHERE key = %s
+				  UNION
+					SELECT datasets.key, datasets.key_parent, ancestors.depth + 1 FROM datasets, ancestors
+					 WHERE datasets.key = ancestors.key_parent AND ancestors.key_parent != ''
+				)
+				SELECT datasets.* FROM ancestors, datasets WHERE datasets.key = ancestors.key ORDER BY ancestors.depth DESC
+			""", (self.key_parent,))
+
+		genealogy = [DataSet.from_record(ancestor, db=self.db) for ancestor in ancestors]
 		genealogy.append(self)
 
-		self.genealogy = genealogy
-		return self.genealogy
+		self._genealogy = genealogy
+		return self._genealogy
 
 	def get_breadcrumbs(self):
 		"""
@@ -666,12 +1268,14 @@ class DataSet:
 			attr = "parameters"
 			value = self.parameters
 
+		data = {attr: value}
 		if attr == "parameters":
-			value = json.dumps(value)
+			# keep the columns mirroring parameters in sync
+			data = {"parameters": json.dumps(value), **DataSet.get_parameter_columns(value)}
 
-		self.db.update("datasets", where={"key": self.key}, data={attr: value})
+		self.db.update("datasets", where={"key": self.key}, data=data)
 
-		self.data[attr] = value
+		self.data.update(data)
 
 		if attr == "parameters":
-			self.parameters = json.loads(value)
+			self.parameters = json.loads(data["parameters"])
@@ -85,6 +85,22 @@ def get_software_version():
 		return ""
 
 
+def get_node_id():
+	"""
+	Get identifier of this 4CAT node
+
+	Several backends may share one database; each of them is a node. The ID
+	is used to keep track of which node is running which job. It can be set
+	explicitly in the configuration; if not, the host name is used.
+
+	:return str:  Node ID
+	"""
+	if hasattr(config, "NODE_ID") and config.NODE_ID:
+		return str(config.NODE_ID)
+
+	return socket.gethostname()
+
+
 def convert_to_int(value, default=0):
 	"""
 	Convert a value to an integer, with a fallback
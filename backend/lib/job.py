@@ -5,7 +5,11 @@ Class that represents a job in the job queue
 import time
 import json
 import math
+
+import config
+
 from backend.lib.exceptions import JobClaimedException, JobNotFoundException
+from backend.lib.helpers import get_node_id
 
 
 class Job:
@@ -15,6 +19,12 @@ class Job:
 	data = {}
 	db = None
 
+	# Postgres channel on which changes to the queue are announced
+	NOTIFY_CHANNEL = "4cat_jobs"
+
+	# seconds a claim is valid without being renewed by the claiming node
+	LEASE = config.JOB_LEASE if hasattr(config, "JOB_LEASE") else 120
+
 	is_finished = False
 	is_claimed = False
 
@@ -96,18 +106,36 @@ class Job:
 			# the interval remains as set
 			claim_time = math.floor(int(time.time()) / self.data["interval"]) * self.data["interval"]
 
-		updated = self.db.update("jobs", data={"timestamp_claimed": claim_time, "timestamp_lastclaimed": claim_time},
-								 where={"jobtype": self.data["jobtype"], "remote_id": self.data["remote_id"],
+		claim = {
+			"timestamp_claimed": claim_time,
+			"timestamp_lastclaimed": claim_time,
+			"claimed_by": get_node_id(),
+			"timestamp_lease": int(time.time()) + Job.LEASE
+		}
+
+		updated = self.db.update("jobs", data=claim, where={"jobtype": self.data["jobtype"], "remote_id": self.data["remote_id"],
 										"timestamp_claimed": 0})
 
 		if updated == 0:
 			raise JobClaimedException
 
-		self.data["timestamp_claimed"] = claim_time
-		self.data["timestamp_lastclaimed"] = claim_time
+		self.data.update(claim)
 
 		self.is_claimed = True
 
+	def unclaim(self):
+		"""
+		Undo claiming a job that was not started
+
+		Unlike `release()`, this does not count as an attempt, and does not
+		let the manager know that the job can be claimed again - the claim
+		should be retried later.
+		"""
+		self.db.update("jobs", data={"timestamp_claimed": 0, "claimed_by": "", "timestamp_lease": 0},
+					   where={"jobtype": self.data["jobtype"], "remote_id": self.data["remote_id"]})
+		self.data["timestamp_claimed"] = 0
+		self.is_claimed = False
+
 	def finish(self, delete=False):
 		"""
 		Finish job
@@ -121,28 +149,44 @@ class Job:
 		if self.data["interval"] == 0 or delete:
 			self.db.delete("jobs", where={"jobtype": self.data["jobtype"], "remote_id": self.data["remote_id"]})
 		else:
-			self.db.update("jobs", data={"timestamp_claimed": 0, "attempts": 0},
+			self.db.update("jobs", data={"timestamp_claimed": 0, "attempts": 0, "claimed_by": "", "timestamp_lease": 0},
 						   where={"jobtype": self.data["jobtype"], "remote_id": self.data["remote_id"]})
 
 		self.is_finished = True
+		self.notify()
 
-	def release(self, delay=0, claim_after=0):
+	def release(self, delay=0, claim_after=0, depends_on=None):
 		"""
 		Release a job so it may be claimed again
 
 		:param int delay: Delay in seconds after which job may be reclaimed.
 		:param int claim_after:  Timestamp after which job may be claimed. This
 		is overridden by `delay`.
+		:param Job depends_on:  Job that needs to be finished before this job
+		may be claimed again. Needs to have an ID.
 		"""
-		update = {"timestamp_claimed": 0, "attempts": self.data["attempts"] + 1}
+		update = {"timestamp_claimed": 0, "attempts": self.data["attempts"] + 1, "claimed_by": "", "timestamp_lease": 0}
 		if delay > 0:
 			update["timestamp_after"] = int(time.time()) + delay
 		elif claim_after is not None:
 			update["timestamp_after"] = claim_after
 
+		if depends_on:
+			update["depends_on"] = depends_on.data["id"]
+
 		self.db.update("jobs", data=update,
 					   where={"jobtype": self.data["jobtype"], "remote_id": self.data["remote_id"]})
 		self.is_claimed = False
+		self.notify()
+
+	def notify(self):
+		"""
+		Let the worker manager know the queue has changed
+
+		This sends a Postgres notification, so the manager can look for
+		claimable jobs immediately rather than waiting for its next poll.
+		"""
+		self.db.notify(Job.NOTIFY_CHANNEL, self.data["jobtype"])
 
 	def update_status(self, status):
 		"""
@@ -82,6 +82,22 @@ class Logger:
 
 		self.logger.addHandler(mailer)
 
+	def is_enabled_for(self, level):
+		"""
+		Check whether messages of a given level are logged at all
+
+		Can be used to avoid building expensive log messages that would be
+		discarded anyway.
+
+		:param level:  Severity level, should be a logger.* constant
+		:return bool:
+		"""
+		if self.logger.isEnabledFor(level) or (self.print_logs and level > logging.DEBUG):
+			return True
+
+		# messages may also be sent as alerts, see log()
+		return isinstance(self.alert_level, int) and level >= self.alert_level
+
 	def log(self, message, level=logging.INFO):
 		"""
 		Log message
@@ -89,6 +105,11 @@ class Logger:
 		:param message:  Message to log
 		:param level:  Severity level, should be a logger.* constant
 		"""
+		if not self.is_enabled_for(level):
+			# determining the message's context below is relatively expensive,
+			# so don't bother if it will be discarded anyway
+			return
+
 		if self.print_logs and level > logging.DEBUG:
 			print("LOG: %s" % message)
 
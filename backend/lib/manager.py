@@ -3,12 +3,19 @@ The heart of the app - manages jobs and workers
 """
 import importlib
 import signal
+import select
+import socket
 import time
 import sys
+import os
+
+import config
 
 from backend import all_modules
+from backend.lib.database import Database
 from backend.lib.keyboard import KeyPoller
-from backend.lib.exceptions import JobClaimedException
+from backend.lib.worker_process import WorkerProcess
+from backend.lib.job import Job
 
 
 class WorkerManager:
@@ -24,6 +31,32 @@ class WorkerManager:
 	pool = []
 	looping = True
 
+	listener = None  # Database connection that listens for queue notifications
+	wakeup = None  # socket pair used to wake up the main loop from other threads
+
+	# max amount of seconds to wait for notifications before checking the
+	# queue anyway; delayed and recurring jobs are checked for when they are
+	# due regardless of this value
+	max_wait = 60
+
+	# per-node limits on the amount of workers of a type, in addition to the
+	# global limits defined by the workers themselves
+	node_max_workers = config.NODE_MAX_WORKERS if hasattr(config, "NODE_MAX_WORKERS") else {}
+
+	# leases on claimed jobs are renewed this often, in seconds
+	heartbeat_interval = Job.LEASE / 3
+	last_heartbeat = 0
+
+	# resources (memory in MB, CPU in cores) that workers on this node may use
+	# together, as estimated by the workers. 0 means no limit
+	resource_budget = {
+		"memory": config.WORKER_MEMORY_BUDGET if hasattr(config, "WORKER_MEMORY_BUDGET") else 0,
+		"cpu": config.WORKER_CPU_BUDGET if hasattr(config, "WORKER_CPU_BUDGET") else 0
+	}
+
+	# per job type, the factor by which memory estimates were off in the past
+	memory_correction = {}
+
 	def __init__(self, queue, database, logger, as_daemon=True):
 		"""
 		Initialize manager
@@ -37,6 +70,13 @@ class WorkerManager:
 		self.db = database
 		self.log = logger
 
+		# listen for queue changes on a dedicated connection, since it needs
+		# to be in autocommit mode for notifications to arrive
+		self.listener = Database(logger=self.log, appname="listener")
+		self.listener.listen(Job.NOTIFY_CHANNEL)
+		self.wakeup = socket.socketpair()
+		self.wakeup[1].setblocking(False)
+
 		if not as_daemon:
 			# listen for input if running interactively
 			self.key_poller = KeyPoller(manager=self)
@@ -61,58 +101,247 @@ class WorkerManager:
 		Delegate work
 
 		Checks for open jobs, and then passes those to dedicated workers, if
-		slots are available for those workers.
+		slots are available for those workers. For each job type, as many jobs
+		as there are free worker slots are claimed at once.
 		"""
-		jobs = self.queue.get_all_jobs()
-
 		num_active = sum([len(self.worker_pool[jobtype]) for jobtype in self.worker_pool])
 		self.log.debug("Running workers: %i" % num_active)
 
 		# clean up workers that have finished processing
 		for jobtype in self.worker_pool:
-			all_workers = self.worker_pool[jobtype]
+			all_workers = self.worker_pool[jobtype].copy()
 			for worker in all_workers:
-				if not worker.is_alive():
+				if not worker.is_alive() or worker.is_done:
 					worker.join()
+					self.update_memory_correction(worker)
 					self.worker_pool[jobtype].remove(worker)
 
 			del all_workers
 
+		# keep our claims on running jobs valid, and free up jobs claimed by
+		# nodes that seem to have gone away
+		if self.last_heartbeat < time.time() - self.heartbeat_interval:
+			self.queue.renew_leases()
+			self.queue.release_expired_leases()
+			self.last_heartbeat = time.time()
+
+		# let the outside world know what the queue looks like
+		summary = self.queue.update_queue_summary()
+
 		# check if workers are available for unclaimed jobs
-		for job in jobs:
-			jobtype = job.data["jobtype"]
-
-			if jobtype in all_modules.workers:
-				worker_info = all_modules.workers[jobtype]
-				if jobtype not in self.worker_pool:
-					self.worker_pool[jobtype] = []
-
-				# if a job is of a known type, and that job type has open
-				# worker slots, start a new worker to run it
-				if len(self.worker_pool[jobtype]) < worker_info["max"]:
-					try:
-						self.log.debug("Starting new worker for job %s" % jobtype)
-						job.claim()
-						worker_class = all_modules.load_worker_class(worker_info)
-						worker = worker_class(logger=self.log, manager=self, job=job, modules=all_modules)
-						worker.start()
-						self.worker_pool[jobtype].append(worker)
-					except JobClaimedException:
-						# it's fine
-						pass
-
-		time.sleep(1)
+		for jobtype in self.queue.get_claimable_jobtypes():
+			if jobtype not in all_modules.workers:
+				continue
+
+			worker_info = all_modules.workers[jobtype]
+			if jobtype not in self.worker_pool:
+				self.worker_pool[jobtype] = []
+
+			# if a job is of a known type, and that job type has open
+			# worker slots, start new workers to run as many jobs as fit.
+			# the worker's max is shared by all nodes, and each node may
+			# additionally have its own limit
+			running_here = len(self.worker_pool[jobtype])
+			running_elsewhere = summary.get(jobtype, {}).get("running_elsewhere", 0)
+			available_slots = min(
+				worker_info["max"] - running_here - running_elsewhere,
+				self.node_max_workers.get(jobtype, worker_info["max"]) - running_here
+			)
+			if available_slots <= 0:
+				continue
+
+			worker_class = all_modules.load_worker_class(worker_info)
+			if not self.is_budgeted(worker_class):
+				for job in self.queue.claim_jobs(jobtype, limit=available_slots):
+					self.start_worker(worker_class, worker_info, job)
+				continue
+
+			# workers with a resource cost are only started if there is room
+			# for them in the budget, which depends on the job's input size,
+			# so claim and check them one by one
+			while available_slots > 0:
+				claimed = self.queue.claim_jobs(jobtype, limit=1)
+				if not claimed:
+					break
+
+				job = claimed[0]
+				estimate = self.estimate_resources(worker_class, job)
+				if not self.has_headroom(estimate):
+					# try again when another worker has finished
+					self.log.debug("Not enough resources to start worker for job %s/%s, waiting" % (jobtype, job.data["remote_id"]))
+					job.unclaim()
+					break
+
+				self.start_worker(worker_class, worker_info, job, estimate)
+				available_slots -= 1
+
+	def start_worker(self, worker_class, worker_info, job, resource_estimate=None):
+		"""
+		Start a worker for a claimed job
+
+		:param worker_class:  Worker class
+		:param dict worker_info:  Worker metadata
+		:param Job job:  Job to run
+		:param dict resource_estimate:  Estimated resource use of the worker,
+		as returned by `estimate_resources()`, if applicable
+		"""
+		jobtype = job.data["jobtype"]
+		self.log.debug("Starting new worker for job %s" % jobtype)
+
+		# CPU-bound workers may ask to be run in their own process;
+		# this requires fork() and is thus only available on POSIX
+		if worker_class.execution == "process" and os.name == "posix":
+			worker = WorkerProcess(logger=self.log, manager=self, job=job, worker_info=worker_info, modules=all_modules)
+		else:
+			worker = worker_class(logger=self.log, manager=self, job=job, modules=all_modules)
+
+		worker.resource_estimate = resource_estimate
+		worker.start()
+		self.worker_pool[jobtype].append(worker)
+
+	def is_budgeted(self, worker_class):
+		"""
+		Check whether starting a worker is subject to the resource budget
+
+		:param worker_class:  Worker class
+		:return bool:  `True` if a budget is configured and the worker
+		declares a resource cost
+		"""
+		if not any(self.resource_budget.values()):
+			return False
+
+		return bool(worker_class.memory_cost or worker_class.memory_cost_per_row or worker_class.cpu_cost)
+
+	def estimate_resources(self, worker_class, job):
+		"""
+		Estimate resources a worker will use for a given job
+
+		The worker's own estimate depends on the amount of rows in the dataset
+		it will process, i.e. the parent of the job's dataset. Memory
+		estimates are corrected based on what workers of the same type
+		actually used earlier.
+
+		:param worker_class:  Worker class
+		:param Job job:  Job to run
+		:return dict:  Estimated `memory` (in MB) and `cpu` (in cores), and
+		the uncorrected memory estimate as `memory_estimated`
+		"""
+		num_rows = 0
+		if worker_class.memory_cost_per_row:
+			parent = self.db.fetchone(
+				"SELECT parent.num_rows FROM datasets AS child JOIN datasets AS parent ON parent.key = child.key_parent WHERE child.key = %s",
+				(job.data["remote_id"],))
+			num_rows = parent["num_rows"] if parent else 0
+
+		estimate = worker_class.estimate_resources(num_rows)
+		estimate["memory_estimated"] = estimate["memory"]
+		estimate["memory"] *= self.memory_correction.get(job.data["jobtype"], 1)
+
+		return estimate
+
+	def has_headroom(self, estimate):
+		"""
+		Check whether a worker with a given resource estimate may be started
+
+		A worker may be started if the estimates of all running workers plus
+		its own fit within the budget. If no budgeted workers are running, a
+		worker is always allowed, since otherwise jobs with an estimate larger
+		than the total budget would never run.
+
+		:param dict estimate:  Resource estimate
+		:return bool:
+		"""
+		in_use = {"memory": 0, "cpu": 0}
+		running = 0
+		for jobtype in self.worker_pool:
+			for worker in self.worker_pool[jobtype]:
+				if not getattr(worker, "resource_estimate", None):
+					continue
+
+				running += 1
+				for resource in in_use:
+					in_use[resource] += worker.resource_estimate[resource]
+
+		if not running:
+			return True
+
+		for resource in in_use:
+			if self.resource_budget[resource] and in_use[resource] + estimate[resource] > self.resource_budget[resource]:
+				return False
+
+		return True
+
+	def update_memory_correction(self, worker):
+		"""
+		Correct future memory estimates based on a finished worker
+
+		Only workers that ran in their own process can be measured, since
+		the memory use of threads cannot be told apart. The correction factor
+		is a moving average, so it adapts gradually.
+
+		:param worker:  Finished worker
+		"""
+		estimate = getattr(worker, "resource_estimate", None)
+		peak_memory = getattr(worker, "peak_memory", 0)
+		if not estimate or not estimate["memory_estimated"] or not peak_memory:
+			return
+
+		jobtype = worker.job.data["jobtype"]
+		ratio = peak_memory / estimate["memory_estimated"]
+		correction = self.memory_correction.get(jobtype, 1)
+		self.memory_correction[jobtype] = (0.7 * correction) + (0.3 * ratio)
+		self.log.debug("Worker %s used %iMB (estimated: %iMB); memory correction factor now %.2f" % (
+			jobtype, peak_memory, estimate["memory_estimated"], self.memory_correction[jobtype]))
+
+	def wait(self):
+		"""
+		Wait until there may be new work to delegate
+
+		Blocks until the queue changes (which is announced via a Postgres
+		notification), a worker finishes, or a delayed or recurring job
+		becomes claimable, whichever comes first.
+		"""
+		timeout = min(self.max_wait, self.heartbeat_interval)
+		next_due = self.queue.get_next_claimable_timestamp()
+		if next_due is not None:
+			timeout = min(timeout, max(0, next_due - time.time()))
+
+		readable, writable, exceptional = select.select([self.listener.connection, self.wakeup[0]], [], [], timeout)
+
+		if self.wakeup[0] in readable:
+			self.wakeup[0].recv(4096)
+
+		# several notifications may have come in since the last check; they
+		# can all be handled with a single pass of the delegator
+		notifications = self.listener.get_notifications()
+		if notifications:
+			self.log.debug("Received %i queue notification(s)" % len(notifications))
+
+	def wake(self):
+		"""
+		Wake up the main loop
+
+		Can be called from any thread, e.g. by workers that have finished and
+		thereby freed up a worker slot.
+		"""
+		try:
+			self.wakeup[1].send(b"\0")
+		except (BlockingIOError, OSError):
+			# buffer is full, so the loop will wake up anyway
+			pass
 
 	def loop(self):
 		"""
 		Main loop
 
-		Constantly delegates work, until no longer looping, after which all
-		workers are asked to stop their work. Once that has happened, the loop
-		properly ends.
+		Delegates work whenever there may be something to delegate, until no
+		longer looping, after which all workers are asked to stop their work.
+		Once that has happened, the loop properly ends.
 		"""
 		while self.looping:
 			self.delegate()
+			if self.looping:
+				self.wait()
 
 		self.log.info("Telling all workers to stop doing whatever they're doing...")
 		for jobtype in self.worker_pool:
@@ -122,13 +351,17 @@ class WorkerManager:
 				else:
 					worker.abort()
 
-		# wait for all workers to finish
+		# wait for all workers to finish, while making sure other nodes do
+		# not take over their jobs in the meantime
 		self.log.info("Waiting for all workers to finish...")
 		for jobtype in self.worker_pool:
 			for worker in self.worker_pool[jobtype]:
 				self.log.info("Waiting for worker %s..." % jobtype)
-				worker.join()
+				while worker.is_alive():
+					worker.join(timeout=self.heartbeat_interval)
+					self.queue.renew_leases()
 
+		self.listener.close()
 		time.sleep(3)
 
 		# abort
@@ -153,29 +386,44 @@ class WorkerManager:
 		"""
 		self.log.info("Received SIGTERM")
 
-		# cancel all interruptible postgres queries
-		# this needs to be done before we stop looping since after that no new
-		# jobs will be claimed
-		for job in self.queue.get_all_jobs("cancel-pg-query", restrict_claimable=False):
-			# this will make all these jobs immediately claimable, i.e. queries
-			# will get cancelled asap
-			self.log.info("Cancelling interruptable Postgres query %s..." % job.data["remote_id"])
-			job.claim()
-			job.release(delay=0, claim_after=0)
-
-		# wait until all cancel jobs are completed
-		while self.queue.get_all_jobs("cancel-pg-query", restrict_claimable=False):
-			time.sleep(0.1)
+		# cancel all interruptible postgres queries, so the workers waiting
+		# for them can wrap up. queries run by process workers are cancelled
+		# by the worker process itself once it is asked to abort
+		self.cancel_queries(Database.get_interruptable_queries())
 
 		# now stop looping (i.e. accepting new jobs)
 		self.looping = False
+		self.wake()
 
 
+	def cancel_queries(self, connections):
+		"""
+		Cancel interruptable Postgres queries
+
+		A separate connection is used for this, since this may be called from
+		a signal handler or another thread while the manager's own connection
+		is in use.
+
+		:param connections:  Connections running the queries, as returned by
+		`Database.get_interruptable_queries()`
+		"""
+		if not connections:
+			return
+
+		canceller = Database(logger=self.log, appname="canceller")
+		canceller.cancel_queries(connections)
+		canceller.close()
+
 	def request_interrupt(self, job, interrupt_level):
 		"""
+		Ask the worker running a given job to stop
 
-		:param Job job:
-		:return:
+		If the worker is waiting for an interruptable database query, that
+		query is cancelled as well.
+
+		:param Job job:  Job whose worker to interrupt
+		:param int interrupt_level:  Retry or cancel? Either
+		`BasicWorker.INTERRUPT_RETRY` or `BasicWorker.INTERRUPT_CANCEL`.
 		"""
 
 		# find worker for given job
@@ -186,6 +434,9 @@ class WorkerManager:
 		for worker in self.worker_pool[job.data["jobtype"]]:
 			if worker.job.data["id"] == job.data["id"]:
 				worker.request_abort(interrupt_level)
-				return
 
-		# todo: trip cancellable pg queries associated with worker
\ No newline at end of file
+				worker_db = getattr(worker, "db", None)
+				if worker_db:
+					self.cancel_queries(Database.get_interruptable_queries(worker_db))
+
+				return
\ No newline at end of file
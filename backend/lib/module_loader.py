@@ -3,6 +3,7 @@ Load modules and datasources dynamically
 """
 from pathlib import Path
 import importlib
+import hashlib
 import inspect
 import config
 import pickle
@@ -144,6 +145,8 @@ class ModuleCollector:
 							"datasources": component[1].datasources if hasattr(component[1], "datasources") else [],
 							"references": component[1].references if hasattr(component[1], "references") else [],
 							"is_filter": hasattr(component[1], "category") and "filter" in component[1].category.lower(),
+							"cacheable": component[1].cacheable,
+							"version": hashlib.sha256(file.read_bytes()).hexdigest(),
 							"further": [],
 							"further_flat": set()
 						}}
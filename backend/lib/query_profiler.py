@@ -0,0 +1,127 @@
+"""
+Database query statistics
+"""
+import threading
+import re
+
+import config
+
+
+class QueryProfiler:
+	"""
+	Keep track of how long database queries take
+
+	Statistics are kept per statement template (i.e. the query before
+	parameters are filled in) and caller (the name of the connection, which
+	for workers is the worker type). For each of these, the amount of times
+	the query was run, the time spent on it, the rows returned or affected,
+	and a histogram of durations are recorded.
+
+	Statistics are kept in memory, for the current process only. Profiling is
+	disabled unless `DB_PROFILE` is enabled in the configuration; regardless
+	of that, queries taking longer than `DB_SLOW_QUERY` seconds are logged.
+	"""
+	enabled = config.DB_PROFILE if hasattr(config, "DB_PROFILE") else False
+	slow_threshold = config.DB_SLOW_QUERY if hasattr(config, "DB_SLOW_QUERY") else 0  # in seconds; 0 to disable
+
+	# upper bounds of the histogram buckets, in seconds. Slower queries end
+	# up in an additional, final bucket
+	buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+	stats = {}
+	lock = threading.Lock()
+
+	@staticmethod
+	def is_active():
+		"""
+		Check whether queries should be timed at all
+
+		:return bool:
+		"""
+		return QueryProfiler.enabled or bool(QueryProfiler.slow_threshold)
+
+	@staticmethod
+	def is_slow(duration):
+		"""
+		Check whether a query should be logged as slow
+
+		:param float duration:  Query duration, in seconds
+		:return bool:
+		"""
+		return bool(QueryProfiler.slow_threshold) and duration >= QueryProfiler.slow_threshold
+
+	@staticmethod
+	def record(template, caller, duration, rows):
+		"""
+		Record a query
+
+		:param str template:  Query, without parameters filled in
+		:param str caller:  Who ran the query
+		:param float duration:  How long the query took, in seconds
+		:param int rows:  Rows returned or affected; negative if unknown
+		"""
+		if not QueryProfiler.enabled:
+			return
+
+		template = re.sub(r"\s+", " ", template).strip()
+		bucket = len(QueryProfiler.buckets)
+		for index, bound in enumerate(QueryProfiler.buckets):
+			if duration <= bound:
+				bucket = index
+				break
+
+		key = (template, caller)
+		with QueryProfiler.lock:
+			if key not in QueryProfiler.stats:
+				QueryProfiler.stats[key] = {
+					"query": template,
+					"caller": caller,
+					"count": 0,
+					"time_total": 0,
+					"time_max": 0,
+					"rows": 0,
+					"histogram": [0] * (len(QueryProfiler.buckets) + 1)
+				}
+
+			stats = QueryProfiler.stats[key]
+			stats["count"] += 1
+			stats["time_total"] += duration
+			stats["time_max"] = max(stats["time_max"], duration)
+			stats["rows"] += max(0, rows)
+			stats["histogram"][bucket] += 1
+
+	@staticmethod
+	def get_stats(order_by="time_total"):
+		"""
+		Get collected statistics
+
+		:param str order_by:  Statistic to sort by, descending
+		:return list:  A dictionary per query template and caller
+		"""
+		with QueryProfiler.lock:
+			stats = [{**item, "histogram": item["histogram"].copy()} for item in QueryProfiler.stats.values()]
+
+		for item in stats:
+			item["time_mean"] = item["time_total"] / item["count"]
+
+		return sorted(stats, key=lambda item: item.get(order_by, 0), reverse=True)
+
+	@staticmethod
+	def get_bucket_labels():
+		"""
+		Get human-readable labels for the histogram buckets
+
+		:return list:
+		"""
+		labels = ["≤%sms" % int(bound * 1000) if bound < 1 else "≤%ss" % bound for bound in QueryProfiler.buckets]
+		labels.append(">%ss" % QueryProfiler.buckets[-1])
+
+		return labels
+
+	@staticmethod
+	def reset():
+		"""
+		Discard all collected statistics
+		"""
+		with QueryProfiler.lock:
+			QueryProfiler.stats = {}
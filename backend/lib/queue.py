@@ -4,8 +4,13 @@ A job queue, to divide work over the workers
 import time
 import json
 
+from pathlib import Path
+
 from backend.lib.job import Job
+from backend.lib.exceptions import JobNotFoundException
+from backend.lib.helpers import get_node_id
 import psycopg2
+import config
 
 
 class JobQueue:
@@ -49,7 +54,8 @@ class JobQueue:
 			"          AND timestamp_claimed = 0"
 			"          AND timestamp_after < %s"
 			"          AND (interval = 0 OR timestamp_lastclaimed + interval < %s)"
-			"    ORDER BY timestamp ASC"
+			"          AND (depends_on = 0 OR NOT EXISTS (SELECT 1 FROM jobs AS dependency WHERE dependency.id = jobs.depends_on))"
+			"    ORDER BY priority DESC, timestamp ASC"
 			"       LIMIT 1;"),
 			(jobtype, timestamp, timestamp))
 
@@ -81,13 +87,14 @@ class JobQueue:
 		if restrict_claimable:
 			query += ("        AND timestamp_claimed = 0"
 					  "              AND timestamp_after < %s"
-					  "              AND (interval = 0 OR timestamp_lastclaimed + interval < %s)")
+					  "              AND (interval = 0 OR timestamp_lastclaimed + interval < %s)"
+					  "              AND (depends_on = 0 OR NOT EXISTS (SELECT 1 FROM jobs AS dependency WHERE dependency.id = jobs.depends_on))")
 
 			now = int(time.time())
 			replacements.append(now)
 			replacements.append(now)
 
-		query += "         ORDER BY timestamp ASC"
+		query += "         ORDER BY priority DESC, timestamp ASC"
 
 		try:
 			jobs = self.db.fetchall(query, replacements)
@@ -101,6 +108,92 @@ class JobQueue:
 
 		return [Job.get_by_data(job, self.db) for job in jobs if job]
 
+	def get_claimable_jobtypes(self):
+		"""
+		Get job types for which there are claimable jobs
+
+		:return list:  Job types
+		"""
+		now = int(time.time())
+		jobtypes = self.db.fetchall((
+			"SELECT DISTINCT jobtype FROM jobs"
+			"        WHERE timestamp_claimed = 0"
+			"          AND timestamp_after < %s"
+			"          AND (interval = 0 OR timestamp_lastclaimed + interval < %s)"
+			"          AND (depends_on = 0 OR NOT EXISTS (SELECT 1 FROM jobs AS dependency WHERE dependency.id = jobs.depends_on))"),
+			(now, now))
+
+		return [row["jobtype"] for row in jobtypes]
+
+	def claim_jobs(self, jobtype, limit=1):
+		"""
+		Claim a number of jobs of a given type at once
+
+		Jobs are claimed in a single query. Rows that are locked by another
+		transaction (e.g. another claim in progress) are skipped rather than
+		waited for, so any job returned is guaranteed to have been claimed by
+		this call and no other. Jobs are claimed for this node, with a lease
+		that needs to be renewed (see `renew_leases()`) while they run.
+
+		Jobs with a higher priority are claimed first. Within a priority,
+		jobs are shared fairly between their owners: each owner's queued jobs
+		are ranked, and that rank is added to the amount of jobs the owner
+		currently has running. The jobs with the lowest sum go first, so an
+		owner with many queued or running jobs does not hold up others. Jobs
+		with equal priority and rank are claimed oldest first.
+
+		:param str jobtype:  Job type
+		:param int limit:  Maximum amount of jobs to claim
+		:return list:  List of claimed `Job`s, in the order they should be
+		started. May be empty.
+		"""
+		if limit <= 0:
+			return []
+
+		now = int(time.time())
+
+		# the claim time of recurring jobs should be a multiple of the interval
+		# to prevent drift of the interval over time, as in Job.claim()
+		jobs = self.db.fetchall((
+			"UPDATE jobs SET"
+			"       timestamp_claimed = claim.claim_time,"
+			"       timestamp_lastclaimed = claim.claim_time,"
+			"       claimed_by = %s,"
+			"       timestamp_lease = %s"
+			"  FROM ("
+			"    SELECT jobs.id, ranked.share,"
+			"           CASE WHEN jobs.interval = 0 THEN %s ELSE (%s / jobs.interval) * jobs.interval END AS claim_time"
+			"      FROM jobs"
+			"      JOIN ("
+			"        SELECT candidate.id,"
+			"               ROW_NUMBER() OVER (PARTITION BY candidate.owner ORDER BY candidate.priority DESC, candidate.timestamp ASC)"
+			"                 + COALESCE(running.num, 0) AS share"
+			"          FROM jobs AS candidate"
+			"     LEFT JOIN (SELECT owner, COUNT(*) AS num FROM jobs WHERE timestamp_claimed > 0 GROUP BY owner) AS running"
+			"            ON running.owner = candidate.owner"
+			"         WHERE candidate.jobtype = %s"
+			"           AND candidate.timestamp_claimed = 0"
+			"           AND candidate.timestamp_after < %s"
+			"           AND (candidate.interval = 0 OR candidate.timestamp_lastclaimed + candidate.interval < %s)"
+			"           AND (candidate.depends_on = 0 OR NOT EXISTS (SELECT 1 FROM jobs AS dependency WHERE dependency.id = candidate.depends_on))"
+			"      ) AS ranked ON ranked.id = jobs.id"
+			"     WHERE jobs.timestamp_claimed = 0"
+			"  ORDER BY jobs.priority DESC, ranked.share ASC, jobs.timestamp ASC"
+			"     LIMIT %s"
+			"       FOR UPDATE OF jobs SKIP LOCKED"
+			"  ) AS claim"
+			" WHERE jobs.id = claim.id"
+			" RETURNING jobs.*, claim.share"),
+			(get_node_id(), now + Job.LEASE, now, now, jobtype, now, now, limit))
+		self.db.commit()
+
+		jobs = sorted(jobs, key=lambda job: (-job["priority"], job["share"], job["timestamp"]))
+		jobs = [Job.get_by_data({column: job[column] for column in job if column != "share"}, self.db) for job in jobs]
+		for job in jobs:
+			job.is_claimed = True
+
+		return jobs
+
 	def get_job_count(self, jobtype="*"):
 		"""
 		Get total number of jobs
@@ -115,7 +208,7 @@ class JobQueue:
 
 		return int(count["count"])
 
-	def add_job(self, jobtype, details=None, remote_id=0, claim_after=0, interval=0):
+	def add_job(self, jobtype, details=None, remote_id=0, claim_after=0, interval=0, priority=0, owner="", depends_on=None):
 		"""
 		Add a new job to the queue
 
@@ -128,6 +221,13 @@ class JobQueue:
 		:param claim_after:  Absolute timestamp after which job may be claimed
 		:param interval:  If this is not zero, the job is made a repeating job,
 		                  which will be repeated at most every `interval` seconds.
+		:param priority:  Jobs with a higher priority are run before other jobs
+		                  of the same type
+		:param owner:  Name of the user on whose behalf the job is run, if any.
+		               Jobs of the same type are shared fairly between owners.
+		:param Job depends_on:  Job that needs to be finished before this job
+		                        may be claimed, e.g. the job creating the data
+		                        this job will process.
 
 		:return Job: A job that matches the input type and remote ID. This may
 		             be a newly added job or an existing that matched the same
@@ -135,7 +235,16 @@ class JobQueue:
 		             with those parameters could be queued, and the old one is
 		             just as valid).
 		"""
-		data =  data={
+		dependency_id = 0
+		if depends_on:
+			try:
+				dependency_id = depends_on.data["id"] if "id" in depends_on.data else \
+					Job.get_by_remote_ID(depends_on.data["remote_id"], self.db, depends_on.data["jobtype"]).data["id"]
+			except JobNotFoundException:
+				# already finished, so nothing to wait for
+				pass
+
+		data = {
 			"jobtype": jobtype,
 			"details": json.dumps(details),
 			"timestamp": int(time.time()),
@@ -144,37 +253,245 @@ class JobQueue:
 			"remote_id": remote_id,
 			"timestamp_after": claim_after,
 			"interval": interval,
-			"attempts": 0
+			"attempts": 0,
+			"priority": priority,
+			"owner": owner if owner else "",
+			"depends_on": dependency_id
 		}
 
-		self.db.insert("jobs", data, safe=True, constraints=("jobtype", "remote_id"))
+		inserted = self.db.insert("jobs", data, safe=True, constraints=("jobtype", "remote_id"))
+
+		job = Job.get_by_data(data, database=self.db)
+		if inserted:
+			job.notify()
 
-		return Job.get_by_data(data, database=self.db)
+		return job
+
+	def add_jobs(self, jobs):
+		"""
+		Add many jobs to the queue at once
+
+		All jobs are inserted with one query in a single transaction, which is
+		a lot faster than calling `add_job()` for each of them. As with
+		`add_job()`, jobs for a job type and remote ID combination that is
+		already queued are ignored.
+
+		:param list jobs:  List of job specifications: dictionaries with a
+		`jobtype` key, and optionally any of `details`, `remote_id`,
+		`claim_after`, `interval`, `priority` and `owner`, which have the same
+		meaning as the arguments of `add_job()`.
+		:return int:  Number of jobs that were actually added
+		"""
+		if not jobs:
+			return 0
+
+		now = int(time.time())
+		rows = [(
+			job["jobtype"],
+			json.dumps(job.get("details", None)),
+			now,
+			0,
+			0,
+			str(job.get("remote_id", 0)),
+			job.get("claim_after", 0),
+			job.get("interval", 0),
+			0,
+			job.get("priority", 0),
+			job.get("owner", "") or ""
+		) for job in jobs]
+
+		inserted = self.db.execute_many(
+			"INSERT INTO jobs (jobtype, details, timestamp, timestamp_claimed, timestamp_lastclaimed, remote_id,"
+			"                  timestamp_after, interval, attempts, priority, owner)"
+			"     VALUES %s"
+			"ON CONFLICT (jobtype, remote_id) DO NOTHING"
+			"  RETURNING jobtype", rows, fetch=True)
+
+		# one notification per job type is enough to wake up the manager
+		for jobtype in set([job["jobtype"] for job in inserted]):
+			self.db.notify(Job.NOTIFY_CHANNEL, jobtype, commit=False)
+
+		self.db.commit()
+		return len(inserted)
+
+	def get_next_claimable_timestamp(self):
+		"""
+		Get the earliest time at which a currently unclaimable job may be
+		claimed
+
+		Jobs that are claimable right now are ignored, as are claimed jobs.
+		This can be used to determine how long one may wait before the queue
+		should be checked again for time-based (delayed or recurring) jobs.
+
+		:return int:  Timestamp, or `None` if no jobs are scheduled for later
+		"""
+		next_due = self.db.fetchone((
+			"SELECT MIN(due) AS due FROM ("
+			"   SELECT GREATEST(timestamp_after, CASE WHEN interval > 0 THEN timestamp_lastclaimed + interval ELSE 0 END) AS due"
+			"     FROM jobs"
+			"    WHERE timestamp_claimed = 0"
+			") AS scheduled WHERE due >= %s"), (int(time.time()),))
+
+		if not next_due or next_due["due"] is None:
+			return None
+
+		# jobs are claimable once the current time is *past* these timestamps
+		return int(next_due["due"]) + 1
 
 	def release_all(self):
 		"""
-		Release all jobs
+		Release all jobs claimed by this node
+
+		This is useful to run when the backend is restarted. Jobs claimed by
+		other nodes are left alone, as are jobs claimed before claims were
+		attributed to nodes.
+		"""
+		self.db.execute("UPDATE jobs SET timestamp_claimed = 0, claimed_by = '', timestamp_lease = 0 WHERE claimed_by = %s OR claimed_by = ''", (get_node_id(),))
+
+	def renew_leases(self):
+		"""
+		Renew leases on all jobs claimed by this node
+
+		This should be called regularly (well within the lease time) while the
+		node is running, so other nodes know the jobs are still being worked
+		on.
+		"""
+		self.db.execute("UPDATE jobs SET timestamp_lease = %s WHERE claimed_by = %s AND timestamp_claimed > 0",
+						(int(time.time()) + Job.LEASE, get_node_id()))
 
-		All claimed jobs are released. This is useful to run when the backend is restarted.
+	def release_expired_leases(self):
 		"""
-		self.db.execute("UPDATE jobs SET timestamp_claimed = 0")
+		Release jobs whose lease has expired
 
+		These are jobs claimed by a node that has stopped renewing its leases,
+		e.g. because it crashed. Releasing them allows other nodes to claim
+		them.
 
+		:return int:  Number of released jobs
+		"""
+		released = self.db.fetchall(
+			"UPDATE jobs SET timestamp_claimed = 0, claimed_by = '', timestamp_lease = 0"
+			" WHERE timestamp_claimed > 0 AND timestamp_lease > 0 AND timestamp_lease < %s"
+			" RETURNING jobtype, remote_id, claimed_by", (int(time.time()),))
+		self.db.commit()
+
+		for job in released:
+			self.log.warning("Lease on job %s/%s expired, releasing" % (job["jobtype"], job["remote_id"]))
+
+		if released:
+			self.db.notify(Job.NOTIFY_CHANNEL)
+
+		return len(released)
 
 	def get_place_in_queue(self, job):
 		"""
 		What is the place of this job in the queue?
 
+		The place is determined in the database, based on the current state of
+		the job, so the `Job` object passed does not need to be up to date.
+		Jobs with a higher priority, or an equal priority and an earlier queue
+		time, are considered to be ahead of this job. This ignores fair
+		sharing between job owners, so the actual wait may be shorter.
+
 		:param Job job:  Job to get place in queue for
 
 		:return int: Place in queue. 0 means the job is currently being
-		processed; 1+ means the job is queued, with 1 corresponding to the
-		front of the queue.
+		processed (or no longer exists); 1+ means the job is queued, with 1
+		corresponding to the front of the queue.
 		"""
-		if job.data["timestamp_claimed"] > 0:
-			return 0
+		place = self.db.fetchone((
+			"SELECT CASE WHEN job.timestamp_claimed > 0 THEN 0 ELSE ("
+			"           SELECT COUNT(*) FROM jobs AS queued"
+			"            WHERE queued.jobtype = job.jobtype"
+			"              AND queued.timestamp_claimed = 0"
+			"              AND (queued.priority > job.priority"
+			"                   OR (queued.priority = job.priority AND queued.timestamp < job.timestamp))"
+			"       ) + 1 END AS place"
+			"  FROM jobs AS job"
+			" WHERE job.jobtype = %s AND job.remote_id = %s"),
+			(job.data["jobtype"], job.data["remote_id"]))
+
+		return int(place["place"]) if place else 0
+
+	def get_queue_summary(self):
+		"""
+		Get amount of queued and running jobs per job type
+
+		Queued jobs are jobs that may be claimed right now; jobs that are
+		scheduled for later are not counted. Running jobs are counted both
+		overall and for nodes other than this one.
+
+		:return dict:  Job type => `{"queued": int, "running": int,
+		"running_elsewhere": int}`
+		"""
+		now = int(time.time())
+		counts = self.db.fetchall((
+			"SELECT jobtype,"
+			"       COUNT(*) FILTER (WHERE timestamp_claimed = 0 AND timestamp_after < %s"
+			"                          AND (interval = 0 OR timestamp_lastclaimed + interval < %s)"
+			"                          AND (depends_on = 0 OR NOT EXISTS (SELECT 1 FROM jobs AS dependency WHERE dependency.id = jobs.depends_on))) AS queued,"
+			"       COUNT(*) FILTER (WHERE timestamp_claimed > 0) AS running,"
+			"       COUNT(*) FILTER (WHERE timestamp_claimed > 0 AND claimed_by != %s) AS running_elsewhere"
+			"  FROM jobs GROUP BY jobtype"),
+			(now, now, get_node_id()))
+
+		return {row["jobtype"]: {
+			"queued": int(row["queued"]),
+			"running": int(row["running"]),
+			"running_elsewhere": int(row["running_elsewhere"])
+		} for row in counts}
+
+	def update_queue_summary(self):
+		"""
+		Write queue summary to disk
+
+		This allows other processes, e.g. the web tool, to know what is in the
+		queue without querying the jobs table. The file is replaced atomically
+		so it can be read at any time.
+
+		:return dict:  The summary, as returned by `get_queue_summary()`
+		"""
+		summary = {
+			"updated": int(time.time()),
+			"jobs": self.get_queue_summary()
+		}
 
-		all_queued = self.get_all_jobs(jobtype=job.data["jobtype"])
-		our_timestamp = job.data["timestamp"]
-		return len(
-			[queued_job for queued_job in all_queued if queued_job.data["timestamp"] < our_timestamp or queued_job.data["timestamp_claimed"] > 0])
+		summary_path = JobQueue.get_summary_path()
+		temporary_path = summary_path.with_suffix(".tmp")
+		with temporary_path.open("w") as output:
+			output.write(json.dumps(summary))
+
+		temporary_path.replace(summary_path)
+
+		return summary["jobs"]
+
+	def get_cached_queue_summary(self, max_age=300):
+		"""
+		Get queue summary as last written by the worker manager
+
+		If no summary is available, or it is older than `max_age` (which
+		probably means the backend is not running), a fresh summary is
+		retrieved from the database instead.
+
+		:param int max_age:  Max age of the summary, in seconds
+		:return dict:  Job type => `{"queued": int, "running": int}`
+		"""
+		try:
+			with JobQueue.get_summary_path().open() as input:
+				summary = json.loads(input.read())
+
+			if summary["updated"] >= time.time() - max_age:
+				return summary["jobs"]
+		except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError):
+			pass
+
+		return self.get_queue_summary()
+
+	@staticmethod
+	def get_summary_path():
+		"""
+		Get path to queue summary file
+
+		:return Path:  Path object to summary file
+		"""
+		return Path(config.PATH_ROOT, config.PATH_LOCKFILE, "queue.json")
@@ -0,0 +1,152 @@
+"""
+Content-addressed storage of result files
+"""
+import hashlib
+import shutil
+import uuid
+import os
+
+from pathlib import Path
+
+import config
+
+from backend.lib.compression import ENCODINGS, find_stored_file, open_stored_file
+
+try:
+	import fcntl
+except ImportError:
+	# not available on Windows; files are hardlinked or copied there
+	fcntl = None
+
+# ioctl request to clone a file, on file systems that support it (e.g. btrfs
+# or XFS); see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+
+def get_store_folder():
+	"""
+	Get path to the folder result files are stored in
+
+	:return Path:  Path to the store folder
+	"""
+	return Path(config.PATH_ROOT, config.PATH_DATA, "store")
+
+
+def is_enabled():
+	"""
+	Check if result files should be kept in the store
+
+	Configured via `DATASET_STORE`.
+
+	:return bool:
+	"""
+	return config.DATASET_STORE if hasattr(config, "DATASET_STORE") else True
+
+
+def hash_file(path):
+	"""
+	Get hash of the contents of a result file
+
+	Compressed files are hashed by their decompressed contents, so the hash
+	does not depend on how (or whether) the file was compressed.
+
+	:param Path path:  Path to result file
+	:return str:  SHA-256 hash, as a hexadecimal string
+	"""
+	hasher = hashlib.sha256()
+	with open_stored_file(path, "rb") as infile:
+		while True:
+			chunk = infile.read(1024 * 1024)
+			if not chunk:
+				break
+			hasher.update(chunk)
+
+	return hasher.hexdigest()
+
+
+def get_object_path(content_hash, suffix=""):
+	"""
+	Get path of a stored object
+
+	:param str content_hash:  Hash of the object's contents
+	:param str suffix:  Compression suffix of the object, if any
+	:return Path:  Path to the object, which may or may not exist
+	"""
+	return get_store_folder().joinpath(content_hash[:2], content_hash + suffix)
+
+
+def get_object_paths(content_hash):
+	"""
+	Get all paths an object with the given hash may be stored at
+
+	:param str content_hash:  Hash of the object's contents
+	:return list:  Paths, compressed or not
+	"""
+	return [get_object_path(content_hash, suffix) for suffix in ("", *ENCODINGS)]
+
+
+def link_file(source, target):
+	"""
+	Make a file available at another path without copying it, if possible
+
+	The target is hardlinked to the source. If the file system does not allow
+	that, it is cloned (a 'reflink') if the file system supports it, and
+	copied otherwise. Either way, the target should not exist yet, and files
+	linked this way should not be written to anymore.
+
+	:param source:  File to link to
+	:param target:  Path to make the file available at
+	"""
+	try:
+		os.link(str(source), str(target))
+		return
+	except OSError:
+		pass
+
+	if fcntl:
+		try:
+			with open(str(source), "rb") as infile, open(str(target), "wb") as outfile:
+				fcntl.ioctl(outfile.fileno(), FICLONE, infile.fileno())
+			return
+		except OSError:
+			pass
+
+	shutil.copyfile(str(source), str(target))
+
+
+def store_file(path):
+	"""
+	Put a result file in the store
+
+	If the store already contains a file with the same contents, the result
+	file is replaced with a link to it; otherwise, the result file itself is
+	linked into the store. Either way, the file stays available at its
+	original path.
+
+	:param Path path:  Path to result file, as returned by
+	`DataSet.get_results_path()`
+	:return str:  Hash of the file's contents, or an empty string if there
+	is no such file
+	"""
+	path = Path(path)
+	stored = find_stored_file(path)
+	if not stored.exists():
+		return ""
+
+	content_hash = hash_file(stored)
+	store_object = get_object_path(content_hash, stored.name[len(path.name):])
+
+	# link via a temporary name first, so other processes never see a
+	# half-written file
+	if store_object.exists():
+		if not os.path.samefile(str(store_object), str(stored)):
+			staging = stored.with_name(stored.name + "." + uuid.uuid4().hex + ".tmp")
+			link_file(store_object, staging)
+			staging.replace(stored)
+	else:
+		store_object.parent.mkdir(parents=True, exist_ok=True)
+		staging = store_object.with_name(store_object.name + "." + uuid.uuid4().hex + ".tmp")
+		link_file(stored, staging)
+		staging.replace(store_object)
+
+	return content_hash
@@ -0,0 +1,267 @@
+"""
+Run workers in a separate process
+"""
+import multiprocessing
+import threading
+import logging
+import psutil
+import queue
+import time
+import os
+
+from backend.lib.database import Database
+from backend.lib.queue import JobQueue
+from backend.lib.job import Job
+
+
+class WorkerProcess(threading.Thread):
+	"""
+	Run a worker in a child process
+
+	Workers normally run as threads within the backend process, which means
+	they all share one interpreter lock. For CPU-bound workers this means they
+	slow each other (and everything else) down. Workers that set `execution`
+	to "process" are instead run via this class, which starts a child process
+	to do the work and a thread in the backend process to keep an eye on it.
+
+	To the worker manager, objects of this class behave like a worker: they
+	can be started, joined, and asked to abort. Within the child process, the
+	worker has its own database connection and job queue; log messages are
+	passed back to the backend's logger.
+	"""
+	type = "misc"
+
+	# same values as in BasicWorker
+	INTERRUPT_NONE = False
+	INTERRUPT_RETRY = 1
+	INTERRUPT_CANCEL = 2
+
+	job = None
+	log = None
+	manager = None
+	worker_info = None
+
+	is_done = False
+	interrupted = False
+	init_time = 0
+	peak_memory = 0  # highest memory use of the process, in MB
+
+	def __init__(self, logger, job, manager, worker_info, modules=None):
+		"""
+		Prepare child process
+
+		:param Logger logger:  Logger to forward the child's log messages to
+		:param Job job:  Job to run
+		:param WorkerManager manager:  Worker manager reference
+		:param dict worker_info:  Worker metadata, as collected by the module
+		loader
+		:param modules:  Module collector
+		"""
+		super().__init__()
+		self.type = worker_info["id"]
+		self.name = self.type
+		self.log = logger
+		self.job = job
+		self.manager = manager
+		self.worker_info = worker_info
+		self.all_modules = modules
+		self.init_time = int(time.time())
+
+		context = get_process_context()
+		self.log_queue = context.Queue()
+		self.interrupt_level = context.Value("i", 0)
+		log_level = logging.DEBUG if self.log.is_enabled_for(logging.DEBUG) else logging.INFO
+		self.process = context.Process(target=run_in_process, name="4cat-%s" % self.type, args=(
+			self.worker_info, self.job.data, self.log_queue, self.interrupt_level, self.all_modules, log_level))
+
+	def run(self):
+		"""
+		Start the child process and forward its logs until it ends
+		"""
+		try:
+			self.process.start()
+
+			while self.process.is_alive():
+				self.forward_logs(timeout=1)
+				self.measure_memory()
+
+			self.process.join()
+			self.forward_logs()
+
+			if self.process.exitcode != 0:
+				# this means the process died without the worker handling it,
+				# since worker exceptions are caught within the child
+				self.log.error("Worker process %s for job %s/%s ended unexpectedly with exit code %s" % (
+					self.type, self.job.data["jobtype"], self.job.data["remote_id"], self.process.exitcode))
+				db = Database(logger=self.log, appname=self.type)
+				self.job.db = db
+				self.job.add_status("Crash during execution")
+				db.close()
+		finally:
+			self.is_done = True
+			if self.manager:
+				self.manager.wake()
+
+	def forward_logs(self, timeout=0):
+		"""
+		Pass log messages from the child process on to the logger
+
+		:param timeout:  How long to wait for messages, if there are none. If
+		0, only the messages currently available are forwarded.
+		"""
+		while True:
+			try:
+				message, level = self.log_queue.get(timeout=timeout) if timeout else self.log_queue.get_nowait()
+			except queue.Empty:
+				return
+
+			self.log.log(message, level)
+
+	def measure_memory(self):
+		"""
+		Keep track of the peak memory use of the child process
+
+		Memory used by any processes started by the child is included.
+		"""
+		try:
+			process = psutil.Process(self.process.pid)
+			rss = process.memory_info().rss
+			for child in process.children(recursive=True):
+				rss += child.memory_info().rss
+		except psutil.Error:
+			# process ended in the meantime
+			return
+
+		self.peak_memory = max(self.peak_memory, rss / (1024 * 1024))
+
+	def abort(self):
+		"""
+		Called when the application shuts down
+
+		For process workers, this is the same as requesting a retry.
+		"""
+		self.request_abort(self.INTERRUPT_RETRY)
+
+	def request_abort(self, level=1):
+		"""
+		Set the 'abort requested' flag in the child process
+
+		:param int level:  Retry or cancel? Either `BasicWorker.INTERRUPT_RETRY`
+		or `BasicWorker.INTERRUPT_CANCEL`.
+		"""
+		self.interrupted = level
+		self.interrupt_level.value = int(level)
+
+
+class ProcessLogger:
+	"""
+	Logger for use in worker processes
+
+	Has the same interface as the backend logger, but instead of writing log
+	messages itself, passes them to the parent process via a queue.
+	"""
+	def __init__(self, log_queue, prefix="", level=logging.DEBUG):
+		"""
+		:param multiprocessing.Queue log_queue:  Queue to put messages in
+		:param str prefix:  Prefix for all messages
+		:param level:  Messages below this level are discarded, rather than
+		passed to the parent process
+		"""
+		self.log_queue = log_queue
+		self.prefix = prefix
+		self.level = level
+
+	def is_enabled_for(self, level):
+		return level >= self.level
+
+	def log(self, message, level=logging.INFO):
+		if self.is_enabled_for(level):
+			self.log_queue.put((self.prefix + str(message), level))
+
+	def debug(self, message):
+		self.log(message, logging.DEBUG)
+
+	def info(self, message):
+		self.log(message, logging.INFO)
+
+	def warning(self, message):
+		self.log(message, logging.WARN)
+
+	def error(self, message):
+		self.log(message, logging.ERROR)
+
+	def critical(self, message):
+		self.log(message, logging.CRITICAL)
+
+	def fatal(self, message):
+		self.log(message, logging.FATAL)
+
+
+def get_process_context():
+	"""
+	Get the multiprocessing context to start worker processes with
+
+	The backend runs several threads (workers, the API, lease renewal), any
+	of which may hold a lock - e.g. of the logger or the connection pool -
+	at the moment a process is forked. A forked child inherits such locks in
+	their locked state and may deadlock on them. Worker processes are
+	therefore forked from a single-threaded fork server instead, which
+	imports this module when it starts so that does not need to be done for
+	each worker. The daemon script itself is not imported in the fork
+	server, as spawning would do.
+
+	:return:  Multiprocessing context
+	"""
+	context = multiprocessing.get_context("forkserver")
+	context.set_forkserver_preload([__name__])
+
+	return context
+
+
+def run_in_process(worker_info, job_data, log_queue, interrupt_level, modules, log_level=logging.DEBUG):
+	"""
+	Run a worker within a child process
+
+	This is the entry point for process workers. It sets up a database
+	connection and job queue for the worker, and then runs it in the main
+	thread of the process, while another thread relays interrupt requests
+	from the parent process to the worker.
+
+	:param dict worker_info:  Worker metadata
+	:param dict job_data:  Job record
+	:param log_queue:  Queue for forwarding log messages
+	:param interrupt_level:  Shared value for the requested interrupt level
+	:param modules:  Module collector
+	:param log_level:  Lowest level of log messages to pass on
+	"""
+	log = ProcessLogger(log_queue, prefix="[%s/%i] " % (worker_info["id"], os.getpid()), level=log_level)
+	db = Database(logger=log, appname=worker_info["id"])
+	job_queue = JobQueue(logger=log, database=db)
+	job = Job.get_by_data(job_data, database=db)
+
+	worker_class = modules.load_worker_class(worker_info)
+	worker = worker_class(logger=log, job=job, db=db, queue=job_queue, manager=None, modules=modules)
+
+	def relay_interrupts():
+		while not worker.is_done:
+			if interrupt_level.value and worker.interrupted != interrupt_level.value:
+				worker.request_abort(interrupt_level.value)
+
+				# the worker's connection is busy if it is running a query,
+				# so cancel it via another one
+				running = Database.get_interruptable_queries()
+				if running:
+					canceller = Database(logger=log, appname="canceller")
+					canceller.cancel_queries(running)
+					canceller.close()
+			time.sleep(0.5)
+
+	threading.Thread(target=relay_interrupts, daemon=True).start()
+
+	# call run() rather than start(): the process is the thread
+	worker.run()
+	db.close()
+
+	# make sure all log messages have been passed on before exiting
+	log_queue.close()
+	log_queue.join_thread()
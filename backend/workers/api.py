@@ -4,6 +4,7 @@ import json
 
 import config
 from backend.abstract.worker import BasicWorker
+from backend.lib.query_profiler import QueryProfiler
 
 
 class InternalAPI(BasicWorker):
@@ -239,6 +240,15 @@ class InternalAPI(BasicWorker):
 				"queued": queue
 			}
 
+		if request == "query-stats":
+			# database query statistics collected by the backend, see
+			# QueryProfiler. Worker processes keep their own statistics, which
+			# are not included
+			return {
+				"enabled": QueryProfiler.enabled,
+				"buckets": QueryProfiler.get_bucket_labels(),
+				"queries": QueryProfiler.get_stats()[:100]
+			}
 
 
 		# no appropriate response
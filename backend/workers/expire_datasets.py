@@ -24,6 +24,7 @@ class DatasetExpirer(BasicWorker):
 		delete old datasets, do so for all qualifying datasets
 		:return:
 		"""
+		expired = []
 		for datasource_id in self.all_modules.datasources:
 			datasource = self.all_modules.datasources[datasource_id]
 
@@ -33,14 +34,21 @@ class DatasetExpirer(BasicWorker):
 
 			cutoff = time.time() - datasource.get("expire-datasets")
 			datasets = self.db.fetchall(
-				"SELECT key FROM datasets WHERE key_parent = '' AND parameters::json->>'datasource' = %s AND timestamp < %s",
+				"SELECT key FROM datasets WHERE key_parent = '' AND datasource = %s AND timestamp < %s",
 				(datasource_id, cutoff))
 
-			# we instantiate the dataset, because its delete() method does all
-			# the work (e.g. deleting child datasets) for us
 			for dataset in datasets:
-				dataset = DataSet(key=dataset["key"], db=self.db)
-				dataset.delete()
-				self.log.info("Deleting dataset %s/%s (expired per configuration)" % (datasource, dataset.key))
+				self.log.info("Deleting dataset %s/%s (expired per configuration)" % (datasource_id, dataset["key"]))
+				expired.append(dataset["key"])
+
+		if expired:
+			# delete all expired datasets and their children from the database
+			# in one go. removing their files may take a while, so leave that
+			# to a separate job
+			paths = DataSet.delete_trees(expired, db=self.db)
+			if paths:
+				self.queue.add_job("remove-files", details={"paths": [str(path) for path in paths]},
+								   remote_id="expired-%i" % time.time())
+			self.log.info("Deleted %i expired datasets, queued removal of %i files" % (len(expired), len(paths)))
 
 		self.job.finish()
@@ -0,0 +1,40 @@
+"""
+Remove files of deleted datasets
+"""
+from pathlib import Path
+
+from backend.abstract.worker import BasicWorker
+from backend.lib.dataset import DataSet
+
+
+class FileRemover(BasicWorker):
+	"""
+	Remove files of deleted datasets
+
+	Deleting large dataset trees from disk can take a while. Workers that
+	delete datasets can queue a job for this worker with the paths to remove
+	(as returned by `DataSet.delete_trees()`) in its details, so they need not
+	wait for that themselves.
+	"""
+	type = "remove-files"
+	max_workers = 1
+
+	def work(self):
+		"""
+		Remove the files and folders listed in the job details
+		"""
+		paths = [Path(path) for path in self.job.details.get("paths", [])]
+		freed = DataSet.remove_files(paths, callback=self.report_progress)
+		self.log.info("Removed %i files and folders of deleted datasets, freeing %.1f MB" % (len(paths), freed / 1024 / 1024))
+
+		self.job.finish()
+
+	def report_progress(self, done, total, freed):
+		"""
+		Log progress while removing files
+
+		:param int done:  Files and folders removed so far
+		:param int total:  Files and folders to remove
+		:param int freed:  Bytes freed so far
+		"""
+		self.log.debug("Removed %i/%i files of deleted datasets (%.1f MB)" % (done, total, freed / 1024 / 1024))
@@ -28,9 +28,11 @@ class SearchBreitbart(Search4Chan):
 		result, so this method fetches metadata for all full articles in the
 		dataset and adds it to those rows.
 
-		:param list posts:  Posts found for the query
+		:param posts:  Posts found for the query
 		:return list:  Posts with thread-level metadata added
 		"""
+		# posts are needed twice, so they cannot be streamed
+		posts = list(posts)
 		processed_posts = []
 
 		thread_ids = set()
@@ -41,8 +43,8 @@ class SearchBreitbart(Search4Chan):
 		if thread_ids:
 			self.dataset.update_status("Fetching thread metadata for %i threads..." % len(thread_ids))
 			thread_metadata = {row["id"]: {"url": row["url"], "section": row["section"], "tags": row["tags"]} for row in
-							   self.db.fetchall_interruptable(self.queue, "SELECT id, url, section, tags FROM threads_breitbart WHERE id IN %s",
-															  tuple(thread_ids))}
+							   self.db.fetchall_interruptable("SELECT id, url, section, tags FROM threads_breitbart WHERE id IN %s",
+															  tuple(thread_ids), readonly=True)}
 
 			self.dataset.update_status("Adding metadata to %i articles..." % len(thread_ids))
 			while posts:
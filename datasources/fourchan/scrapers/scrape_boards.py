@@ -3,7 +3,6 @@
 """
 
 from backend.abstract.scraper import BasicJSONScraper
-from backend.lib.exceptions import JobAlreadyExistsException
 
 
 class BoardScraper4chan(BasicJSONScraper):
@@ -18,6 +17,7 @@ class BoardScraper4chan(BasicJSONScraper):
 
 	required_fields = ["no", "last_modified"]
 	position = 0
+	thread_jobs = []
 
 	def process(self, data):
 		"""
@@ -34,11 +34,15 @@ class BoardScraper4chan(BasicJSONScraper):
 			self.log.error("No thread data from board scrape of %s/%s/" % (self.datasource, self.job.data["remote_id"]))
 			return False
 
+		self.thread_jobs = []
 		for page in data:
 			for thread in page["threads"]:
 				self.position += 1
 				new_threads += self.save_thread(thread)
 
+		# schedule jobs for scraping the threads' posts, all at once
+		self.queue.add_jobs(self.thread_jobs)
+
 		self.log.info("Board scrape for %s/%s/ yielded %i new threads" % (self.datasource, self.job.data["remote_id"], new_threads))
 
 	def save_thread(self, thread):
@@ -64,13 +68,11 @@ class BoardScraper4chan(BasicJSONScraper):
 			"index_positions": ""
 		}
 
-		# schedule a job for scraping the thread's posts
-		try:
-			jobtype = self.prefix + "-thread"
-			self.queue.add_job(jobtype=jobtype, remote_id=thread["no"], details={"board": board_id})
-		except JobAlreadyExistsException:
-			# this might happen if the workers can't keep up with the queue
-			pass
+		# schedule a job for scraping the thread's posts - these are queued
+		# together once all threads have been processed. if a job for this
+		# thread already exists, which might happen if the workers can't keep
+		# up with the queue, no new job is added
+		self.thread_jobs.append({"jobtype": self.prefix + "-thread", "remote_id": thread["no"], "details": {"board": board_id}})
 
 		# add database record for thread, if none exists yet
 		# 8chan supports cyclical threads which have an ID that is *not* the first post's. The
@@ -32,7 +32,6 @@ import six
 from pathlib import Path
 
 from backend.abstract.scraper import BasicJSONScraper
-from backend.lib.exceptions import JobAlreadyExistsException
 from backend.lib.helpers import strip_tags
 
 import config
@@ -63,6 +62,9 @@ class ThreadScraper4chan(BasicJSONScraper):
 	required_fields = ["no", "resto", "now", "time"]
 	required_fields_op = ["no", "resto", "now", "time", "replies", "images"]
 
+	# image download jobs to be queued once all posts have been saved
+	image_jobs = []
+
 	def process(self, data):
 		"""
 		Process scraped thread data
@@ -119,11 +121,15 @@ class ThreadScraper4chan(BasicJSONScraper):
 		# add new posts
 		new = set(post_dict_scrape.keys()) - set(post_dict_db.keys())
 		new_posts = 0
+		self.image_jobs = []
 		for post_id in new:
 			added = self.save_post(post_dict_scrape[post_id], thread, first_post)
 			if added:
 				new_posts += 1
 
+		# queue image downloads for the new posts, all at once
+		self.queue.add_jobs(self.image_jobs)
+
 		# update thread data
 		self.update_thread(thread, first_post, last_reply, last_post, thread["num_replies"] + new_posts)
 
@@ -252,7 +258,8 @@ class ThreadScraper4chan(BasicJSONScraper):
 
 		This queues the image for downloading, if it hasn't been downloaded yet
 		and a valid image folder has been set. This is the only place in the
-		backend where the image path is determined!
+		backend where the image path is determined! Jobs are not added right
+		away, but collected so they can be added in one go.
 
 		:param dict post:  Post data to queue image download for
 		:param dict thread:  Thread data of thread within which image was posted
@@ -268,15 +275,12 @@ class ThreadScraper4chan(BasicJSONScraper):
 		if config.PATH_IMAGES and image_folder.is_dir() and not image_path.is_file():
 			claimtime = int(time.time()) + config.IMAGE_INTERVAL
 
-			try:
-				self.queue.add_job("4chan-image", remote_id=post["md5"], claim_after=claimtime, details={
-					"board": thread["board"],
-					"ext": post["ext"],
-					"tim": post["tim"],
-					"destination": str(image_path),
-				})
-			except JobAlreadyExistsException:
-				pass
+			self.image_jobs.append({"jobtype": "4chan-image", "remote_id": post["md5"], "claim_after": claimtime, "details": {
+				"board": thread["board"],
+				"ext": post["ext"],
+				"tim": post["tim"],
+				"destination": str(image_path),
+			}})
 
 	def register_thread(self, first_post, last_reply, last_post, num_replies):
 		"""
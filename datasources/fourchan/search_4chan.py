@@ -90,7 +90,7 @@ class Search4Chan(Search):
 		else:
 			sql_query += " ORDER BY p.timestamp ASC"
 
-		return self.db.fetchall_interruptable(self.queue, sql_query, replacements)
+		return self.db.fetch_iter_interruptable(sql_query, replacements, readonly=True)
 
 	def get_posts_complex(self, query):
 		"""
@@ -103,7 +103,8 @@ class Search4Chan(Search):
 		is handled through PostgreSQL queries.
 
 		:param dict query:  Query parameters, as part of the DataSet object
-		:return list:  Posts, sorted by thread and post ID, in ascending order
+		:return:  Posts, sorted by thread and post ID, in ascending order, as
+		a generator
 		"""
 
 		# first, build the sphinx query
@@ -219,7 +220,7 @@ class Search4Chan(Search):
 		Fetch post data from database
 
 		:param list post_ids:  List of post IDs to return data for
-		:return list: List of posts, with a dictionary representing the database record for each post
+		:return: Generator of posts, with a dictionary representing the database record for each post
 		"""
 		if not where:
 			where = []
@@ -236,23 +237,23 @@ class Search4Chan(Search):
 
 		query = "SELECT " + columns + " FROM posts_" + self.prefix + " WHERE " + " AND ".join(
 			where) + " ORDER BY id ASC"
-		return self.db.fetchall_interruptable(self.queue, query, replacements)
+		return self.db.fetch_iter_interruptable(query, replacements, readonly=True)
 
 	def fetch_threads(self, thread_ids):
 		"""
 		Fetch post from database for given threads
 
 		:param list thread_ids: List of thread IDs to return post data for
-		:return list: List of posts, with a dictionary representing the database record for each post
+		:return: Generator of posts, with a dictionary representing the database record for each post
 		"""
 		columns = ", ".join(self.return_cols)
 
 		if self.interrupted:
 			raise ProcessorInterruptedException("Interrupted while fetching thread data")
 
-		return self.db.fetchall_interruptable(self.queue,
+		return self.db.fetch_iter_interruptable(
 			"SELECT " + columns + " FROM posts_" + self.prefix + " WHERE thread_id IN %s ORDER BY thread_id ASC, id ASC",
-											  (thread_ids,))
+											  (thread_ids,), readonly=True)
 
 	def fetch_sphinx(self, where, replacements):
 		"""
@@ -305,8 +306,8 @@ class Search4Chan(Search):
 		"""
 		# find total thread lengths for all threads in initial data set
 		thread_sizes = {row["thread_id"]: row["num_posts"] for row in self.db.fetchall_interruptable(
-			self.queue, "SELECT COUNT(*) as num_posts, thread_id FROM posts_" + self.prefix + " WHERE thread_id IN %s GROUP BY thread_id",
-			(thread_ids,)) if int(row["num_posts"]) > min_length}
+			"SELECT COUNT(*) as num_posts, thread_id FROM posts_" + self.prefix + " WHERE thread_id IN %s GROUP BY thread_id",
+			(thread_ids,), readonly=True) if int(row["num_posts"]) > min_length}
 
 		return thread_sizes
 
@@ -23,4 +23,15 @@ for file in files:
 		query = DataSet(key=key, db=database)
 	except TypeError:
 		print("Not linked to a query: %s" % file)
+		os.unlink(config.PATH_DATA + "/" + file)
+
+# stored result files are kept as long as a dataset refers to them
+for file in glob.glob("store/*/*"):
+	if file.endswith(".tmp"):
+		# still being stored
+		continue
+
+	content_hash = os.path.basename(file).split(".")[0]
+	if not database.fetchone("SELECT key FROM datasets WHERE result_hash = %s", (content_hash,)):
+		print("Not used by a query: %s" % file)
 		os.unlink(config.PATH_DATA + "/" + file)
\ No newline at end of file
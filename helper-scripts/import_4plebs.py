@@ -57,20 +57,16 @@ def sanitize(post):
 
 def commit(posts, post_fields, db, datasource, fast=False):
 	if fast:
-		post_fields_sql = ", ".join(post_fields)
 		try:
-			db.execute_many("INSERT INTO posts_" + datasource + " (" + post_fields_sql + ") VALUES %s", posts)
-			db.commit()
+			db.copy_rows("posts_" + datasource, post_fields, posts)
 		except psycopg2.IntegrityError as e:
 			print(repr(e))
 			print(e)
 			sys.exit(1)
 
 	else:
-		db.execute("START TRANSACTION")
-		for post in posts:
-			db.insert("posts_" + datasource, data={post_fields[i]: post[i] for i in range(0, len(post))}, safe=True, commit=False)
-		db.commit()
+		# skip posts that are already in the database
+		db.copy_rows("posts_" + datasource, post_fields, posts, merge=True, constraints=("id",))
 
 
 # set up
@@ -91,9 +87,9 @@ cli.add_argument("-e", "--end", type=int, default=sys.maxsize,
 				 help="At which post to stop processing. Starts counting at 0 (so not affected by --skip)")
 cli.add_argument("-d", "--datasource", type=str, default="4chan", help="Data source ID")
 cli.add_argument("-f", "--fast", default=False, type=bool,
-				 help="Use batch queries instead of inserting posts individually. This is far faster than 'slow' mode, "
-					  "but will crash if trying to insert a duplicate post, so it should only be used on an empty "
-					  "database or when you're sure datasets don't overlap.")
+				 help="Copy posts straight into the posts table instead of skipping posts that already exist. This is "
+					  "faster than 'slow' mode, but will crash if trying to insert a duplicate post, so it should only "
+					  "be used on an empty database or when you're sure datasets don't overlap.")
 args = cli.parse_args()
 
 if not os.path.exists(args.input):
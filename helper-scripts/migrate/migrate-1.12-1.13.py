@@ -0,0 +1,54 @@
+# queue and dataset table improvements for faster scheduling
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)) + "/../..")
+from backend.lib.database import Database
+from backend.lib.logger import Logger
+
+import config
+
+log = Logger(output=True)
+db = Database(logger=log, dbname=config.DB_NAME, user=config.DB_USER, password=config.DB_PASSWORD, host=config.DB_HOST, port=config.DB_PORT, appname="4cat-migrate")
+
+print("  Creating index for job queue lookups")
+db.execute("CREATE INDEX IF NOT EXISTS job_queue ON jobs (jobtype, timestamp_claimed, timestamp)")
+
+print("  Adding node and lease columns to jobs table")
+db.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_by TEXT DEFAULT ''")
+db.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS timestamp_lease INTEGER DEFAULT 0")
+
+print("  Adding priority and owner columns to jobs table")
+db.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS priority INTEGER DEFAULT 0")
+db.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS owner TEXT DEFAULT ''")
+
+print("  Adding dependency column to jobs table")
+db.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS depends_on INTEGER DEFAULT 0")
+
+print("  Removing obsolete query cancellation jobs")
+db.execute("DELETE FROM jobs WHERE jobtype = 'cancel-pg-query'")
+
+print("  Adding datasource and owner columns to datasets table")
+db.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS datasource TEXT DEFAULT ''")
+db.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS owner TEXT DEFAULT ''")
+db.execute("UPDATE datasets SET datasource = COALESCE(parameters::json->>'datasource', ''), owner = COALESCE(parameters::json->>'user', '')")
+db.execute("UPDATE datasets SET job = (parameters::json->>'job')::integer WHERE job = 0 AND parameters::json->>'job' ~ '^[0-9]+$'")
+
+print("  Creating indexes for dataset lookups")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_key ON datasets (key)")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_parent ON datasets (key_parent)")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_timestamp ON datasets (timestamp)")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_datasource ON datasets (datasource, timestamp)")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_owner ON datasets (owner)")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_job ON datasets (job)")
+
+print("  Adding progress column to datasets table")
+db.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS progress TEXT DEFAULT ''")
+
+print("  Adding result hash column to datasets table")
+db.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS result_hash TEXT DEFAULT ''")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_result_hash ON datasets (result_hash)")
+
+print("  Adding cache key column to datasets table")
+db.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS cache_key TEXT DEFAULT ''")
+db.execute("CREATE INDEX IF NOT EXISTS dataset_cache_key ON datasets (cache_key)")
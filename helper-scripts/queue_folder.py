@@ -35,12 +35,12 @@ logger = Logger()
 queue = JobQueue(logger=logger, database=Database(logger=logger, appname="queue-folder"))
 
 print("Adding files to queue...")
-files = 0
+jobs = []
 deadline = time.time()
 for file in jsons:
-	files += 1
 	file = str(file)
-	queue.add_job(args.datasource + "-thread", remote_id=file, details={"board": args.board, "file": str(file)}, claim_after=int(deadline))
+	jobs.append({"jobtype": args.datasource + "-thread", "remote_id": file, "details": {"board": args.board, "file": str(file)}, "claim_after": int(deadline)})
 	deadline += 0.1
 
+files = queue.add_jobs(jobs)
 print("Queued %i files." % files)
\ No newline at end of file
@@ -5,6 +5,7 @@ import csv
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.exceptions import ProcessorInterruptedException
+from backend.lib.compression import open_stored_file
 
 __author__ = "Stijn Peeters"
 __credits__ = ["Stijn Peeters"]
@@ -53,7 +54,7 @@ class ConvertCSVToMacExcel(BasicProcessor):
 
 		# recreate CSV file with the new dialect
 		with self.dataset.get_results_path().open("w") as output:
-			with self.source_file.open() as input:
+			with open_stored_file(self.source_file) as input:
 				reader = csv.DictReader(input)
 				writer = csv.DictWriter(output, fieldnames=reader.fieldnames, dialect="excel-mac")
 				writer.writeheader()
@@ -3,7 +3,6 @@ Filter posts by lexicon
 """
 import pickle
 import re
-import os
 
 from csv import DictReader, DictWriter
 from pathlib import Path
@@ -11,6 +10,8 @@ from pathlib import Path
 from backend.abstract.processor import BasicProcessor
 from backend.lib.dataset import DataSet
 from backend.lib.helpers import UserInput, convert_to_int
+from backend.lib.compression import open_stored_file, find_stored_file
+from backend.lib.columnar import get_sidecar_path
 
 import config
 
@@ -29,6 +30,7 @@ class LexicalFilter(BasicProcessor):
 	title = "Filter by lexicon"  # title displayed in UI
 	description = "Copies the dataset, retaining only posts that match any selected lexicon of words or phrases. This creates a new, separate dataset you can run analyses on."  # description displayed in UI
 	extension = "dataset"  # extension of result file, used internally and in UI
+	cacheable = False  # results are turned into a new standalone dataset
 
 	input = "csv:body"
 	output = "dataset"
@@ -111,7 +113,7 @@ class LexicalFilter(BasicProcessor):
 
 		with self.dataset.get_results_path().open("w", encoding="utf-8") as output:
 			# get header row, we need to copy it for the output
-			with self.source_file.open(encoding="utf-8") as input:
+			with open_stored_file(self.source_file) as input:
 				reader = DictReader(input)
 				fieldnames = reader.fieldnames
 
@@ -180,7 +182,9 @@ class LexicalFilter(BasicProcessor):
 
 		self.dataset.copied_to = standalone.key
 
-		# we don't need this file anymore - it has been copied to the new
+		# we don't need this file anymore - it has been linked to the new
 		# standalone dataset, and this one is not accessible via the interface
 		# except as a link to the copied standalone dataset
-		os.unlink(self.dataset.get_results_path())
+		for path in (find_stored_file(self.dataset.get_results_path()), get_sidecar_path(self.dataset.get_results_path())):
+			if path.exists():
+				path.unlink()
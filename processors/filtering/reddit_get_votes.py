@@ -7,6 +7,7 @@ import csv
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.exceptions import ProcessorInterruptedException
+from backend.lib.compression import open_stored_file
 
 import config
 
@@ -24,6 +25,7 @@ class RedditVoteChecker(BasicProcessor):
 	title = "Update Reddit post scores"  # title displayed in UI
 	description = "Updates the scores for each post to more accurately reflect the real score. Can only be used on datasets with < 5,000 posts due to the heavy usage of the API this requires."  # description displayed in UI
 	extension = "csv"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 
 	datasources = ["reddit"]
 
@@ -90,7 +92,7 @@ class RedditVoteChecker(BasicProcessor):
 
 		# now write a new CSV with the updated scores
 		# get field names
-		with self.source_file.open() as input:
+		with open_stored_file(self.source_file) as input:
 			reader = csv.DictReader(input)
 			fieldnames = reader.fieldnames
 
@@ -60,7 +60,7 @@ class CountPosts(BasicProcessor):
 		with self.dataset.get_results_path().open("w") as results:
 			counter = 0
 
-			for post in self.iterate_csv_items(self.source_file):
+			for post in self.iterate_csv_items(self.source_file, columns=("timestamp",)):
 				# Add a count for the respective timeframe
 				if timeframe == "all":
 					date = "overall"
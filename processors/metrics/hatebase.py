@@ -9,6 +9,7 @@ from csv import DictReader, DictWriter
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import UserInput
 from backend.lib.exceptions import ProcessorInterruptedException
+from backend.lib.compression import open_stored_file
 
 import config
 
@@ -26,6 +27,8 @@ class HatebaseAnalyser(BasicProcessor):
 	title = "Hatebase analysis"  # title displayed in UI
 	description = "Analyse all posts' content with Hatebase, assigning a score for 'offensiveness' and a propability that the post contains hate speech."  # description displayed in UI
 	extension = "csv"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on datasets other than the parent
+	execution = "process"  # CPU-bound, so run in a separate process
 
 	token_expires = 0
 	token = ""
@@ -72,7 +75,7 @@ class HatebaseAnalyser(BasicProcessor):
 
 		processed = 0
 		with self.dataset.get_results_path().open("w") as output:
-			with self.source_file.open() as input:
+			with open_stored_file(self.source_file) as input:
 				reader = DictReader(input)
 				fieldnames = reader.fieldnames
 				fieldnames += ("hatebase_num", "hatebase_num_ambiguous", "hatebase_num_unambiguous",
@@ -9,7 +9,7 @@ from csv import DictReader
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import UserInput
-from backend.lib.exceptions import ProcessorInterruptedException
+from backend.lib.compression import open_stored_file
 
 import config
 
@@ -93,7 +93,7 @@ class OvertimeAnalysis(BasicProcessor):
 		views = {}
 		intervals = set()
 
-		with self.source_file.open() as input:
+		with open_stored_file(self.source_file) as input:
 			reader = DictReader(input)
 			if "views" in reader.fieldnames:
 				engagement_field = "views"
@@ -112,63 +112,58 @@ class OvertimeAnalysis(BasicProcessor):
 		hatebase = {term.lower(): hatebase[term] for term in hatebase}
 		hatebase_regex = re.compile(r"\b(" + "|".join([re.escape(term) for term in hatebase if not min_offensive or (hatebase[term]["average_offensiveness"] and hatebase[term]["average_offensiveness"] > min_offensive)]) + r")\b")
 
-		with open(self.source_file, encoding='utf-8') as source:
-			csv = DictReader(source)
-			for post in csv:
-				if self.interrupted:
-					raise ProcessorInterruptedException("Interrupted while reading input")
-
-				# determine where to put this data
-				if timeframe == "all":
-					time_unit = "overall"
-				else:
-					try:
-						timestamp = int(datetime.datetime.strptime(post["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp())
-					except ValueError:
-						timestamp = 0
-					date = datetime.datetime.fromtimestamp(timestamp)
-					if timeframe == "year":
-						time_unit = str(date.year)
-					elif timeframe == "month":
-						time_unit = str(date.year) + "-" + str(date.month).zfill(2)
-					else:
-						time_unit = str(date.year) + "-" + str(date.month).zfill(2) + "-" + str(date.day).zfill(2)
-
-				if time_unit not in activity:
-					activity[time_unit] = 0
-
-				if time_unit not in hateful:
-					hateful[time_unit] = 0
-
-				if time_unit not in views:
-					views[time_unit] = 0
-
-				intervals.add(time_unit)
-
-				activity[time_unit] += 1
+		for post in self.iterate_csv_items(self.source_file, columns=("timestamp", "body", engagement_field)):
+			# determine where to put this data
+			if timeframe == "all":
+				time_unit = "overall"
+			else:
 				try:
-					views[time_unit] += int(post[engagement_field])
-				except (ValueError, TypeError):
-					pass
+					timestamp = int(datetime.datetime.strptime(post["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp())
+				except ValueError:
+					timestamp = 0
+				date = datetime.datetime.fromtimestamp(timestamp)
+				if timeframe == "year":
+					time_unit = str(date.year)
+				elif timeframe == "month":
+					time_unit = str(date.year) + "-" + str(date.month).zfill(2)
+				else:
+					time_unit = str(date.year) + "-" + str(date.month).zfill(2) + "-" + str(date.day).zfill(2)
+
+			if time_unit not in activity:
+				activity[time_unit] = 0
+
+			if time_unit not in hateful:
+				hateful[time_unit] = 0
 
-				terms = []
-				for term in hatebase_regex.findall(post["body"].lower()):
-					if not term:
+			if time_unit not in views:
+				views[time_unit] = 0
+
+			intervals.add(time_unit)
+
+			activity[time_unit] += 1
+			try:
+				views[time_unit] += int(post[engagement_field])
+			except (ValueError, TypeError):
+				pass
+
+			terms = []
+			for term in hatebase_regex.findall(post["body"].lower()):
+				if not term:
+					continue
+				if "plural_of" in hatebase[term] and hatebase[term]["plural_of"]:
+					if hatebase[term]["plural_of"] in terms:
 						continue
-					if "plural_of" in hatebase[term] and hatebase[term]["plural_of"]:
-						if hatebase[term]["plural_of"] in terms:
-							continue
-						elif hatebase[term]["plural_of"] in hatebase:
-							term = hatebase[term]["plural_of"]
-
-						if scope == "ambiguous" and not hatebase[term]["is_unambiguous"]:
-							terms.append(term)
-						elif scope == "unambiguous" and hatebase[term]["is_unambiguous"]:
-							terms.append(term)
-						elif scope == "all":
-							terms.append(term)
-
-				hateful[time_unit] += len(terms)
+					elif hatebase[term]["plural_of"] in hatebase:
+						term = hatebase[term]["plural_of"]
+
+					if scope == "ambiguous" and not hatebase[term]["is_unambiguous"]:
+						terms.append(term)
+					elif scope == "unambiguous" and hatebase[term]["is_unambiguous"]:
+						terms.append(term)
+					elif scope == "all":
+						terms.append(term)
+
+			hateful[time_unit] += len(terms)
 
 		rows = []
 		for interval in sorted(intervals):
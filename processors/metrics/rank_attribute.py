@@ -105,10 +105,13 @@ class AttributeRanker(BasicProcessor):
 		# if we're interested in overall top-ranking items rather than a
 		# per-period ranking, we need to do a first pass in which all posts are
 		# inspected to determine those overall top-scoring items
+		# only read the columns needed to determine the values and dates
+		columns = ("timestamp", "body", "url", attribute)
+
 		overall_top = {}
 		if rank_style == "overall":
 			self.dataset.update_status("Determining overall top-%i items" % cutoff)
-			for post in self.iterate_csv_items(self.source_file):
+			for post in self.iterate_csv_items(self.source_file, columns=columns):
 				values = self.get_values(post, attribute, filter)
 				for value in values:
 					if value not in overall_top:
@@ -120,7 +123,7 @@ class AttributeRanker(BasicProcessor):
 
 		# now for the real deal
 		self.dataset.update_status("Reading source file")
-		for post in self.iterate_csv_items(self.source_file):
+		for post in self.iterate_csv_items(self.source_file, columns=columns):
 			# determine where to put this data
 			if timeframe == "all":
 				time_unit = "overall"
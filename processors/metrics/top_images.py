@@ -39,7 +39,7 @@ class TopImageCounter(BasicProcessor):
 		images = {}
 
 		self.dataset.update_status("Reading source file")
-		for post in self.iterate_csv_items(self.source_file):
+		for post in self.iterate_csv_items(self.source_file, columns=("image_file", "image_md5")):
 			if not post["image_file"]:
 				continue
 
@@ -16,6 +16,7 @@ from csv import DictReader
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import UserInput, get_yt_compatible_ids
+from backend.lib.compression import open_stored_file
 
 import config
 
@@ -38,6 +39,7 @@ class YouTubeMetadata(BasicProcessor):
 	title = "YouTube URL metadata"  # title displayed in UI
 	description = "Extract information from YouTube links to videos and channels"  # description displayed in UI
 	extension = "csv"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 	datasources = ["4chan", "8chan", "reddit", "breitbart","custom"]
 
 	input = "csv:id,body"
@@ -89,7 +91,7 @@ class YouTubeMetadata(BasicProcessor):
 		urls = {}
 
 		self.dataset.update_status("Reading source file")
-		with open(self.source_file, encoding="utf-8") as source:
+		with open_stored_file(self.source_file) as source:
 
 			# Read source file
 			csv = DictReader(source)
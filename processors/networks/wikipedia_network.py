@@ -26,6 +26,7 @@ class WikipediaCatgegoryNetwork(BasicProcessor):
 	title = "Wikipedia category network"  # title displayed in UI
 	description = "Create a Gephi-compatible network comprised of wikipedia pages linked in the data set, linked to the categories they are part of. English Wikipedia only."  # description displayed in UI
 	extension = "gdf"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 
 	input = "csv:body"
 	output = "gdf"
@@ -23,6 +23,7 @@ class GetCollocations(BasicProcessor):
 	title = "Word collocations"  # title displayed in UI
 	description = "Extracts word collocations from a set of tokens."  # description displayed in UI
 	extension = "csv"  # extension of result file, used internally and in UI
+	execution = "process"  # CPU-bound, so run in a separate process
 
 	accepts = ["tokenise-posts"]  # query types this post-processor accepts as input
 
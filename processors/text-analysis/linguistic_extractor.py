@@ -15,6 +15,7 @@ from spacy.util import compile_prefix_regex, compile_infix_regex, compile_suffix
 
 from backend.lib.helpers import UserInput
 from backend.abstract.processor import BasicProcessor
+from backend.lib.compression import open_stored_file
 
 __author__ = "Sal Hagen"
 __credits__ = ["Sal Hagen", "Stijn Peeters"]
@@ -30,6 +31,10 @@ class LinguisticFeatures(BasicProcessor):
 	title = "Linguistic features"  # title displayed in UI
 	description = "Annotate your text with a variety of linguistic features, including part-of-speech tagging, depencency parsing, and named entity recognition. Uses the SpaCy library and the en_core_web_sm model. Currently only available for datasets with less than 25.000 items."  # description displayed in UI
 	extension = "zip"  # extension of result file, used internally and in UI
+	execution = "process"  # CPU- and memory-heavy, so run in a separate process where memory use can be measured
+	memory_cost = 1000  # estimated memory use in MB
+	memory_cost_per_row = 0.005  # estimated extra memory use in MB per input row
+	cpu_cost = 1  # estimated CPU cores used
 
 	input = "csv"
 	output = "zip"
@@ -74,7 +79,7 @@ class LinguisticFeatures(BasicProcessor):
 		options = ["parser","tagger","ner"]
 		disable = [option for option in options if option not in self.parameters["enable"]]
 
-		with open(self.source_file, encoding="utf-8") as source:
+		with open_stored_file(self.source_file) as source:
 
 			# Get all ze text first so we can process it in batches
 			csv_reader = csv.DictReader(source)
@@ -9,6 +9,7 @@ import re
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.exceptions import ProcessorInterruptedException
+from backend.lib.compression import open_stored_file
 
 __author__ = "Stijn Peeters"
 __credits__ = ["Katrien Beuls", "Paul van Eecke"]
@@ -32,6 +33,7 @@ class SemanticFrameExtractor(BasicProcessor):
 	title = "Semantic frames"  # title displayed in UI
 	description = "Extract semantic frames from text. This connects to the VUB's PENELOPE API to extract causal frames from the text using the framework developed by the Evolutionary and Hybrid AI (EHAI) group."  # description displayed in UI
 	extension = "csv"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 	accepts = ["sentence-split"]  # types of result this post-processor can run on
 
 	input = "csv:sentence"
@@ -57,7 +59,7 @@ class SemanticFrameExtractor(BasicProcessor):
 		with self.dataset.get_results_path().open("w") as output:
 			writer = csv.DictWriter(output, fieldnames=("sentence", "utterance", "frameEvokingElement", "cause", "effect"))
 			writer.writeheader()
-			with self.source_file.open("r") as input:
+			with open_stored_file(self.source_file) as input:
 				reader = csv.DictReader(input)
 
 				while True:
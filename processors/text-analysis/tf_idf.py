@@ -34,6 +34,10 @@ class TfIdf(BasicProcessor):
 	title = "Tf-idf"  # title displayed in UI
 	description = "Get the tf-idf values of tokenised text. Works better with more documents (e.g. day-separated)."  # description displayed in UI
 	extension = "csv"  # extension of result file, used internally and in UI
+	execution = "process"  # CPU-bound, so run in a separate process
+	memory_cost = 200  # estimated memory use in MB
+	memory_cost_per_row = 0.005  # estimated extra memory use in MB per input row
+	cpu_cost = 1  # estimated CPU cores used
 	accepts = ["tokenise-posts"]  # query types this post-processor accepts as input
 
 	input = "zip"
@@ -34,6 +34,10 @@ class Tokenise(BasicProcessor):
 	title = "Tokenise"  # title displayed in UI
 	description = "Tokenises post bodies, producing corpus data that may be used for further processing by e.g. NLP. The output is a serialized list of lists, with each post treated as a single document (so no sentence splitting)."  # description displayed in UI
 	extension = "zip"  # extension of result file, used internally and in UI
+	execution = "process"  # CPU-bound, so run in a separate process
+	memory_cost = 100  # estimated memory use in MB
+	memory_cost_per_row = 0.002  # estimated extra memory use in MB per input row
+	cpu_cost = 1  # estimated CPU cores used
 
 	input = "csv:body"
 	output = "zip"
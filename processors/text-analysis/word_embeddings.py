@@ -28,6 +28,10 @@ class word_embeddings(BasicProcessor):
 	title = "Word embeddings"  # title displayed in UI
 	description = "Generate a word embedding model from the tokenised text. Note: good models require a lot of data."  # description displayed in UI
 	extension = "zip"  # extension of result file, used internally and in UI
+	execution = "process"  # CPU- and memory-heavy, so run in a separate process where memory use can be measured
+	memory_cost = 500  # estimated memory use in MB
+	memory_cost_per_row = 0.002  # estimated extra memory use in MB per input row
+	cpu_cost = 1  # estimated CPU cores used
 	accepts = ["tokenise-posts"]  # query types this post-processor accepts as input
 
 	input = "zip"
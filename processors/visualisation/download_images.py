@@ -39,6 +39,7 @@ class ImageDownloader(BasicProcessor):
 	title = "Download images"  # title displayed in UI
 	description = "Download top images and compress as a zip file. May take a while to complete as images are sourced externally."  # description displayed in UI
 	extension = "zip"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 	accepts = ["top-images"]  # query types this post-processor accepts as input
 
 	input = "csv:filename,url_4cat"
@@ -110,7 +111,7 @@ class ImageDownloader(BasicProcessor):
 				raise ProcessorInterruptedException("Interrupted while downloading images.")
 
 			counter += 1
-			self.dataset.update_status("Downloading image %i of %i" % (counter, len(urls)))
+			self.dataset.update_progress(counter, len(urls), status="Downloading image %i of %i" % (counter, len(urls)))
 
 			# acquire and resize image
 			try:
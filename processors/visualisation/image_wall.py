@@ -22,6 +22,7 @@ from io import StringIO
 import config
 from backend.lib.helpers import UserInput
 from backend.abstract.processor import BasicProcessor
+from backend.lib.compression import open_stored_file
 
 
 __author__ = "Stijn Peeters"
@@ -40,6 +41,7 @@ class ImageWallGenerator(BasicProcessor):
 	title = "Image wall"  # title displayed in UI
 	description = "Download top images and create an image wall. The amount of images used can be configured; the more images, the longer it takes to create the image wall. May take a while to complete as images need to be downloaded externally."  # description displayed in UI
 	extension = "png"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 	accepts = ["top-images", "tiktok-search", "instagram-search"]  # query types this post-processor accepts as input
 	datasources = ["4chan", "tiktok", "instagram"]
 
@@ -104,7 +106,7 @@ class ImageWallGenerator(BasicProcessor):
 		tmp_path = self.dataset.get_temporary_path()
 		tmp_path.mkdir()
 
-		with open(self.source_file) as source:
+		with open_stored_file(self.source_file) as source:
 			csv = DictReader(source)
 			for post in csv:
 				if len(urls) >= amount:
@@ -126,7 +128,7 @@ class ImageWallGenerator(BasicProcessor):
 		# loop through images and copy them onto the wall
 		for path in urls:
 			counter += 1
-			self.dataset.update_status("Downloading image %i of %i" % (counter, len(urls)))
+			self.dataset.update_progress(counter, len(urls), status="Downloading image %i of %i" % (counter, len(urls)))
 
 			# acquire and resize image
 			try:
@@ -6,6 +6,7 @@ import re
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import UserInput, convert_to_int, pad_interval
+from backend.lib.compression import open_stored_file
 
 from calendar import month_abbr
 from math import sin, cos, tan, degrees, radians, copysign
@@ -94,7 +95,7 @@ class IsometricMultigraphRenderer(BasicProcessor):
 		first_date = "9999-99-99"
 		last_date = "0000-00-00"
 
-		with self.source_file.open() as input:
+		with open_stored_file(self.source_file) as input:
 			reader = csv.DictReader(input)
 
 			item_key = "text" if "text" in reader.fieldnames else "item"
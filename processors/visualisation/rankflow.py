@@ -6,6 +6,7 @@ import csv
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import UserInput, convert_to_int
+from backend.lib.compression import open_stored_file
 
 from svgwrite import Drawing
 from svgwrite.shapes import Rect
@@ -59,7 +60,7 @@ class RankFlowRenderer(BasicProcessor):
 		size_property = self.options.get("size_property", self.options["size_property"]["default"])
 
 		# first create a map with the ranks for each period
-		with self.source_file.open() as input:
+		with open_stored_file(self.source_file) as input:
 			reader = csv.DictReader(input)
 
 			weight_attribute = "value" if "value" in reader.fieldnames else "frequency"
@@ -16,6 +16,7 @@ from pathlib import Path
 
 from backend.lib.helpers import UserInput
 from backend.abstract.processor import BasicProcessor
+from backend.lib.compression import open_stored_file
 
 __author__ = "Sal Hagen"
 __credits__ = ["Sal Hagen"]
@@ -107,7 +108,7 @@ class SigmaNetwork(BasicProcessor):
 		if highlight_words:
 			highlight_words = [highlight_word for highlight_word in str(highlight_words).split(",")]
 
-		with source_file.open(encoding="utf-8") as source:
+		with open_stored_file(source_file) as source:
 
 			# Get the amount of nodes and their info from the first line in the file
 			first_line = source.readline()
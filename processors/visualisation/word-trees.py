@@ -150,7 +150,7 @@ class MakeWordtree(BasicProcessor):
 		for post in self.iterate_csv_items(self.source_file):
 			processed += 1
 			if processed % 500 == 0:
-				self.dataset.update_status("Processing and tokenising post %i" % processed)
+				self.dataset.update_progress(processed, self.parent.num_rows, status="Processing and tokenising post %i" % processed)
 			body = post["body"]
 
 			if strip_urls:
@@ -14,6 +14,7 @@ from PIL import Image, ImageFile, ImageOps, ImageDraw, ImageFont
 
 from backend.abstract.processor import BasicProcessor
 from backend.lib.helpers import UserInput, convert_to_int
+from backend.lib.compression import open_stored_file
 
 __author__ = "Sal Hagen"
 __credits__ = ["Sal Hagen", "Partha Das"]
@@ -33,6 +34,7 @@ class YouTubeImageWall(BasicProcessor):
 	title = "YouTube thumbnails image wall"  # title displayed in UI
 	description = "Make an image wall from YouTube video thumbnails."  # description displayed in UI
 	extension = "png"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on datasets other than the parent
 
 	input = "zip"
 	output = "png"
@@ -116,7 +118,8 @@ class YouTubeImageWall(BasicProcessor):
 		}
 
 		# Read the csv and get video ids
-		df = pd.read_csv(path_to_yt_metadata)
+		with open_stored_file(path_to_yt_metadata) as metadata_file:
+			df = pd.read_csv(metadata_file)
 
 		files = df["id"].tolist()
 
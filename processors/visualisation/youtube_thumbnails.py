@@ -32,6 +32,7 @@ class YouTubeThumbnails(BasicProcessor):
 	title = "Download YouTube thumbnails"  # title displayed in UI
 	description = "Download YouTube video thumbnails."  # description displayed in UI
 	extension = "zip"  # extension of result file, used internally and in UI
+	cacheable = False  # results depend on external data
 
 	input = "csv:id"
 	output = "zip"
@@ -32,6 +32,7 @@ libraries = [
 	"pytumblr==0.1.0",
 	"cython==0.29.14",
 	"pymysql==0.9.2",
+	"pyarrow==0.17.1",
 	"pandas==0.23.4",
 	"datedelta==1.3",
 	"anytree==2.7.2",
@@ -47,6 +48,7 @@ libraries = [
 	"nltk==3.4.5",
 	"mpld3==0.3",
 	"ijson==2.4",
+	"zstandard==0.14.0",
 ]
 
 # Some libraries don't run on Windows
@@ -0,0 +1,91 @@
+"""
+Shared fixtures for 4CAT tests
+
+Tests do not need a database: datasets are given a stand-in database that
+keeps track of what would have been written. They also do not need a
+configured 4CAT install; if there is no config.py, the defaults from
+config.py-example are used.
+
+Importing the `backend` package loads all data sources and processors, which
+requires psycopg2. If it is not installed, `backend` is set up without doing
+so, which is enough for tests of self-contained modules such as
+`backend.lib.compression`. Tests that need the full backend should skip
+themselves via `pytest.importorskip("psycopg2")`.
+"""
+import importlib.util
+import importlib.machinery
+import types
+import json
+import sys
+import os
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+if importlib.util.find_spec("config") is None:
+	loader = importlib.machinery.SourceFileLoader("config", os.path.join(ROOT, "config.py-example"))
+	config = importlib.util.module_from_spec(importlib.util.spec_from_loader("config", loader))
+	loader.exec_module(config)
+	sys.modules["config"] = config
+
+if importlib.util.find_spec("psycopg2") is None:
+	backend = types.ModuleType("backend")
+	backend.__path__ = [os.path.join(ROOT, "backend")]
+	sys.modules["backend"] = backend
+
+
+class RecordingDatabase:
+	"""
+	Stand-in for `Database` that serves dataset records from memory and
+	records updates instead of running them
+	"""
+	def __init__(self, records=()):
+		self.records = {record["key"]: record for record in records}
+		self.updates = []
+		self.closed = 0
+
+	def fetchone(self, query, replacements=None):
+		record = self.records.get(replacements[0])
+		return dict(record) if record else None
+
+	def update(self, table, data, where=None, commit=True):
+		self.updates.append(data)
+		return 1
+
+	def close(self):
+		self.closed += 1
+
+
+def make_record(key, parameters=None, **fields):
+	"""
+	Get a complete dataset record
+
+	:param str key:  Dataset key
+	:param dict parameters:  Dataset parameters
+	:param fields:  Other columns to set
+	:return dict:
+	"""
+	return {
+		"key": key,
+		"query": key,
+		"type": "search",
+		"key_parent": "",
+		"parameters": json.dumps(parameters or {}),
+		"result_file": key + ".csv",
+		"result_hash": "",
+		"cache_key": "",
+		"status": "",
+		"progress": "",
+		"timestamp": 0,
+		"is_finished": False,
+		"num_rows": 0,
+		**fields
+	}
+
+
+@pytest.fixture
+def database():
+	return RecordingDatabase()
+
@@ -0,0 +1,75 @@
+"""
+Test columnar copies of CSV files
+"""
+import os
+
+import pytest
+
+from backend.lib import columnar
+from backend.lib.columnar import SidecarWriter, get_sidecar_path, has_sidecar, iterate_sidecar
+
+pytestmark = pytest.mark.skipif(columnar.pyarrow is None, reason="pyarrow is not installed")
+
+ROWS = [{"id": str(i), "body": "post %i" % i, "author": "author %i" % (i % 3)} for i in range(25)]
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+	monkeypatch.setattr(SidecarWriter, "enabled", True)
+	monkeypatch.setattr(SidecarWriter, "batch_size", 10)
+
+	path = tmp_path.joinpath("results.csv")
+	path.write_text("id,body,author\n")
+
+	sidecar = SidecarWriter(path, ["id", "body", "author"])
+	for row in ROWS:
+		sidecar.write(row)
+	sidecar.close()
+
+	return path
+
+
+def test_sidecar_contains_all_rows(csv_path):
+	assert has_sidecar(csv_path)
+	assert list(iterate_sidecar(csv_path)) == ROWS
+
+
+def test_sidecar_reads_only_requested_columns(csv_path):
+	rows = list(iterate_sidecar(csv_path, columns=("author", "id")))
+
+	assert len(rows) == len(ROWS)
+	assert all(set(row) == {"author", "id"} for row in rows)
+	assert rows[7] == {"id": "7", "author": "author 1"}
+
+
+def test_sidecar_ignores_unknown_columns(csv_path):
+	rows = list(iterate_sidecar(csv_path, columns=("id", "nonexistent")))
+
+	assert rows[0] == {"id": "0"}
+
+
+def test_sidecar_yields_empty_rows_without_requested_columns(csv_path):
+	rows = list(iterate_sidecar(csv_path, columns=("nonexistent",)))
+
+	assert rows == [{}] * len(ROWS)
+
+
+def test_outdated_sidecar_is_not_used(csv_path):
+	sidecar = get_sidecar_path(csv_path)
+	stats = sidecar.stat()
+	os.utime(str(csv_path), (stats.st_atime, stats.st_mtime + 10))
+
+	assert not has_sidecar(csv_path)
+
+
+def test_discarded_sidecar_is_not_written(tmp_path, monkeypatch):
+	monkeypatch.setattr(SidecarWriter, "enabled", True)
+	path = tmp_path.joinpath("results.csv")
+	path.write_text("id\n")
+
+	sidecar = SidecarWriter(path, ["id"])
+	sidecar.write({"id": "1"})
+	sidecar.discard()
+
+	assert not get_sidecar_path(path).exists()
+	assert not sidecar.staging_path.exists()
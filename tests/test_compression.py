@@ -0,0 +1,74 @@
+"""
+Test compressed storage of result files
+"""
+import pytest
+
+from backend.lib import compression
+from backend.lib.compression import compress_file, find_stored_file, get_content_encoding, get_stored_paths, \
+	open_stored_file
+
+CONTENT = "id,body\n1,\"multi\nline\"\n2,ünïcödé\n"
+
+encodings = ["gzip"] + (["zstd"] if compression.zstandard else [])
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+	path = tmp_path.joinpath("results.csv")
+	with path.open("w", encoding="utf-8", newline="") as output:
+		output.write(CONTENT)
+
+	return path
+
+
+def test_uncompressed_file_is_read_as_is(csv_path):
+	assert find_stored_file(csv_path) == csv_path
+	assert get_content_encoding(csv_path) is None
+
+	with open_stored_file(csv_path, newline="") as infile:
+		assert infile.read() == CONTENT
+
+
+@pytest.mark.parametrize("encoding", encodings)
+def test_compressed_file_round_trip(csv_path, encoding):
+	mtime = csv_path.stat().st_mtime
+	stored = compress_file(csv_path, encoding)
+
+	assert not csv_path.exists()
+	assert stored != csv_path
+	assert find_stored_file(csv_path) == stored
+	assert get_content_encoding(stored) == encoding
+	assert stored.stat().st_mtime == mtime
+
+	with open_stored_file(csv_path, newline="") as infile:
+		assert infile.read() == CONTENT
+
+	with open_stored_file(csv_path, "rb") as infile:
+		assert infile.read() == CONTENT.encode("utf-8")
+
+
+def test_missing_file(tmp_path):
+	path = tmp_path.joinpath("missing.csv")
+
+	assert find_stored_file(path) == path
+	assert path in get_stored_paths(path)
+	with pytest.raises(FileNotFoundError):
+		open_stored_file(path)
+
+
+def test_stored_files_cannot_be_written(csv_path):
+	with pytest.raises(ValueError):
+		open_stored_file(csv_path, "w")
+
+
+def test_unavailable_zstd_falls_back_to_gzip(monkeypatch):
+	monkeypatch.setattr(compression.config, "DATASET_COMPRESSION", "zstd", raising=False)
+	monkeypatch.setattr(compression, "zstandard", None)
+
+	assert compression.get_compression() == "gzip"
+
+
+def test_compression_can_be_disabled(monkeypatch):
+	monkeypatch.setattr(compression.config, "DATASET_COMPRESSION", "", raising=False)
+
+	assert compression.get_compression() == ""
@@ -0,0 +1,101 @@
+"""
+Test cache keys for re-using results of identical analyses
+"""
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import backend
+from backend.lib import dataset as dataset_module
+from backend.lib.dataset import DataSet
+from conftest import RecordingDatabase, make_record
+
+PROCESSOR = {
+	"cacheable": True,
+	"version": "processor-version",
+	"options": {
+		"timeframe": {"default": "month"},
+		"pad": {"default": True}
+	}
+}
+
+
+@pytest.fixture(autouse=True)
+def processor(monkeypatch):
+	processor = dict(PROCESSOR)
+	monkeypatch.setitem(backend.all_modules.processors, "test-processor", processor)
+	monkeypatch.setattr(dataset_module, "get_software_version", lambda: "software-version")
+	monkeypatch.setattr(dataset_module.config, "DATASET_CACHE", True, raising=False)
+	return processor
+
+
+def get_cache_key(parameters, parent_hash="parent-hash", parent_finished=True, type="test-processor"):
+	"""
+	Get cache key for a dataset with the given parameters and parent
+	"""
+	parent = make_record("parent", is_finished=parent_finished, result_hash=parent_hash)
+	child = make_record("child", parameters=parameters, type=type, key_parent="parent")
+	database = RecordingDatabase([parent, child])
+
+	return DataSet(data=child, db=database).get_cache_key()
+
+
+def test_cache_key_is_stable():
+	parameters = {"timeframe": "year", "pad": False}
+
+	assert get_cache_key(parameters)
+	assert get_cache_key(parameters) == get_cache_key(dict(reversed(list(parameters.items()))))
+
+
+def test_cache_key_ignores_parameters_that_are_not_options():
+	assert get_cache_key({"timeframe": "year", "pad": False, "user": "alice"}) == \
+		   get_cache_key({"timeframe": "year", "pad": False, "user": "bob", "copied_at": 123})
+
+
+def test_cache_key_fills_in_defaults():
+	assert get_cache_key({}) == get_cache_key({"timeframe": "month", "pad": True})
+
+
+def test_cache_key_depends_on_options():
+	assert get_cache_key({"timeframe": "year"}) != get_cache_key({"timeframe": "day"})
+
+
+def test_cache_key_depends_on_parent_contents():
+	assert get_cache_key({}, parent_hash="one") != get_cache_key({}, parent_hash="two")
+
+
+def test_cache_key_depends_on_code_version(processor, monkeypatch):
+	before = get_cache_key({})
+
+	processor["version"] = "changed-processor-version"
+	assert get_cache_key({}) != before
+
+	processor["version"] = PROCESSOR["version"]
+	monkeypatch.setattr(dataset_module, "get_software_version", lambda: "changed-software-version")
+	assert get_cache_key({}) != before
+
+
+def test_no_cache_key_for_uncacheable_processors(processor):
+	processor["cacheable"] = False
+
+	assert get_cache_key({}) == ""
+
+
+def test_no_cache_key_for_unknown_processors():
+	assert get_cache_key({}, type="unknown-processor") == ""
+
+
+def test_no_cache_key_for_datasets_with_side_effects():
+	assert get_cache_key({"next": [{"type": "test-processor"}]}) == ""
+	assert get_cache_key({"attach_to": "preset"}) == ""
+
+
+def test_no_cache_key_without_stored_parent_results():
+	assert get_cache_key({}, parent_finished=False) == ""
+	assert get_cache_key({}, parent_hash="") == ""
+
+
+def test_no_cache_key_if_disabled(monkeypatch):
+	monkeypatch.setattr(dataset_module.config, "DATASET_CACHE", False, raising=False)
+
+	assert get_cache_key({}) == ""
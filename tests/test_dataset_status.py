@@ -0,0 +1,92 @@
+"""
+Test buffering of dataset status updates
+"""
+import time
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from backend.lib.dataset import DataSet
+from conftest import make_record
+
+
+@pytest.fixture(autouse=True)
+def clean_dataset_state():
+	"""
+	Make sure pending status updates and identity scopes do not leak between
+	tests
+	"""
+	yield
+	for dataset in list(DataSet.get_pending_statuses()):
+		if dataset._status_timer:
+			dataset._status_timer.cancel()
+	DataSet.status_buffer.datasets = set()
+	DataSet.end_identity_scope()
+
+
+def get_dataset(database):
+	return DataSet(data=make_record("status-test"), db=database)
+
+
+def test_first_update_is_written_immediately(database):
+	dataset = get_dataset(database)
+	dataset.update_status("Collecting posts")
+
+	assert database.updates[-1]["status"] == "Collecting posts"
+	assert dataset not in DataSet.get_pending_statuses()
+
+
+def test_updates_within_interval_are_buffered(database, monkeypatch):
+	monkeypatch.setattr(DataSet, "status_interval", 60)
+	dataset = get_dataset(database)
+
+	dataset.update_status("First")
+	dataset.update_status("Second")
+	dataset.update_status("Third")
+
+	assert [update["status"] for update in database.updates] == ["First"]
+	assert dataset in DataSet.get_pending_statuses()
+
+
+def test_pending_update_is_written_once_interval_has_passed(database, monkeypatch):
+	monkeypatch.setattr(DataSet, "status_interval", 0.2)
+	dataset = get_dataset(database)
+
+	dataset.update_status("First")
+	dataset.update_status("Second")
+	assert database.updates[-1]["status"] == "First"
+
+	# no further updates come in; the pending one should be written anyway
+	time.sleep(0.6)
+
+	assert database.updates[-1]["status"] == "Second"
+	assert len(database.updates) == 2
+	assert dataset not in DataSet.get_pending_statuses()
+	assert database.closed == 1
+
+
+def test_flush_pending_statuses_writes_latest_update(database, monkeypatch):
+	monkeypatch.setattr(DataSet, "status_interval", 60)
+	dataset = get_dataset(database)
+
+	dataset.update_status("First")
+	dataset.update_progress(5, 10, status="Second")
+	DataSet.flush_pending_statuses()
+
+	assert database.updates[-1]["status"] == "Second"
+	assert '"done": 5' in database.updates[-1]["progress"]
+	assert not DataSet.get_pending_statuses()
+	assert dataset._status_timer is None
+
+
+def test_final_status_is_written_immediately_and_kept(database, monkeypatch):
+	monkeypatch.setattr(DataSet, "status_interval", 60)
+	dataset = get_dataset(database)
+
+	dataset.update_status("First")
+	dataset.update_status("Done", is_final=True)
+	dataset.update_status("Ignored")
+
+	assert [update["status"] for update in database.updates] == ["First", "Done"]
+	assert dataset not in DataSet.get_pending_statuses()
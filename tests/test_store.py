@@ -0,0 +1,86 @@
+"""
+Test content-addressed storage of result files
+"""
+import pytest
+
+from backend.lib import store
+from backend.lib.compression import compress_file, find_stored_file, open_stored_file
+from backend.lib.store import get_object_path, hash_file, link_file, store_file
+
+
+@pytest.fixture
+def data_folder(tmp_path, monkeypatch):
+	monkeypatch.setattr(store.config, "PATH_ROOT", str(tmp_path), raising=False)
+	monkeypatch.setattr(store.config, "PATH_DATA", "data", raising=False)
+
+	folder = tmp_path.joinpath("data")
+	folder.mkdir()
+	return folder
+
+
+def write(path, content):
+	with path.open("w", encoding="utf-8", newline="") as output:
+		output.write(content)
+
+	return path
+
+
+def test_hash_does_not_depend_on_compression(data_folder):
+	plain = write(data_folder.joinpath("plain.csv"), "id\n1\n")
+	compressed = write(data_folder.joinpath("compressed.csv"), "id\n1\n")
+	compress_file(compressed, "gzip")
+
+	assert hash_file(plain) == hash_file(compressed)
+
+
+def test_identical_results_share_a_file(data_folder):
+	first = write(data_folder.joinpath("first.csv"), "id\n1\n")
+	second = write(data_folder.joinpath("second.csv"), "id\n1\n")
+
+	first_hash = store_file(first)
+	second_hash = store_file(second)
+
+	assert first_hash == second_hash
+	assert get_object_path(first_hash).exists()
+	assert first.samefile(second)
+	assert first.samefile(get_object_path(first_hash))
+
+	with open_stored_file(second) as infile:
+		assert infile.read() == "id\n1\n"
+
+
+def test_different_results_are_stored_separately(data_folder):
+	first = write(data_folder.joinpath("first.csv"), "id\n1\n")
+	second = write(data_folder.joinpath("second.csv"), "id\n2\n")
+
+	assert store_file(first) != store_file(second)
+	assert not first.samefile(second)
+
+
+def test_compressed_results_are_stored_with_suffix(data_folder):
+	path = write(data_folder.joinpath("results.csv"), "id\n1\n")
+	stored = compress_file(path, "gzip")
+
+	content_hash = store_file(path)
+
+	assert get_object_path(content_hash, ".gz").samefile(stored)
+	assert find_stored_file(path) == stored
+
+
+def test_missing_file_is_not_stored(data_folder):
+	assert store_file(data_folder.joinpath("missing.csv")) == ""
+
+
+def test_link_file_falls_back_to_copying(data_folder, monkeypatch):
+	def no_links(source, target):
+		raise OSError("Links not supported")
+
+	monkeypatch.setattr(store.os, "link", no_links)
+	monkeypatch.setattr(store, "fcntl", None)
+
+	source = write(data_folder.joinpath("source.csv"), "id\n1\n")
+	target = data_folder.joinpath("target.csv")
+	link_file(source, target)
+
+	assert target.read_text() == "id\n1\n"
+	assert not source.samefile(target)
@@ -6,6 +6,7 @@ from flask_limiter.util import get_remote_address
 import config
 
 from backend.lib.database import Database
+from backend.lib.dataset import DataSet
 from backend.lib.logger import Logger
 from backend.lib.queue import JobQueue
 
@@ -32,6 +33,17 @@ app.config.from_object("config.FlaskConfig")
 login_manager.init_app(app)
 login_manager.login_view = "show_login"
 
+# datasets are only loaded from the database once per request, and buffered
+# status updates are written at the end of it
+@app.before_request
+def start_dataset_scope():
+	DataSet.start_identity_scope()
+
+@app.teardown_request
+def end_dataset_scope(exception=None):
+	DataSet.flush_pending_statuses()
+	DataSet.end_identity_scope()
+
 # import all views
 import webtool.access
 import webtool.views
@@ -102,7 +102,7 @@ def api_board(datasource, board):
 
 	threads = db.fetchall(
 		"SELECT * FROM threads_" + datasource + " WHERE board = %s ORDER BY is_sticky DESC, timestamp_modified DESC LIMIT 200",
-		(board,))
+		(board,), readonly=True)
 
 	if not threads:
 		return error(404, error="No threads available for this datasource")
@@ -158,7 +158,7 @@ def api_board_page(datasource, board, page):
 	limit = "LIMIT 15 OFFSET %i" % ((int(page) - 1) * 15)
 	threads = db.fetchall(
 		"SELECT * FROM threads_" + datasource + " WHERE board = %s ORDER BY is_sticky DESC, timestamp_modified DESC " + limit,
-		(board,))
+		(board,), readonly=True)
 
 	if not threads:
 		return error(404, error="No threads available for this datasource")
@@ -201,7 +201,7 @@ def api_board_catalog(datasource, board):
 
 	threads = db.fetchall(
 		"SELECT * FROM threads_" + datasource + " WHERE board = %s ORDER BY is_sticky DESC, timestamp_modified DESC LIMIT 150",
-		(board,))
+		(board,), readonly=True)
 
 	if not threads:
 		return error(404, error="No threads available for this datasource")
@@ -254,7 +254,7 @@ def get_archive(datasource, board):
 
 	threads = db.fetchall(
 		"SELECT id FROM threads_" + datasource + " WHERE board = %s AND timestamp_archived > 0 ORDER BY timestamp_archived ASC",
-		(board,))
+		(board,), readonly=True)
 	return jsonify([thread["id"] for thread in threads])
 
 
@@ -280,14 +280,14 @@ def get_boards(datasource):
 	if datasource not in config.DATASOURCES:
 		return error(404, error="Invalid data source")
 
-	boards = db.fetchall("SELECT DISTINCT board FROM threads_" + datasource)
+	boards = db.fetchall("SELECT DISTINCT board FROM threads_" + datasource, readonly=True)
 	return jsonify({"boards": [{"board": board["board"]} for board in boards]})
 
 
 def get_thread(datasource, board, thread, db, limit=0):
 	limit = "" if not limit or limit <= 0 else " LIMIT %i" % int(limit)
 	posts = db.fetchall("SELECT * FROM posts_" + datasource + " WHERE thread_id = %s ORDER BY timestamp ASC" + limit,
-						(thread["id"],))
+						(thread["id"],), readonly=True)
 	if not posts:
 		return False
 
@@ -22,7 +22,7 @@ from werkzeug.utils import secure_filename
 
 from webtool import app, db, log, openapi, limiter, queue
 from webtool.views import queue_processor
-from webtool.lib.helpers import string_to_timestamp, get_preview, error
+from webtool.lib.helpers import string_to_timestamp, get_preview, error, send_result_file
 
 from backend.lib.exceptions import JobNotFoundException
 from backend.lib.queue import JobQueue
@@ -168,7 +168,8 @@ def process_standalone(processor):
 	processed = DataSet(extension=metadata["extension"], type=processor, parent=temp_dataset.key, db=db)
 
 	queue = JobQueue(database=db, logger=log)
-	job = queue.add_job(processor, {}, processed.key)
+	# someone is waiting for the result, so run this before other jobs
+	job = queue.add_job(processor, {}, processed.key, priority=1, owner=current_user.get_id())
 	place_in_queue = queue.get_place_in_queue(job)
 	if place_in_queue > 5:
 		job.finish()
@@ -203,4 +204,4 @@ def process_standalone(processor):
 
 	# job finished, send file - temporary datasets will be cleaned up by
 	# after_this_request function defined earlier
-	return send_file(processed.get_results_path(), as_attachment=True)
\ No newline at end of file
+	return send_result_file(processed.get_results_path(), as_attachment=True)
\ No newline at end of file
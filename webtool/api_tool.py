@@ -24,7 +24,7 @@ from werkzeug.utils import secure_filename
 from webtool import app, db, log, openapi, limiter, queue
 from webtool.lib.helpers import get_preview, error
 
-from backend.lib.exceptions import QueryParametersException
+from backend.lib.exceptions import QueryParametersException, JobNotFoundException
 from backend.lib.queue import JobQueue
 from backend.lib.job import Job
 from backend.lib.dataset import DataSet
@@ -71,11 +71,9 @@ def api_status():
 
 	# get job stats
 	queue = JobQueue(logger=log, database=db)
-	jobs = queue.get_all_jobs()
-	jobs_count = len(jobs)
-	jobs_types = set([job.data["jobtype"] for job in jobs])
-	jobs_sorted = {jobtype: len([job for job in jobs if job.data["jobtype"] == jobtype]) for jobtype in jobs_types}
-	jobs_sorted["total"] = jobs_count
+	jobs = queue.get_cached_queue_summary()
+	jobs_sorted = {jobtype: jobs[jobtype]["queued"] for jobtype in jobs if jobs[jobtype]["queued"] > 0}
+	jobs_sorted["total"] = sum(jobs_sorted.values())
 
 	# determine if backend is live by checking if the process is running
 	lockfile = Path(config.PATH_ROOT, config.PATH_LOCKFILE, "4cat.pid")
@@ -238,7 +236,7 @@ def queue_dataset():
 	if hasattr(worker_class, "after_create"):
 		worker_class.after_create(sanitised_query, dataset, request)
 
-	queue.add_job(jobtype=search_worker_id, remote_id=dataset.key)
+	queue.add_job(jobtype=search_worker_id, remote_id=dataset.key, owner=current_user.get_id())
 
 	return dataset.key
 
@@ -253,14 +251,21 @@ def check_dataset():
 	Requires authentication by logging in or providing a valid access token.
 
 	:request-param str key:  ID of the dataset for which to return the status
-	:return: Dataset status, containing the `status`, `query`, number of `rows`,
-	         the dataset `key`, whether the dataset is `done`, the `path` of the
-	         result file and whether the dataset is `empty`.
+	:return: Dataset status, containing the `status`, structured `progress`
+	         (if available), `query`, number of `rows`, the dataset `key`,
+	         whether the dataset is `done`, the `path` of the result file and
+	         whether the dataset is `empty`.
 
 	:return-schema: {
 		type=object,
 		properties={
 			status={type=string},
+			progress={type=object,properties={
+				done={type=integer},
+				total={type=integer},
+				rate={type=number},
+				eta={type=integer}
+			}},
 			query={type=string},
 			rows={type=integer},
 			key={type=string},
@@ -297,6 +302,7 @@ def check_dataset():
 
 	status = {
 		"status": dataset.get_status(),
+		"progress": dataset.get_progress(),
 		"status_html": render_template("result-status.html", dataset=dataset),
 		"label": dataset.get_label(),
 		"query": dataset.data["query"],
@@ -473,13 +479,20 @@ def queue_processor(key=None, processor=None):
 
 	analysis = DataSet(parent=dataset.key, parameters=options, db=db,
 					   extension=dataset.processors[processor]["extension"], type=processor)
-	if analysis.is_new:
-		# analysis has not been run or queued before - queue a job to run it
-		queue.add_job(jobtype=processor, remote_id=analysis.key)
+	if analysis.is_new and not analysis.use_cached_results():
+		# analysis has not been run or queued before, and no identical
+		# analysis has results that can be re-used - queue a job to run it.
+		# if the parent dataset is still being created, wait for that first
+		try:
+			parent_job = Job.get_by_remote_ID(dataset.key, db, jobtype=dataset.type) if not dataset.is_finished() else None
+		except JobNotFoundException:
+			parent_job = None
+
+		queue.add_job(jobtype=processor, remote_id=analysis.key, owner=current_user.get_id(), depends_on=parent_job)
 		job = Job.get_by_remote_ID(analysis.key, database=db)
 		analysis.link_job(job)
 		analysis.update_status("Queued")
-	else:
+	elif not analysis.is_new:
 		flash("This analysis (%s) is currently queued or has already been run with these parameters." %
 			  dataset.processors[processor]["name"])
 
@@ -565,7 +578,7 @@ def check_processor():
 
 	for key in keys:
 		try:
-			dataset = DataSet(key=key, db=db)
+			dataset = DataSet.get_by_key(key, db=db)
 		except TypeError:
 			continue
 
@@ -577,7 +590,7 @@ def check_processor():
 			"key": dataset.key,
 			"finished": dataset.is_finished(),
 			"html": render_template("result-child.html", child=dataset, dataset=parent,
-									query=dataset.get_genealogy()[0], parent_key=top_parent.key,
+									query=top_parent, parent_key=top_parent.key,
 									processors=backend.all_modules.processors),
 			"resultrow_html": render_template("result-result-row.html", dataset=top_parent),
 			"url": "/result/" + dataset.data["result_file"]
@@ -4,6 +4,7 @@ General helper functions for Flask templating and 4CAT views
 import importlib
 import datetime
 import inspect
+import mimetypes
 import glob
 import sys
 import os
@@ -13,8 +14,10 @@ import csv
 from functools import wraps
 from math import ceil
 from flask_login import current_user
-from flask import (current_app, request, jsonify)
+from pathlib import Path
+from flask import (current_app, request, jsonify, send_file, Response)
 from backend.abstract.processor import BasicProcessor
+from backend.lib.compression import find_stored_file, get_content_encoding, open_stored_file
 
 import config
 
@@ -183,7 +186,7 @@ def get_preview(query):
 	:return list: 
 	"""
 	preview = []
-	with query.get_results_path().open(encoding="utf-8") as resultfile:
+	with open_stored_file(query.get_results_path()) as resultfile:
 		posts = csv.DictReader(resultfile)
 		i = 0
 		for post in posts:
@@ -195,6 +198,55 @@ def get_preview(query):
 	return preview
 
 
+def send_result_file(path, as_attachment=False):
+	"""
+	Send a result file to the client
+
+	Result files may be stored compressed. If the client accepts the
+	compression used, the stored file is sent as-is with a matching
+	`Content-Encoding`; otherwise it is decompressed while it is sent.
+
+	:param Path path:  Path to result file, as returned by
+	`DataSet.get_results_path()`
+	:param bool as_attachment:  Send as a download rather than inline
+	:return:  Flask response
+	"""
+	path = Path(path)
+	stored = find_stored_file(path)
+	if not stored.exists():
+		return error(404, "File not found.")
+
+	mimetype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+	encoding = get_content_encoding(stored)
+
+	if not encoding:
+		return send_file(str(stored), mimetype=mimetype, as_attachment=as_attachment, attachment_filename=path.name)
+
+	if encoding in request.accept_encodings:
+		response = send_file(str(stored), mimetype=mimetype, as_attachment=as_attachment, attachment_filename=path.name)
+		response.headers["Content-Encoding"] = encoding
+	else:
+		# open the file now rather than when the response is sent, so it can
+		# still be read if it is deleted after the request is handled (as
+		# the standalone API does with its temporary files)
+		infile = open_stored_file(stored, "rb")
+
+		def stream():
+			while True:
+				chunk = infile.read(1024 * 1024)
+				if not chunk:
+					break
+				yield chunk
+
+		response = Response(stream(), mimetype=mimetype)
+		response.call_on_close(infile.close)
+		if as_attachment:
+			response.headers["Content-Disposition"] = "attachment; filename=\"%s\"" % path.name
+
+	response.headers["Vary"] = "Accept-Encoding"
+	return response
+
+
 def format_post(post):
 	"""
 	Format a plain-text 4chan post for HTML display
@@ -8,6 +8,7 @@ import os
 from pathlib import Path
 from urllib.parse import urlencode
 from webtool import app
+from backend.lib.compression import find_stored_file
 
 import config
 
@@ -96,7 +97,7 @@ def _jinja2_filter_conf(data, property=""):
 @app.template_filter('filesize')
 def _jinja2_filter_filesize(file, short=False):
 	try:
-		stats = os.stat(file)
+		stats = os.stat(str(find_stored_file(file)))
 	except FileNotFoundError:
 		return "0 bytes"
 
@@ -398,7 +398,7 @@ query = {
                     let update = $(child.html);
                     update.attr('aria-expanded', target.attr('aria-expanded'));
 
-                    if (target.attr('data-status') === update.attr('data-status') && target.attr('class') === update.attr('class')) {
+                    if (target.attr('data-status') === update.attr('data-status') && target.attr('data-progress') === update.attr('data-progress') && target.attr('class') === update.attr('class')) {
                         console.log(target.attr('data-status'));
                         return;
                     }
@@ -18,11 +18,12 @@ from flask import render_template, jsonify, abort, request, redirect, send_from_
 from flask_login import login_required, current_user
 
 from webtool import app, db, log
-from webtool.lib.helpers import Pagination, get_preview, error
+from webtool.lib.helpers import Pagination, get_preview, error, send_result_file
 
 from webtool.api_tool import delete_dataset, toggle_favourite, queue_processor
 
 from backend.lib.dataset import DataSet
+from backend.lib.compression import open_stored_file
 from backend.lib.queue import JobQueue
 
 
@@ -238,8 +239,12 @@ def get_result(query_file):
 	:return:  Result file
 	:rmime: text/csv
 	"""
-	directory = config.PATH_ROOT + "/" + config.PATH_DATA
-	return send_from_directory(directory=directory, filename=query_file)
+	directory = Path(config.PATH_ROOT, config.PATH_DATA)
+	path = directory.joinpath(query_file)
+	if path.resolve().parent != directory.resolve():
+		abort(404)
+
+	return send_result_file(path)
 
 
 @app.route('/results/', defaults={'page': 1})
@@ -266,7 +271,7 @@ def show_results(page):
 		depth = "own"
 
 	if depth == "own":
-		where.append("parameters::json->>'user' = %s")
+		where.append("owner = %s")
 		replacements.append(current_user.get_id())
 
 	if depth == "favourites":
@@ -290,11 +295,10 @@ def show_results(page):
 		abort(404)
 
 	pagination = Pagination(page, page_size, num_datasets)
-	filtered = []
 	processors = backend.all_modules.processors
 
-	for dataset in datasets:
-		filtered.append(DataSet(key=dataset["key"], db=db))
+	# load the datasets' children along with them, as the listing shows them
+	filtered = DataSet.get_trees([dataset["key"] for dataset in datasets], db=db)
 
 	favourites = [row["key"] for row in
 				  db.fetchall("SELECT key FROM users_favourites WHERE name = %s", (current_user.get_id(),))]
@@ -316,7 +320,8 @@ def show_result(key):
 	:return:  Rendered template
 	"""
 	try:
-		dataset = DataSet(key=key, db=db)
+		# the whole tree of processed datasets is shown, so load it at once
+		dataset = DataSet.get_tree(key, db=db)
 	except TypeError:
 		abort(404)
 
@@ -373,7 +378,7 @@ def preview_csv(key):
 		return error(404, "Dataset not found.")
 
 	try:
-		with dataset.get_results_path().open(encoding="utf-8") as csvfile:
+		with open_stored_file(dataset.get_results_path()) as csvfile:
 			rows = []
 			reader = csv.reader(csvfile)
 			while len(rows) < 25:
@@ -448,7 +453,7 @@ def restart_dataset(key):
 
 	dataset.unfinish()
 	queue = JobQueue(logger=log, database=db)
-	queue.add_job(jobtype=dataset.parameters["type"], remote_id=dataset.key)
+	queue.add_job(jobtype=dataset.parameters["type"], remote_id=dataset.key, owner=dataset.parameters.get("user", ""))
 
 	flash("Dataset queued for re-running.")
 	return redirect("/results/" + dataset.key + "/")
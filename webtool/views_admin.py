@@ -15,6 +15,7 @@ from webtool.lib.helpers import admin_required, error
 from webtool.lib.user import User
 
 from backend.lib.helpers import call_api
+from backend.lib.query_profiler import QueryProfiler
 
 
 @app.route("/admin/")
@@ -42,6 +43,36 @@ def get_queue_status():
 						   now=time.time())
 
 
+@app.route("/admin/query-stats/")
+@login_required
+@admin_required
+def get_query_stats():
+	"""
+	Show database query statistics
+
+	Statistics are collected separately by the backend and the web tool, so
+	both are shown. Use ?format=json to get the raw numbers.
+
+	:return:  HTML table, or JSON
+	"""
+	backend_stats = call_api("query-stats")
+	if not isinstance(backend_stats, dict) or "response" not in backend_stats:
+		backend_stats = {"enabled": False, "buckets": [], "queries": []}
+	else:
+		backend_stats = backend_stats["response"]
+
+	frontend_stats = {
+		"enabled": QueryProfiler.enabled,
+		"buckets": QueryProfiler.get_bucket_labels(),
+		"queries": QueryProfiler.get_stats()[:100]
+	}
+
+	if request.args.get("format") == "json":
+		return jsonify({"backend": backend_stats, "frontend": frontend_stats})
+
+	return render_template("controlpanel/query-stats.html", stats={"Backend": backend_stats, "Web tool": frontend_stats})
+
+
 @app.route("/admin/add-user/")
 @login_required
 def add_user():